@@ -1,32 +1,165 @@
-from django.contrib import admin
-from .models import UserProfile, Course, Enrollment, AttendanceSession, AttendanceRecord
+from django.conf import settings
+from django.contrib import admin, messages
+from django.core.paginator import Paginator
+from django.db.models import Exists, Max, Min, OuterRef, Q, QuerySet
+from django.utils.functional import cached_property
+from .database import estimated_count
+from .models import UserProfile, Course, Enrollment, AttendanceSession, AttendanceRecord, AttendanceRollup, MarkingDevice
+from .search import matching_ids
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Use the database's row estimate for unfiltered changelists of large tables;
+    filtered ones, and tables under ADMIN_ESTIMATED_COUNT_ABOVE rows, still count exactly.
+    """
+    
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not queryset.query.where:
+            estimate = estimated_count(queryset.model, queryset.db)
+            if estimate is not None and estimate > getattr(settings, 'ADMIN_ESTIMATED_COUNT_ABOVE', 100000):
+                return estimate
+        return super().count
+
+
+class IndexedSearchMixin:
+    """
+    Answer changelist searches from the search index instead of ``icontains``
+    over joined columns. ``search_index_lookups`` maps an index kind to the
+    field holding that object's id; ``search_fields`` still enables the box.
+    """
+    search_index_lookups = {}
+    
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term.strip():
+            return queryset, False
+        condition = Q()
+        for kind, lookup in self.search_index_lookups.items():
+            condition |= Q(**{f'{lookup}__in': matching_ids(search_term, kind)})
+        return queryset.filter(condition), False
+
+class SessionDateQuerySet(QuerySet):
+    """
+    Record queryset whose date drill-down (``date_hierarchy = 'session__session_date'``)
+    is answered from the sessions table, probing for matching records per
+    session, instead of joining and scanning every record.
+    """
+    DATE_FIELD = 'session__session_date'
+    
+    def _sessions(self):
+        return AttendanceSession.objects.filter(Exists(self.filter(session=OuterRef('pk'))))
+    
+    def dates(self, field_name, kind, order='ASC'):
+        if field_name != self.DATE_FIELD:
+            return super().dates(field_name, kind, order)
+        return self._sessions().dates('session_date', kind, order)
+    
+    def aggregate(self, *args, **kwargs):
+        # The admin's date_hierarchy tag asks for exactly
+        # aggregate(first=Min(DATE_FIELD), last=Max(DATE_FIELD)) to bound the
+        # drill-down; anything else (filters, other fields) goes through untouched.
+        if args or not kwargs or not all(
+            expression in (Min(self.DATE_FIELD), Max(self.DATE_FIELD)) for expression in kwargs.values()
+        ):
+            return super().aggregate(*args, **kwargs)
+        return self._sessions().aggregate(**{
+            alias: type(expression)('session_date') for alias, expression in kwargs.items()
+        })
+
+class SessionCourseListFilter(admin.RelatedOnlyFieldListFilter):
+    """
+    Course filter for records that lists only courses with sessions, found
+    through the sessions table's (course, date, time) key rather than by
+    scanning every record as RelatedOnlyFieldListFilter would.
+    """
+    
+    def field_choices(self, field, request, model_admin):
+        return field.get_choices(
+            include_blank=False,
+            limit_choices_to={'pk__in': AttendanceSession.objects.values('course_id')},
+            ordering=self.field_admin_ordering(field, request, model_admin),
+        )
 
 @admin.register(UserProfile)
-class UserProfileAdmin(admin.ModelAdmin):
+class UserProfileAdmin(IndexedSearchMixin, admin.ModelAdmin):
+    search_index_lookups = {'user': 'user_id'}
     list_display = ['user', 'role', 'student_id', 'phone', 'created_at']
+    list_select_related = ['user']
+    autocomplete_fields = ['user']
     list_filter = ['role', 'created_at']
     search_fields = ['user__username', 'user__first_name', 'user__last_name', 'student_id']
 
 @admin.register(Course)
-class CourseAdmin(admin.ModelAdmin):
+class CourseAdmin(IndexedSearchMixin, admin.ModelAdmin):
+    search_index_lookups = {'course': 'pk'}
     list_display = ['course_code', 'course_name', 'lecturer', 'created_at']
+    list_select_related = ['lecturer']
+    autocomplete_fields = ['lecturer']
     list_filter = ['created_at', 'lecturer']
     search_fields = ['course_code', 'course_name', 'description']
 
 @admin.register(Enrollment)
-class EnrollmentAdmin(admin.ModelAdmin):
+class EnrollmentAdmin(IndexedSearchMixin, admin.ModelAdmin):
+    search_index_lookups = {'user': 'student_id', 'course': 'course_id'}
     list_display = ['student', 'course', 'enrolled_at']
+    list_select_related = ['student', 'course']
+    autocomplete_fields = ['student', 'course']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     list_filter = ['enrolled_at', 'course']
     search_fields = ['student__username', 'student__first_name', 'student__last_name', 'course__course_code']
 
 @admin.register(AttendanceSession)
-class AttendanceSessionAdmin(admin.ModelAdmin):
+class AttendanceSessionAdmin(IndexedSearchMixin, admin.ModelAdmin):
+    search_index_lookups = {'session': 'pk'}
     list_display = ['course', 'session_date', 'session_time', 'topic', 'created_by', 'created_at']
-    list_filter = ['session_date', 'course', 'created_by']
+    list_select_related = ['course', 'created_by']
+    list_filter = ['course']
+    date_hierarchy = 'session_date'
+    autocomplete_fields = ['course', 'created_by']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     search_fields = ['course__course_code', 'topic']
 
 @admin.register(AttendanceRecord)
-class AttendanceRecordAdmin(admin.ModelAdmin):
+class AttendanceRecordAdmin(IndexedSearchMixin, admin.ModelAdmin):
+    search_index_lookups = {'user': 'student_id'}
     list_display = ['student', 'session', 'status', 'marked_at']
-    list_filter = ['status', 'session__session_date', 'session__course']
+    list_select_related = ['student', 'session__course']
+    list_filter = ['status', ('session__course', SessionCourseListFilter)]
+    date_hierarchy = 'session__session_date'
+    # The model orders by marked_at, which has no index; newest rows first is the same thing, cheaply.
+    ordering = ['-pk']
+    autocomplete_fields = ['student', 'session']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     search_fields = ['student__username', 'student__first_name', 'student__last_name']
+    
+    def get_queryset(self, request):
+        queryset = super().get_queryset(request)
+        return SessionDateQuerySet(model=queryset.model, query=queryset.query, using=queryset.db)
+
+@admin.register(AttendanceRollup)
+class AttendanceRollupAdmin(admin.ModelAdmin):
+    list_display = ['enrollment', 'total_sessions', 'present', 'late', 'absent', 'updated_at']
+    list_select_related = ['enrollment__student', 'enrollment__course']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    readonly_fields = ['enrollment', 'total_sessions', 'present', 'late', 'absent', 'updated_at']
+
+@admin.register(MarkingDevice)
+class MarkingDeviceAdmin(admin.ModelAdmin):
+    list_display = ['name', 'owner', 'is_active', 'last_seen_at', 'created_at']
+    list_select_related = ['owner']
+    list_filter = ['is_active']
+    autocomplete_fields = ['owner']
+    readonly_fields = ['last_seen_at']
+    
+    def save_model(self, request, obj, form, change):
+        if change:
+            super().save_model(request, obj, form, change)
+            return
+        token = obj.issue_token()
+        self.message_user(request, f'Token for {obj.name}: {token} (it is not stored, so copy it now).', messages.WARNING)
@@ -0,0 +1,192 @@
+import hashlib
+from dataclasses import dataclass
+from datetime import date, timedelta
+
+import numpy as np
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db.models import Count, IntegerField, Max
+from django.db.models.functions import Coalesce
+
+from .database import per_outer_row
+from .models import Course, Enrollment, AttendanceSession, AttendanceRecord
+
+TRENDS_KEY = 'analytics:trends:{course_id}:{fingerprint}'
+# datetime64[D] counts days from Thursday 1970-01-01; shifting by 3 starts weeks on Monday.
+WEEK_SHIFT = 3
+
+
+def _week_numbers(days):
+    return (days + WEEK_SHIFT) // 7
+
+
+def _week_start(week):
+    return date(1970, 1, 1) + timedelta(days=int(week) * 7 - WEEK_SHIFT)
+
+
+@dataclass
+class CourseTrends:
+    """Weekly attendance arrays for one course; every per-week array is indexed like ``weeks``."""
+    weeks: np.ndarray           # Monday of each week with at least one session (datetime64[D])
+    sessions: np.ndarray        # sessions held per week
+    rate: np.ndarray            # % of expected attendances that were present, per week
+    moving_average: np.ndarray  # the same over a trailing window of weeks
+    student_ids: np.ndarray
+    student_rates: np.ndarray   # students x weeks, % of that week's sessions attended
+    slopes: np.ndarray          # per student, change in weekly rate (points per week)
+    overall: np.ndarray         # per student, % of all sessions attended
+    recent: np.ndarray          # per student, % of sessions attended in the trailing window
+
+
+def _count(queryset, course_field):
+    return Coalesce(per_outer_row(queryset, course_field, Count('pk')), 0, output_field=IntegerField())
+
+
+def course_fingerprint(course):
+    """Return a tuple that changes whenever records, sessions or enrollments of ``course`` change (one query)."""
+    records = AttendanceRecord.objects.all()
+    sessions = AttendanceSession.objects.all()
+    return Course.objects.filter(pk=course.pk).values_list(
+        _count(records, 'session__course'),
+        per_outer_row(records, 'session__course', Max('marked_at')),
+        _count(sessions, 'course'),
+        # updated_at, not created_at: moving a session to another week must change the fingerprint too.
+        per_outer_row(sessions, 'course', Max('updated_at')),
+        _count(Enrollment.objects.all(), 'course'),
+    ).get()
+
+
+def load_columns(course):
+    """
+    Return (session_days, student_ids, present) for every record of ``course`` as parallel arrays.
+
+    The records come back from a single values_list() query; session dates are
+    converted to day numbers so the rest of the pipeline stays in NumPy.
+    """
+    rows = list(AttendanceRecord.objects.filter(session__course=course).order_by().values_list(
+        'session__session_date', 'student_id', 'status',
+    ))
+    if not rows:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), np.zeros(0, dtype=bool)
+    dates, student_ids, statuses = zip(*rows)
+    return (
+        np.array(dates, dtype='datetime64[D]').astype(np.int64),
+        np.array(student_ids, dtype=np.int64),
+        np.array(statuses) == 'present',
+    )
+
+
+def compute_trends(session_days, roster, record_days, record_students, present, window):
+    """
+    Vectorised weekly trends from raw columns.
+
+    ``session_days`` holds one day number per session, ``roster`` the enrolled
+    student ids, and the ``record_*``/``present`` arrays one entry per record.
+    Enrolled students without a record for a session count as absent, as in the
+    rollups.
+    """
+    session_weeks = _week_numbers(np.asarray(session_days, dtype=np.int64))
+    weeks = np.unique(session_weeks)
+    sessions = np.bincount(np.searchsorted(weeks, session_weeks), minlength=len(weeks))
+
+    roster = np.unique(np.asarray(roster, dtype=np.int64))
+    keep = present & np.isin(record_students, roster)
+    student_index = np.searchsorted(roster, record_students[keep])
+    week_index = np.searchsorted(weeks, _week_numbers(record_days[keep]))
+
+    attended = np.bincount(
+        student_index * len(weeks) + week_index, minlength=len(roster) * len(weeks),
+    ).reshape(len(roster), len(weeks)).astype(float)
+
+    weekly_present = attended.sum(axis=0)
+    expected = sessions * len(roster)
+    # Trailing sums over ``window`` weeks; the rate is pooled, not an average of rates.
+    trailing_present = np.cumsum(weekly_present)
+    trailing_present[window:] -= trailing_present[:-window].copy()
+    trailing_expected = np.cumsum(expected)
+    trailing_expected[window:] -= trailing_expected[:-window].copy()
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rate = np.where(expected > 0, weekly_present / expected * 100, np.nan)
+        moving_average = np.where(trailing_expected > 0, trailing_present / trailing_expected * 100, np.nan)
+        student_rates = attended / sessions * 100
+
+    if len(weeks) > 1:
+        # Least-squares slope of each student's weekly rate against calendar weeks.
+        x = weeks.astype(float) - weeks.mean()
+        slopes = student_rates @ x / (x @ x)
+    else:
+        slopes = np.zeros(len(roster))
+    total_sessions = sessions.sum()
+    recent_sessions = sessions[-window:].sum()
+    with np.errstate(divide='ignore', invalid='ignore'):
+        overall = attended.sum(axis=1) / total_sessions * 100 if total_sessions else np.zeros(len(roster))
+        recent = attended[:, -window:].sum(axis=1) / recent_sessions * 100 if recent_sessions else np.zeros(len(roster))
+
+    return CourseTrends(
+        weeks=np.array([_week_start(week) for week in weeks], dtype='datetime64[D]'),
+        sessions=sessions,
+        rate=rate,
+        moving_average=moving_average,
+        student_ids=roster,
+        student_rates=student_rates,
+        slopes=slopes,
+        overall=overall,
+        recent=recent,
+    )
+
+
+def course_trends(course, window=None):
+    """
+    Return CourseTrends for ``course``, computed from the database at most once per change.
+
+    Results are cached under a fingerprint of the course's records, sessions and
+    enrollments (one aggregate query), so any marking, new session or enrollment
+    change makes the next call recompute.
+    """
+    window = window or getattr(settings, 'TRENDS_WINDOW_WEEKS', 3)
+    fingerprint = hashlib.md5(repr((window, course_fingerprint(course))).encode()).hexdigest()
+    key = TRENDS_KEY.format(course_id=course.pk, fingerprint=fingerprint)
+    trends = cache.get(key)
+    if trends is None:
+        session_days = np.array(
+            AttendanceSession.objects.filter(course=course).values_list('session_date', flat=True),
+            dtype='datetime64[D]',
+        ).astype(np.int64)
+        roster = np.fromiter(
+            Enrollment.objects.filter(course=course).values_list('student_id', flat=True), dtype=np.int64,
+        )
+        trends = compute_trends(session_days, roster, *load_columns(course), window)
+        cache.set(key, trends, getattr(settings, 'TRENDS_CACHE_TIMEOUT', 3600))
+    return trends
+
+
+def dropping_students(trends, limit=10):
+    """Return the ``limit`` students whose weekly attendance is falling fastest, steepest first."""
+    order = np.argsort(trends.slopes, kind='stable')
+    order = order[trends.slopes[order] < 0][:limit]
+    users = User.objects.select_related('profile').in_bulk(trends.student_ids[order].tolist())
+    return [
+        {
+            'student': users[int(trends.student_ids[i])],
+            'slope': round(float(trends.slopes[i]), 1),
+            'overall': round(float(trends.overall[i]), 1),
+            'recent': round(float(trends.recent[i]), 1),
+        }
+        for i in order
+        if int(trends.student_ids[i]) in users
+    ]
+
+
+def _rounded(values):
+    return [None if np.isnan(value) else round(float(value), 1) for value in values]
+
+
+def weekly_series(trends):
+    """Return the weekly curves as plain lists (NaN becomes None) for templates and JSON."""
+    return {
+        'weeks': [str(week) for week in trends.weeks],
+        'sessions': trends.sessions.tolist(),
+        'rate': _rounded(trends.rate),
+        'moving_average': _rounded(trends.moving_average),
+    }
@@ -0,0 +1,211 @@
+from bisect import bisect_right
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+from datetime import date
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import CharField, Count, Exists, OuterRef, Q, Value
+from django.utils import timezone
+
+from .caching import invalidate_dashboards
+from .database import delete_rows, insert_from
+from .freshness import touch_courses
+from .models import AttendanceSession, AttendanceRecord, ArchivedSession, ArchivedRecord
+from .reporting import ReportRow
+from .rollups import apply_session_change, apply_status_deltas
+from .search import index_objects, unindex_objects
+from .snapshots import invalidate_weeks
+
+ARCHIVE_BATCH_SIZE = 200
+SESSION_COLUMNS = ['id', 'course_id', 'session_date', 'session_time', 'topic', 'created_by_id', 'created_at']
+RECORD_COLUMNS = ['id', 'session_id', 'student_id', 'status', 'remarks', 'marked_at', 'event_at']
+
+
+def _start_months():
+    return sorted(getattr(settings, 'SEMESTER_START_MONTHS', [1, 7]))
+
+
+def semester_of(day):
+    """Return the semester label ('2025-1', '2025-2', ...) that ``day`` falls in."""
+    starts = _start_months()
+    index = bisect_right(starts, day.month)
+    if index == 0:
+        return f'{day.year - 1}-{len(starts)}'
+    return f'{day.year}-{index}'
+
+
+def semester_bounds(label):
+    """Return (first day, first day of the next semester) for ``label``; ValueError if it is malformed."""
+    starts = _start_months()
+    try:
+        year, index = (int(part) for part in label.split('-'))
+    except ValueError:
+        raise ValueError(f'Invalid semester {label!r}; expected YEAR-N, e.g. 2025-1.')
+    if not 1 <= index <= len(starts):
+        raise ValueError(f'Invalid semester {label!r}; N must be between 1 and {len(starts)}.')
+    start = date(year, starts[index - 1], 1)
+    end = date(year, starts[index], 1) if index < len(starts) else date(year + 1, starts[0], 1)
+    return start, end
+
+
+def closed_semesters():
+    """Return the labels of semesters before the current one that still have sessions in the hot tables."""
+    current_start, _ = semester_bounds(semester_of(timezone.localdate()))
+    months = AttendanceSession.objects.filter(session_date__lt=current_start).dates('session_date', 'month')
+    return sorted({semester_of(month) for month in months}, key=semester_bounds)
+
+
+def archived_semesters(lecturer=None, student=None):
+    """Return the archived semester labels visible to ``lecturer`` or ``student`` (all if neither), newest first."""
+    sessions = ArchivedSession.objects.all()
+    if lecturer is not None:
+        sessions = sessions.filter(course__lecturer=lecturer)
+    if student is not None:
+        sessions = sessions.filter(attendance_records__student=student)
+    return sorted(set(sessions.order_by().values_list('semester', flat=True)), key=semester_bounds, reverse=True)
+
+
+@dataclass
+class ArchiveSummary:
+    semester: str
+    sessions: int = 0
+    records: int = 0
+    batches: int = 0
+    collisions: list = field(default_factory=list)
+
+
+def _move_batch(sessions, records, session_target, record_target, semester, archiving, batch_size):
+    """
+    Move up to ``batch_size`` sessions of ``sessions`` and their ``records`` in one transaction.
+
+    Rows keep their ids. Rollups are adjusted and dashboards and report
+    snapshot weeks invalidated in the same transaction, so the hot tables and
+    everything derived from them never disagree. Returns (sessions, records) moved.
+    """
+    with transaction.atomic():
+        batch = list(sessions.order_by('pk').values_list('pk', 'course_id', 'session_date')[:batch_size])
+        if not batch:
+            return 0, 0
+        session_ids = [pk for pk, _, _ in batch]
+        batch_sessions = sessions.model.objects.filter(pk__in=session_ids).order_by()
+        batch_records = records.filter(session_id__in=session_ids).order_by()
+        counts = list(
+            batch_records.values('session__course_id', 'student_id', 'status').annotate(total=Count('pk'))
+            .values_list('session__course_id', 'student_id', 'status', 'total')
+        )
+
+        session_columns = list(SESSION_COLUMNS)
+        if archiving:
+            batch_sessions = batch_sessions.annotate(archive_semester=Value(semester, output_field=CharField()))
+            session_columns.append('archive_semester')
+        insert_from(session_target, SESSION_COLUMNS + (['semester'] if archiving else []),
+                    batch_sessions.values_list(*session_columns))
+        insert_from(record_target, RECORD_COLUMNS, batch_records.values_list(*RECORD_COLUMNS))
+        delete_rows(records.model, 'session', session_ids, using=batch_records.db)
+        delete_rows(sessions.model, 'id', session_ids, using=batch_sessions.db)
+
+        # The bulk deletes and inserts skip signals, so keep rollups, snapshots, search, freshness
+        # and dashboards in step here.
+        direction = -1 if archiving else 1
+        for course_id, count in Counter(course_id for _, course_id, _ in batch).items():
+            apply_session_change(course_id, count * direction)
+        deltas = defaultdict(dict)
+        for course_id, student_id, status, total in counts:
+            deltas[course_id][(student_id, status)] = total * direction
+        for course_id, course_deltas in deltas.items():
+            apply_status_deltas(course_id, course_deltas)
+        invalidate_weeks((course_id, day) for _, course_id, day in batch)
+        touch_courses(course_id for _, course_id, _ in batch)
+        if archiving:
+            unindex_objects('session', session_ids)
+        else:
+            index_objects('session', AttendanceSession.objects.filter(pk__in=session_ids))
+        invalidate_dashboards(
+            user_ids={student_id for _, student_id, _, _ in counts},
+            course_ids={course_id for _, course_id, _ in batch},
+        )
+    return len(batch), sum(total for _, _, _, total in counts)
+
+
+def _move(summary, sessions, records, session_target, record_target, archiving, batch_size):
+    while True:
+        moved_sessions, moved_records = _move_batch(
+            sessions, records, session_target, record_target, summary.semester, archiving, batch_size,
+        )
+        if not moved_sessions:
+            return summary
+        summary.sessions += moved_sessions
+        summary.records += moved_records
+        summary.batches += 1
+
+
+def archive_semester(label, batch_size=ARCHIVE_BATCH_SIZE):
+    """
+    Move every session of the closed semester ``label`` and its records into the archive tables.
+
+    Work is committed in batches of ``batch_size`` sessions, so an interrupted
+    run leaves whole sessions on one side or the other and simply picks up
+    where it stopped when run again; re-running a finished semester is a no-op.
+    """
+    start, end = semester_bounds(label)
+    current_start, _ = semester_bounds(semester_of(timezone.localdate()))
+    if end > current_start:
+        raise ValueError(f'Semester {label} has not closed yet.')
+    sessions = AttendanceSession.objects.filter(session_date__gte=start, session_date__lt=end)
+    return _move(
+        ArchiveSummary(label), sessions, AttendanceRecord.objects.all(),
+        ArchivedSession, ArchivedRecord, archiving=True, batch_size=batch_size,
+    )
+
+
+def restore_semester(label, batch_size=ARCHIVE_BATCH_SIZE):
+    """
+    Move the archived sessions and records of ``label`` back into the hot tables; batched like archive_semester().
+
+    An archived session whose id, or course, date and time, is already taken
+    by a live session stays in the archive and is listed in ``collisions``.
+    """
+    semester_bounds(label)  # validates the label
+    live = AttendanceSession.objects.filter(
+        Q(pk=OuterRef('pk'))
+        | Q(course_id=OuterRef('course_id'), session_date=OuterRef('session_date'), session_time=OuterRef('session_time'))
+    )
+    sessions = ArchivedSession.objects.filter(semester=label)
+    summary = _move(
+        ArchiveSummary(label), sessions.exclude(Exists(live)), ArchivedRecord.objects.all(),
+        AttendanceSession, AttendanceRecord, archiving=False, batch_size=batch_size,
+    )
+    summary.collisions = list(sessions.order_by('session_date', 'session_time').values_list('pk', flat=True))
+    return summary
+
+
+def archived_records(semester):
+    """Return the ArchivedRecord queryset for ``semester``; it filters and orders like AttendanceRecord."""
+    return ArchivedRecord.objects.filter(session__semester=semester)
+
+
+def build_archived_report(course, semester):
+    """Return one ReportRow per student with archived records for ``course`` in ``semester``."""
+    total_sessions = ArchivedSession.objects.filter(course=course, semester=semester).count()
+    counts = list(
+        archived_records(semester).filter(session__course=course).order_by().values('student_id')
+        .annotate(**{
+            status: Count('pk', filter=Q(status=status)) for status, _ in AttendanceRecord.STATUS_CHOICES
+        })
+    )
+    students = User.objects.select_related('profile').in_bulk([row['student_id'] for row in counts])
+    rows = [
+        ReportRow(
+            student=students[row['student_id']],
+            student_id=students[row['student_id']].profile.student_id,
+            total_sessions=total_sessions,
+            present=row['present'],
+            absent=row['absent'],
+            late=row['late'],
+        )
+        for row in counts
+    ]
+    rows.sort(key=lambda row: (row.student.last_name, row.student.first_name, row.student.username))
+    return rows
@@ -0,0 +1,190 @@
+import asyncio
+import statistics
+import time
+
+from asgiref.testing import ApplicationCommunicator
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .models import AttendanceRecord, AttendanceSession, Enrollment
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    if len(ordered) == 1:
+        return ordered[0]
+    return statistics.quantiles(ordered, n=100, method='inclusive')[pct - 1]
+
+
+def pick_subjects():
+    """Pick the latest session, its lecturer and course, and one enrolled student to drive the views with."""
+    session = AttendanceSession.objects.select_related('course', 'created_by').order_by('-pk').first()
+    if session is None:
+        return None
+    enrollment = Enrollment.objects.filter(course=session.course_id).select_related('student').first()
+    if enrollment is None:
+        return None
+    return {
+        'lecturer': session.created_by,
+        'student': enrollment.student,
+        'course': session.course,
+        'session': session,
+    }
+
+
+def view_scenarios(subjects):
+    """Return (name, user, method, url, data) for every benchmarked request."""
+    session = subjects['session']
+    mark_url = reverse('attendance_mark', args=[session.pk])
+    # Re-submit the statuses and remarks already on record so the POST scenario is repeatable and changes nothing.
+    marks = {}
+    records = AttendanceRecord.objects.filter(session=session).values_list('student_id', 'status', 'remarks')
+    for student_id, status, remarks in records:
+        marks[f'status_{student_id}'] = status
+        marks[f'remarks_{student_id}'] = remarks
+    return [
+        ('dashboard:lecturer', subjects['lecturer'], 'get', reverse('dashboard'), None),
+        ('dashboard:student', subjects['student'], 'get', reverse('dashboard'), None),
+        ('reports', subjects['lecturer'], 'get', reverse('reports'), {'course': subjects['course'].pk}),
+        ('attendance_mark:get', subjects['lecturer'], 'get', mark_url, None),
+        ('attendance_mark:post', subjects['lecturer'], 'post', mark_url, marks),
+        ('attendance_records:lecturer', subjects['lecturer'], 'get', reverse('attendance_records'), None),
+        ('attendance_records:student', subjects['student'], 'get', reverse('attendance_records'), None),
+    ]
+
+
+def run_view_benchmarks(subjects, iterations=20, warmup=2, cold_cache=False):
+    """
+    Drive every scenario through the test client and return
+    ``{name: {'p50_ms', 'p95_ms', 'queries'}}``.
+
+    ``queries`` is the maximum seen across iterations. With ``cold_cache`` the
+    cache is cleared before every request so cached dashboards are rebuilt.
+    """
+    results = {}
+    client = Client()
+    for name, user, method, url, data in view_scenarios(subjects):
+        client.force_login(user)
+        timings = []
+        queries = 0
+        for iteration in range(warmup + iterations):
+            if cold_cache:
+                cache.clear()
+            with CaptureQueriesContext(connection) as captured:
+                started = time.perf_counter()
+                response = getattr(client, method)(url, data)
+                elapsed = time.perf_counter() - started
+            if response.status_code >= 400:
+                raise RuntimeError(f'{name} returned HTTP {response.status_code}')
+            if iteration >= warmup:
+                timings.append(elapsed * 1000)
+                queries = max(queries, len(captured))
+        results[name] = {
+            'p50_ms': round(percentile(timings, 50), 2),
+            'p95_ms': round(percentile(timings, 95), 2),
+            'queries': queries,
+        }
+    return results
+
+
+def compare_to_baseline(results, baseline, tolerance=0.2, min_delta_ms=2.0):
+    """
+    List regressions against ``baseline``: a p95 more than ``tolerance`` (and
+    ``min_delta_ms``) slower, or any increase in the number of queries.
+    """
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if previous is None:
+            continue
+        if current['queries'] > previous['queries']:
+            regressions.append(f"{name}: {previous['queries']} -> {current['queries']} queries")
+        limit = max(previous['p95_ms'] * (1 + tolerance), previous['p95_ms'] + min_delta_ms)
+        if current['p95_ms'] > limit:
+            regressions.append(f"{name}: p95 {previous['p95_ms']}ms -> {current['p95_ms']}ms")
+    return regressions
+
+
+def asgi_scenarios(subjects):
+    """Return (name, user, sync_path, async_path, query_string) for every sync/async view pair."""
+    course = subjects['course'].pk
+    return [
+        ('dashboard:lecturer', subjects['lecturer'], reverse('dashboard'), reverse('dashboard_async'), ''),
+        ('dashboard:student', subjects['student'], reverse('dashboard'), reverse('dashboard_async'), ''),
+        ('reports', subjects['lecturer'], reverse('reports'), reverse('reports_async'), f'course={course}'),
+    ]
+
+
+def session_cookie(user):
+    client = Client()
+    client.force_login(user)
+    return f'{settings.SESSION_COOKIE_NAME}={client.cookies[settings.SESSION_COOKIE_NAME].value}'
+
+
+async def asgi_get(application, path, query_string='', cookie=''):
+    """Send one GET through ``application`` exactly as an ASGI server would and return its status code."""
+    scope = {
+        'type': 'http',
+        'asgi': {'version': '3.0'},
+        'http_version': '1.1',
+        'method': 'GET',
+        'scheme': 'http',
+        'path': path,
+        'raw_path': path.encode(),
+        'query_string': query_string.encode(),
+        'root_path': '',
+        'headers': [(b'host', b'testserver'), (b'cookie', cookie.encode())],
+        'client': ('127.0.0.1', 50000),
+        'server': ('testserver', 80),
+    }
+    communicator = ApplicationCommunicator(application, scope)
+    await communicator.send_input({'type': 'http.request', 'body': b'', 'more_body': False})
+    start = await communicator.receive_output(timeout=60)
+    message = start
+    while message['type'] != 'http.response.body' or message.get('more_body'):
+        message = await communicator.receive_output(timeout=60)
+    await communicator.wait(timeout=60)
+    return start['status']
+
+
+async def _load(application, path, query_string, cookie, requests, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+    timings = []
+
+    async def one():
+        async with semaphore:
+            started = time.perf_counter()
+            status = await asgi_get(application, path, query_string, cookie)
+            timings.append((time.perf_counter() - started) * 1000)
+            if status >= 400:
+                raise RuntimeError(f'{path} returned HTTP {status}')
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(requests)))
+    elapsed = time.perf_counter() - started
+    return {
+        'p50_ms': round(percentile(timings, 50), 2),
+        'p95_ms': round(percentile(timings, 95), 2),
+        'requests_per_second': round(requests / elapsed, 1),
+    }
+
+
+async def run_asgi_benchmark(application, scenarios, requests=100, concurrency=10, warmup=5):
+    """
+    Load each sync/async view pair through the ASGI ``application`` with
+    ``concurrency`` requests in flight and return ``{name: {'sync': ..., 'async': ...}}``.
+
+    ``scenarios`` are asgi_scenarios() rows with the user replaced by a session cookie.
+    """
+    results = {}
+    for name, cookie, sync_path, async_path, query_string in scenarios:
+        results[name] = {}
+        for mode, path in (('sync', sync_path), ('async', async_path)):
+            for _ in range(warmup):
+                await asgi_get(application, path, query_string, cookie)
+            results[name][mode] = await _load(application, path, query_string, cookie, requests, concurrency)
+    return results
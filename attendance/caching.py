@@ -0,0 +1,138 @@
+import threading
+import uuid
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import Course
+
+VERSION_KEY = 'dashboard:version:{kind}:{pk}'
+ENTRY_KEY = 'dashboard:entry:{user_id}:{version}'
+COURSE_CHOICES_KEY = 'choices:courses:{lecturer_id}:{version}'
+
+_stats = Counter()
+_stats_lock = threading.Lock()
+
+
+def _count(name):
+    with _stats_lock:
+        _stats[name] += 1
+
+
+def dashboard_cache_stats():
+    with _stats_lock:
+        return {'hits': _stats['hits'], 'misses': _stats['misses'], 'invalidations': _stats['invalidations']}
+
+
+def _versions(kind, ids):
+    keys = {VERSION_KEY.format(kind=kind, pk=pk): pk for pk in ids}
+    found = cache.get_many(keys)
+    missing = {key: uuid.uuid4().hex for key in keys if key not in found}
+    if missing:
+        cache.set_many(missing, timeout=None)
+        found.update(missing)
+    return {keys[key]: version for key, version in found.items()}
+
+
+async def _aversions(kind, ids):
+    keys = {VERSION_KEY.format(kind=kind, pk=pk): pk for pk in ids}
+    found = await cache.aget_many(keys)
+    missing = {key: uuid.uuid4().hex for key in keys if key not in found}
+    if missing:
+        await cache.aset_many(missing, timeout=None)
+        found.update(missing)
+    return {keys[key]: version for key, version in found.items()}
+
+
+def cached_dashboard_context(user, build, course_ids):
+    """
+    Return ``build(user)`` from the cache while nothing it depends on has changed.
+
+    Entries are keyed by the user's version token and remember the version of
+    every course in ``course_ids()`` at build time. Versions are always read
+    before the data, so an entry can only ever be stored under versions that
+    are as old as, or older than, the rows it was computed from.
+    """
+    user_version = _versions('user', [user.pk])[user.pk]
+    key = ENTRY_KEY.format(user_id=user.pk, version=user_version)
+
+    entry = cache.get(key)
+    if entry is not None and _versions('course', entry['course_versions']) == entry['course_versions']:
+        _count('hits')
+        return entry['context']
+
+    _count('misses')
+    course_versions = _versions('course', course_ids())
+    context = build(user)
+    cache.set(key, {'course_versions': course_versions, 'context': context},
+              getattr(settings, 'DASHBOARD_CACHE_TIMEOUT', 600))
+    return context
+
+
+async def acached_dashboard_context(user, build, course_ids):
+    """Async version of :func:`cached_dashboard_context`; ``build`` and ``course_ids`` are coroutine functions."""
+    user_version = (await _aversions('user', [user.pk]))[user.pk]
+    key = ENTRY_KEY.format(user_id=user.pk, version=user_version)
+
+    entry = await cache.aget(key)
+    if entry is not None and await _aversions('course', entry['course_versions']) == entry['course_versions']:
+        _count('hits')
+        return entry['context']
+
+    _count('misses')
+    course_versions = await _aversions('course', await course_ids())
+    context = await build(user)
+    await cache.aset(key, {'course_versions': course_versions, 'context': context},
+                     getattr(settings, 'DASHBOARD_CACHE_TIMEOUT', 600))
+    return context
+
+
+def _bump(kind, ids):
+    ids = {pk for pk in ids if pk is not None}
+    if ids:
+        cache.set_many({VERSION_KEY.format(kind=kind, pk=pk): uuid.uuid4().hex for pk in ids}, timeout=None)
+        _count('invalidations')
+
+
+def invalidate_dashboards(user_ids=(), course_ids=()):
+    """Bump the versions of the given users and courses once the current transaction commits."""
+    user_ids = set(user_ids)
+    course_ids = set(course_ids)
+
+    def bump():
+        _bump('user', user_ids)
+        _bump('course', course_ids)
+
+    transaction.on_commit(bump)
+
+
+def lecturer_course_choices(lecturer_id):
+    """
+    Return [(pk, label)] for the lecturer's courses, for small course dropdowns.
+
+    Cached under a per-lecturer version token that invalidate_course_choices()
+    bumps whenever one of their courses is saved or deleted; as for dashboards,
+    the version is read before the courses.
+    """
+    version = _versions('choices', [lecturer_id])[lecturer_id]
+    key = COURSE_CHOICES_KEY.format(lecturer_id=lecturer_id, version=version)
+    choices = cache.get(key)
+    if choices is None:
+        # Same label as Course.__str__.
+        choices = [
+            (pk, f'{code} - {name}')
+            for pk, code, name in Course.objects.filter(lecturer_id=lecturer_id).values_list('pk', 'course_code', 'course_name')
+        ]
+        cache.set(key, choices, getattr(settings, 'CHOICES_CACHE_TIMEOUT', 3600))
+    return choices
+
+
+def invalidate_course_choices(lecturer_ids):
+    """Drop the cached course choices of ``lecturer_ids`` once the current transaction commits."""
+    lecturer_ids = {pk for pk in lecturer_ids if pk is not None}
+    if lecturer_ids:
+        transaction.on_commit(lambda: cache.set_many(
+            {VERSION_KEY.format(kind='choices', pk=pk): uuid.uuid4().hex for pk in lecturer_ids}, timeout=None,
+        ))
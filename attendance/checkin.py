@@ -0,0 +1,154 @@
+import atexit
+import logging
+import secrets
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DatabaseError, close_old_connections
+
+from .models import AttendanceSession, Enrollment
+from .services import mark_attendance
+
+logger = logging.getLogger('attendance.checkin')
+
+CODE_KEY = 'checkin:code:{code}'
+SESSION_KEY = 'checkin:session:{session_id}'
+CODE_ALPHABET = 'ABCDEFGHJKLMNPQRSTUVWXYZ23456789'
+CODE_LENGTH = 6
+
+
+def open_checkin(session):
+    """
+    Issue a fresh self check-in code for ``session``, replacing any code already open.
+
+    The code entry carries the course roster so check-ins can be validated from
+    the cache alone. Codes expire after CHECKIN_CODE_TTL seconds.
+    """
+    close_checkin(session)
+    ttl = getattr(settings, 'CHECKIN_CODE_TTL', 300)
+    code = ''.join(secrets.choice(CODE_ALPHABET) for _ in range(CODE_LENGTH))
+    roster = frozenset(Enrollment.objects.filter(course=session.course_id).values_list('student_id', flat=True))
+    cache.set_many({
+        CODE_KEY.format(code=code): {'session_id': session.pk, 'roster': roster},
+        SESSION_KEY.format(session_id=session.pk): {'code': code, 'expires': time.time() + ttl},
+    }, ttl)
+    return code
+
+
+def close_checkin(session):
+    current = current_checkin(session)
+    if current is not None:
+        cache.delete_many([CODE_KEY.format(code=current['code']), SESSION_KEY.format(session_id=session.pk)])
+
+
+def current_checkin(session):
+    """Return ``{'code', 'expires'}`` for the open check-in of ``session``, or None."""
+    return cache.get(SESSION_KEY.format(session_id=session.pk))
+
+
+def lookup_code(code):
+    """Return ``{'session_id', 'roster'}`` for an open check-in code, or None if it is unknown or expired."""
+    code = (code or '').strip().upper()
+    if len(code) != CODE_LENGTH:
+        return None
+    return cache.get(CODE_KEY.format(code=code))
+
+
+class CheckinBuffer:
+    """
+    Collect self check-ins in memory and write them in batches from a background thread.
+
+    Repeat check-ins by the same student for the same session collapse into one
+    pending row. Everything pending is written every CHECKIN_FLUSH_INTERVAL
+    seconds, or sooner once CHECKIN_FLUSH_SIZE rows are waiting, with one
+    mark_attendance() transaction per session. With the interval set to None
+    nothing is written until flush() is called.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.pending = set()
+        self.wakeup = threading.Event()
+        self.thread = None
+        self.flushes = 0
+        self.written = 0
+
+    def add(self, session_id, student_id):
+        with self.lock:
+            self.pending.add((session_id, student_id))
+            size = len(self.pending)
+            self.start()
+        if size >= getattr(settings, 'CHECKIN_FLUSH_SIZE', 1000):
+            self.wakeup.set()
+
+    def start(self):
+        if getattr(settings, 'CHECKIN_FLUSH_INTERVAL', 0.25) is None:
+            return
+        if self.thread is None or not self.thread.is_alive():
+            self.thread = threading.Thread(target=self.run, name='checkin-flusher', daemon=True)
+            self.thread.start()
+
+    def run(self):
+        while True:
+            interval = getattr(settings, 'CHECKIN_FLUSH_INTERVAL', 0.25)
+            if interval is None:
+                return
+            self.wakeup.wait(interval)
+            self.wakeup.clear()
+            if self.pending:
+                close_old_connections()
+                try:
+                    self.flush()
+                except Exception:
+                    logger.exception('Check-in flush failed')
+
+    def flush(self):
+        """Write every pending check-in now and return how many were written."""
+        with self.lock:
+            batch, self.pending = self.pending, set()
+        if not batch:
+            return 0
+
+        by_session = defaultdict(list)
+        for session_id, student_id in batch:
+            by_session[session_id].append(student_id)
+        sessions = AttendanceSession.objects.in_bulk(list(by_session))
+
+        written = 0
+        for session_id, student_ids in by_session.items():
+            session = sessions.get(session_id)
+            if session is None:
+                # Deleted after its code was issued.
+                continue
+            try:
+                mark_attendance(session, {student_id: ('present', None) for student_id in student_ids})
+            except DatabaseError:
+                logger.exception('Could not record %d check-in(s) for session %s; retrying', len(student_ids), session_id)
+                with self.lock:
+                    self.pending.update((session_id, student_id) for student_id in student_ids)
+                continue
+            written += len(student_ids)
+
+        with self.lock:
+            self.flushes += 1
+            self.written += written
+        return written
+
+    def stats(self):
+        with self.lock:
+            return {'pending': len(self.pending), 'flushes': self.flushes, 'written': self.written}
+
+
+checkin_buffer = CheckinBuffer()
+
+
+@atexit.register
+def _flush_on_exit():
+    if checkin_buffer.pending:
+        try:
+            checkin_buffer.flush()
+        except Exception:
+            logger.exception('Could not flush check-ins on shutdown')
@@ -0,0 +1,131 @@
+from django.conf import settings
+from django.db import DatabaseError, connections
+from django.db.models import OuterRef, QuerySet, Subquery
+from django.db.models.constants import OnConflict
+
+
+def configure_sqlite(sender, connection, **kwargs):
+    """connection_created receiver: apply SQLITE_PRAGMAS to each new SQLite connection."""
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for name, value in getattr(settings, 'SQLITE_PRAGMAS', {}).items():
+            cursor.execute(f'PRAGMA {name} = {value}')
+
+
+def per_outer_row(queryset, field, aggregate):
+    """
+    Subquery of ``aggregate`` over the rows of ``queryset`` whose ``field`` is the outer query's row.
+
+    Lets one query over e.g. courses or users carry a Max()/Count() per table,
+    each answered from that table's own index on ``field``.
+    """
+    return Subquery(
+        queryset.filter(**{field: OuterRef('pk')})
+        .order_by().values(field).annotate(value=aggregate).values('value')
+    )
+
+
+def insert_from(model, columns, queryset):
+    """INSERT INTO ``model`` (``columns``) the rows selected by ``queryset`` and return how many were written."""
+    connection = connections[queryset.db]
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {connection.ops.quote_name(model._meta.db_table)} "
+            f"({', '.join(connection.ops.quote_name(column) for column in columns)}) {sql}",
+            params,
+        )
+        return cursor.rowcount
+
+
+def delete_rows(model, field, values, using='default'):
+    """
+    DELETE the rows of ``model`` whose ``field`` is in ``values`` and return how many went.
+
+    ``values`` is either a list or a single-column ``values()`` queryset, which
+    is sent as a subquery so however many rows it matches cost no parameters.
+    Unlike QuerySet.delete() nothing is loaded and no signals are sent, so
+    callers that move rows in bulk keep derived data in step themselves.
+    """
+    connection = connections[using]
+    if isinstance(values, QuerySet):
+        placeholders, values = values.query.get_compiler(using=using).as_sql()
+    else:
+        values = list(values)
+        if not values:
+            return 0
+        placeholders = ', '.join(['%s'] * len(values))
+    qn = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"DELETE FROM {qn(model._meta.db_table)} WHERE {qn(model._meta.get_field(field).column)} "
+            f"IN ({placeholders})",
+            values,
+        )
+        return cursor.rowcount
+
+
+def upsert_rows(model, columns, rows, unique_fields, update_fields, defaults=None, using='default'):
+    """
+    INSERT ``rows`` (tuples of ``columns``) into ``model``, overwriting ``update_fields``
+    of rows that collide on ``unique_fields``; returns how many rows were sent.
+
+    ``defaults`` ({column: value}) fills columns that are the same for every row
+    and is prepared for the database once. Row values go to executemany() as
+    they are, so they must already be database-ready (ids, strings); that skips
+    bulk_create()'s per-object and per-value work, which dominates big batches.
+    """
+    connection = connections[using]
+    opts = model._meta
+    defaults = defaults or {}
+    fields = [opts.get_field(name) for name in [*columns, *defaults]]
+    constants = [
+        opts.get_field(name).get_db_prep_save(value, connection) for name, value in defaults.items()
+    ]
+    qn = connection.ops.quote_name
+    sql = 'INSERT INTO {} ({}) VALUES ({}) {}'.format(
+        qn(opts.db_table),
+        ', '.join(qn(field.column) for field in fields),
+        ', '.join(['%s'] * len(fields)),
+        connection.ops.on_conflict_suffix_sql(
+            fields, OnConflict.UPDATE,
+            [opts.get_field(name).column for name in update_fields],
+            [opts.get_field(name).column for name in unique_fields],
+        ),
+    )
+    rows = [(*row, *constants) for row in rows]
+    if rows:
+        with connection.cursor() as cursor:
+            cursor.executemany(sql, rows)
+    return len(rows)
+
+
+def estimated_count(model, using='default'):
+    """
+    Return the planner's row estimate for ``model``'s table, or None when the backend has none.
+
+    PostgreSQL and MySQL keep one in their catalogs; SQLite only has one once
+    ANALYZE has filled sqlite_stat1 (check_query_plans --analyze).
+    """
+    connection = connections[using]
+    table = model._meta.db_table
+    if connection.vendor == 'postgresql':
+        sql, params = 'SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(%s)', [table]
+    elif connection.vendor == 'mysql':
+        sql, params = 'SELECT table_rows FROM information_schema.tables WHERE table_schema = DATABASE() AND table_name = %s', [table]
+    elif connection.vendor == 'sqlite':
+        sql, params = 'SELECT stat FROM sqlite_stat1 WHERE tbl = %s LIMIT 1', [table]
+    else:
+        return None
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            row = cursor.fetchone()
+    except DatabaseError:  # sqlite_stat1 does not exist before the first ANALYZE
+        return None
+    if row is None or row[0] is None:
+        return None
+    # sqlite_stat1.stat starts with the row count; PostgreSQL reports -1 for never-analysed tables.
+    estimate = int(str(row[0]).split()[0])
+    return estimate if estimate >= 0 else None
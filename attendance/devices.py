@@ -0,0 +1,105 @@
+import json
+import zlib
+
+from django.conf import settings
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import AttendanceRecord, MarkingDevice
+
+STATUSES = {status for status, _ in AttendanceRecord.STATUS_CHOICES}
+
+
+class DevicePayloadError(ValueError):
+    """A device request body that cannot be read; ``status`` is the HTTP status to answer with."""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def authenticate_device(request):
+    """Return the active MarkingDevice whose token is in the ``Authorization: Bearer`` header, or None."""
+    scheme, _, token = request.headers.get('Authorization', '').partition(' ')
+    if scheme.lower() != 'bearer' or not token.strip():
+        return None
+    device = (
+        MarkingDevice.objects.filter(token_hash=MarkingDevice.hash_token(token.strip()), is_active=True)
+        .select_related('owner').first()
+    )
+    if device is not None:
+        MarkingDevice.objects.filter(pk=device.pk).update(last_seen_at=timezone.now())
+    return device
+
+
+def read_device_payload(request):
+    """
+    Decode the JSON body of a device request, gunzipping it when sent with
+    ``Content-Encoding: gzip``. Both the body as sent and as decompressed are
+    limited to DEVICE_API_MAX_BODY_BYTES, so a small compressed body cannot
+    expand without bound. The body is read from the request stream rather than
+    ``request.body``, so DATA_UPLOAD_MAX_MEMORY_SIZE does not apply to it.
+    """
+    max_size = getattr(settings, 'DEVICE_API_MAX_BODY_BYTES', 16 * 1024 * 1024)
+    body = request.read(max_size + 1)
+    if len(body) > max_size:
+        raise DevicePayloadError('Body is too large.', status=413)
+    encoding = request.headers.get('Content-Encoding', '').strip().lower()
+    if encoding == 'gzip':
+        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        try:
+            body = decompressor.decompress(body, max_size + 1)
+        except zlib.error:
+            raise DevicePayloadError('Body is not valid gzip.')
+        if len(body) > max_size or decompressor.unconsumed_tail:
+            raise DevicePayloadError('Decompressed body is too large.', status=413)
+    elif encoding not in ('', 'identity'):
+        raise DevicePayloadError(f'Unsupported Content-Encoding {encoding!r}.', status=415)
+    try:
+        return json.loads(body)
+    except ValueError:
+        raise DevicePayloadError('Body is not valid JSON.')
+
+
+def parse_device_events(payload):
+    """
+    Validate ``{"events": [{session_id, student_id, status, timestamp}, ...]}``.
+
+    Returns (events, rejected): events as (index, session_id, student_id,
+    status, timestamp) tuples and rejected as (index, reason) pairs, so one
+    bad event does not fail the batch. ``student_id`` is the student's
+    number (UserProfile.student_id), as printed on their card.
+    """
+    events = payload.get('events') if isinstance(payload, dict) else None
+    if not isinstance(events, list):
+        raise DevicePayloadError('Expected an object with an "events" list.')
+    max_events = getattr(settings, 'DEVICE_API_MAX_EVENTS', 20000)
+    if len(events) > max_events:
+        raise DevicePayloadError(f'At most {max_events} events per batch.', status=413)
+
+    parsed = []
+    rejected = []
+    for index, event in enumerate(events):
+        if not isinstance(event, dict):
+            rejected.append((index, 'not an object'))
+            continue
+        session_id = event.get('session_id')
+        student_id = event.get('student_id')
+        status = event.get('status')
+        try:
+            timestamp = parse_datetime(event['timestamp']) if isinstance(event.get('timestamp'), str) else None
+        except ValueError:  # well formed but not a real date, e.g. February 30th
+            timestamp = None
+        if not isinstance(session_id, int) or isinstance(session_id, bool):
+            rejected.append((index, 'session_id must be an integer'))
+        elif not isinstance(student_id, str) or not student_id.strip():
+            rejected.append((index, 'student_id must be a non-empty string'))
+        elif status not in STATUSES:
+            rejected.append((index, f'status must be one of {", ".join(sorted(STATUSES))}'))
+        elif timestamp is None:
+            rejected.append((index, 'timestamp must be an ISO 8601 date and time'))
+        else:
+            if timezone.is_naive(timestamp):
+                timestamp = timezone.make_aware(timestamp)
+            parsed.append((index, session_id, student_id.strip(), status, timestamp))
+    return parsed, rejected
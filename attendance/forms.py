@@ -1,8 +1,36 @@
 from django import forms
 from django.contrib.auth.models import User
 from django.contrib.auth.forms import UserCreationForm
+from django.urls import reverse
+from .caching import lecturer_course_choices
 from .models import UserProfile, Course, Enrollment, AttendanceSession, AttendanceRecord
 
+
+def student_label(user):
+    return f"{user.get_full_name() or user.username} ({user.profile.student_id})"
+
+class AutocompleteSelect(forms.Select):
+    """
+    Select that renders only the chosen option. The rest are fetched from the
+    JSON endpoint named ``url_name`` as the user types (attendance/autocomplete.html).
+    """
+    def __init__(self, url_name, attrs=None):
+        super().__init__(attrs)
+        self.url_name = url_name
+    
+    def build_attrs(self, base_attrs, extra_attrs=None):
+        attrs = super().build_attrs(base_attrs, extra_attrs)
+        attrs['data-autocomplete-url'] = reverse(self.url_name)
+        return attrs
+    
+    def optgroups(self, name, value, attrs=None):
+        field = self.choices.field
+        selected = [pk for pk in value if str(pk).isdigit()]
+        options = [self.create_option(name, '', field.empty_label or '', not selected, 0)]
+        for index, obj in enumerate(field.queryset.filter(pk__in=selected), start=1):
+            options.append(self.create_option(name, obj.pk, field.label_from_instance(obj), True, index))
+        return [(None, options, 0)]
+
 class UserRegistrationForm(UserCreationForm):
     email = forms.EmailField(required=True)
     first_name = forms.CharField(max_length=30, required=True)
@@ -39,6 +67,10 @@ class EnrollmentForm(forms.ModelForm):
     class Meta:
         model = Enrollment
         fields = ['student', 'course']
+        widgets = {
+            'student': AutocompleteSelect('autocomplete_students'),
+            'course': AutocompleteSelect('autocomplete_courses'),
+        }
     
     def __init__(self, *args, **kwargs):
         lecturer = kwargs.pop('lecturer', None)
@@ -47,7 +79,11 @@ class EnrollmentForm(forms.ModelForm):
         if lecturer:
             self.fields['course'].queryset = Course.objects.filter(lecturer=lecturer)
         
-        self.fields['student'].queryset = User.objects.filter(profile__role='student')
+        self.fields['student'].queryset = User.objects.filter(profile__role='student').select_related('profile')
+        self.fields['student'].label_from_instance = student_label
+
+class RosterImportForm(forms.Form):
+    roster = forms.FileField(help_text='CSV file with one student_id,course_code pair per line.')
 
 class AttendanceSessionForm(forms.ModelForm):
     class Meta:
@@ -64,6 +100,7 @@ class AttendanceSessionForm(forms.ModelForm):
         
         if lecturer:
             self.fields['course'].queryset = Course.objects.filter(lecturer=lecturer)
+            self.fields['course'].choices = [('', self.fields['course'].empty_label)] + lecturer_course_choices(lecturer.pk)
 
 class AttendanceMarkingForm(forms.Form):
     def __init__(self, *args, **kwargs):
@@ -89,3 +126,12 @@ class AttendanceFilterForm(forms.Form):
         choices=[('', 'All Status')] + list(AttendanceRecord.STATUS_CHOICES),
         required=False
     )
+    semester = forms.ChoiceField(choices=[('', 'Current')], required=False)
+    
+    def __init__(self, *args, semesters=(), lecturer=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if lecturer:
+            self.fields['course'].queryset = Course.objects.filter(lecturer=lecturer)
+            self.fields['course'].choices = [('', 'All Courses')] + lecturer_course_choices(lecturer.pk)
+        # Archived semesters are read through from the archive tables.
+        self.fields['semester'].choices = [('', 'Current')] + [(label, f'{label} (archived)') for label in semesters]
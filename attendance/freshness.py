@@ -0,0 +1,105 @@
+import hashlib
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.contrib import messages
+from django.contrib.auth.models import User
+from django.db.models import Count, Max, Subquery
+from django.utils import timezone
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition
+
+from .database import per_outer_row
+from .models import Course, Enrollment, AttendanceSession, AttendanceRecord, SnapshotWatermark
+from .snapshots import SNAPSHOT_NAME
+
+# Path from each table to the user whose pages it feeds, per role.
+SCOPES = {
+    'lecturer': {
+        'records': 'session__course__lecturer',
+        'sessions': 'course__lecturer',
+        'enrollments': 'course__lecturer',
+        'courses': 'lecturer',
+    },
+    'student': {
+        'records': 'student',
+        'sessions': 'course__enrollments__student',
+        'enrollments': 'student',
+        'courses': 'enrollments__student',
+    },
+}
+
+
+def touch_courses(course_ids):
+    """Bump updated_at on ``course_ids`` so user_freshness() sees records or sessions removed from them."""
+    Course.objects.filter(pk__in=set(course_ids)).update(updated_at=timezone.now())
+
+
+def user_freshness(user, role):
+    """
+    Return (fingerprint, last_modified) for the attendance data behind ``user``'s pages, in one query.
+
+    Lecturers are keyed on their courses, students on their enrollments: the
+    latest record mark, session edit and course change, plus enrollment and
+    course counts. Records and sessions are never counted; deleting or
+    archiving them leaves no row for a Max() to find, so it calls
+    touch_courses() instead. Lecturer fingerprints also carry the report
+    snapshot's refresh time.
+    """
+    paths = SCOPES[role]
+    columns = [
+        per_outer_row(AttendanceRecord.objects.all(), paths['records'], Max('marked_at')),
+        per_outer_row(AttendanceSession.objects.all(), paths['sessions'], Max('updated_at')),
+        per_outer_row(Course.objects.all(), paths['courses'], Max('updated_at')),
+        per_outer_row(Enrollment.objects.all(), paths['enrollments'], Count('pk')),
+        per_outer_row(Course.objects.all(), paths['courses'], Count('pk')),
+    ]
+    if role == 'lecturer':
+        columns.append(Subquery(SnapshotWatermark.objects.filter(name=SNAPSHOT_NAME).values('refreshed_at')))
+    fingerprint = User.objects.filter(pk=user.pk).values_list(*columns).get()
+    last_modified = max((value for value in fingerprint[:3] if value is not None), default=None)
+    return fingerprint, last_modified
+
+
+def _validators(request):
+    if not hasattr(request, '_freshness'):
+        request._freshness = (None, None)
+        role = request.principal.role
+        # Pending flash messages only show on a full render.
+        if role in SCOPES and not len(messages.get_messages(request)):
+            fingerprint, last_modified = user_freshness(request.user, role)
+            # The session key changes on login, which also rotates the CSRF token in cached forms.
+            key = repr((request.user.pk, request.session.session_key, fingerprint))
+            request._freshness = (hashlib.md5(key.encode()).hexdigest(), last_modified)
+    return request._freshness
+
+
+def conditional_on_attendance(view):
+    """
+    Answer If-None-Match / If-Modified-Since with 304 while the user's attendance data is unchanged.
+
+    The validators come from user_freshness(), so a revalidated refresh costs
+    one aggregate query instead of the view. Responses are marked private and
+    no-cache, so browsers always revalidate and shared caches never store them.
+    """
+    conditional_view = condition(
+        etag_func=lambda request, *args, **kwargs: _validators(request)[0],
+        last_modified_func=lambda request, *args, **kwargs: _validators(request)[1],
+    )(view)
+
+    if iscoroutinefunction(view):
+        @wraps(view)
+        async def async_wrapper(request, *args, **kwargs):
+            # condition() calls the validator functions synchronously; work them out off the event loop first.
+            await sync_to_async(_validators)(request)
+            response = await conditional_view(request, *args, **kwargs)
+            patch_cache_control(response, private=True, no_cache=True)
+            return response
+        return async_wrapper
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        response = conditional_view(request, *args, **kwargs)
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+    return wrapper
@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from attendance.archive import ARCHIVE_BATCH_SIZE, archive_semester, closed_semesters, restore_semester
+
+
+class Command(BaseCommand):
+    help = (
+        'Move sessions and records of closed semesters into the archive tables, or back with --restore. '
+        'Work is committed in batches, so an interrupted run can simply be repeated.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--semester', action='append', dest='semesters', metavar='YEAR-N',
+                            help='Semester to archive or restore (repeatable); defaults to every closed semester.')
+        parser.add_argument('--restore', action='store_true', help='Move the given semesters back into the hot tables.')
+        parser.add_argument('--batch-size', type=int, default=ARCHIVE_BATCH_SIZE,
+                            help='Sessions moved per transaction.')
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1.')
+        if options['restore'] and not options['semesters']:
+            raise CommandError('--restore needs at least one --semester.')
+
+        semesters = options['semesters'] or closed_semesters()
+        if not semesters:
+            self.stdout.write('No closed semesters left in the hot tables.')
+            return
+        move = restore_semester if options['restore'] else archive_semester
+        for label in semesters:
+            try:
+                summary = move(label, batch_size=options['batch_size'])
+            except ValueError as exc:
+                raise CommandError(str(exc))
+            self.stdout.write(self.style.SUCCESS(
+                f"{'Restored' if options['restore'] else 'Archived'} {label}: {summary.sessions} session(s) and "
+                f"{summary.records} record(s) in {summary.batches} batch(es)."
+            ))
+            if summary.collisions:
+                self.stdout.write(self.style.WARNING(
+                    f"Left {len(summary.collisions)} archived session(s) of {label} in the archive: a live session "
+                    f"already has the same id or course, date and time (ids {', '.join(map(str, summary.collisions))})."
+                ))
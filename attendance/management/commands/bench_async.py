@@ -0,0 +1,47 @@
+import asyncio
+import json
+
+from django.core.asgi import get_asgi_application
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+
+from attendance.benchmarks import asgi_scenarios, pick_subjects, run_asgi_benchmark, session_cookie
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare the sync and async dashboard and reports views under concurrent load, served '
+        'through the ASGI application, and report p50/p95 latency and throughput as JSON.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=100, help='Timed requests per view and mode.')
+        parser.add_argument('--concurrency', type=int, default=10, help='Requests in flight at once.')
+        parser.add_argument('--warmup', type=int, default=5, help='Untimed requests per view and mode.')
+        parser.add_argument('--cold-cache', action='store_true',
+                            help='Disable dashboard caching so every request rebuilds its aggregates.')
+
+    def handle(self, *args, **options):
+        if options['requests'] < 1 or options['concurrency'] < 1:
+            raise CommandError('--requests and --concurrency must be at least 1.')
+        subjects = pick_subjects()
+        if subjects is None:
+            raise CommandError('No sessions with enrolled students to benchmark; run seed_university first.')
+
+        scenarios = [
+            (name, session_cookie(user), sync_path, async_path, query_string)
+            for name, user, sync_path, async_path, query_string in asgi_scenarios(subjects)
+        ]
+        application = get_asgi_application()
+        with override_settings(DASHBOARD_CACHE_TIMEOUT=0 if options['cold_cache'] else 600):
+            # A fresh event loop with no sync caller above it, as under an ASGI server:
+            # each request then gets its own sync thread and database connection.
+            results = asyncio.run(run_asgi_benchmark(
+                application, scenarios, options['requests'], options['concurrency'], options['warmup']))
+
+        self.stdout.write(json.dumps({
+            'requests': options['requests'],
+            'concurrency': options['concurrency'],
+            'cold_cache': options['cold_cache'],
+            'results': results,
+        }, indent=2))
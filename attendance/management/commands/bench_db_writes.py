@@ -0,0 +1,108 @@
+import json
+import os
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connections, transaction
+from django.test.utils import override_settings
+
+BENCH_ALIAS = 'bench_db_writes'
+
+
+class Command(BaseCommand):
+    help = (
+        'Run concurrent writer threads against a scratch SQLite file, once with SQLite defaults and once '
+        'with the tuned profile (SQLITE_PRAGMAS plus BEGIN IMMEDIATE), and report lock errors and throughput.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8, help='Concurrent writer threads.')
+        parser.add_argument('--transactions', type=int, default=200, help='Transactions per thread.')
+
+    def handle(self, *args, **options):
+        if not getattr(settings, 'SQLITE_PRAGMAS', None):
+            raise CommandError('SQLITE_PRAGMAS is empty (SQLITE_TUNING=0), so there is nothing to compare.')
+        if options['threads'] < 1 or options['transactions'] < 1:
+            raise CommandError('--threads and --transactions must be at least 1.')
+
+        profiles = {
+            'default': ({}, {}),
+            'tuned': (settings.SQLITE_PRAGMAS, {'transaction_mode': 'IMMEDIATE'}),
+        }
+        report = {'threads': options['threads'], 'transactions_per_thread': options['transactions']}
+        for name, (pragmas, db_options) in profiles.items():
+            with tempfile.TemporaryDirectory() as directory, override_settings(SQLITE_PRAGMAS=pragmas):
+                report[name] = self.run_profile(
+                    os.path.join(directory, 'bench.sqlite3'), db_options,
+                    options['threads'], options['transactions'],
+                )
+        self.stdout.write(json.dumps(report, indent=2))
+
+    def run_profile(self, path, db_options, threads, transactions):
+        config = dict(connections['default'].settings_dict)
+        config.update({
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': path,
+            'CONN_MAX_AGE': 0,
+            'OPTIONS': db_options,
+        })
+        connections.settings[BENCH_ALIAS] = config
+        try:
+            with connections[BENCH_ALIAS].cursor() as cursor:
+                cursor.execute('CREATE TABLE counter (id INTEGER PRIMARY KEY, value INTEGER NOT NULL)')
+                cursor.execute('CREATE TABLE mark (id INTEGER PRIMARY KEY, writer INTEGER, value INTEGER)')
+                cursor.execute('INSERT INTO counter (id, value) VALUES (1, 0)')
+            connections[BENCH_ALIAS].close()
+
+            committed = [0] * threads
+            lock_errors = [0] * threads
+
+            def writer(index):
+                try:
+                    for _ in range(transactions):
+                        try:
+                            # Read-then-write, the shape of mark_attendance() and the check-in flush.
+                            with transaction.atomic(using=BENCH_ALIAS):
+                                with connections[BENCH_ALIAS].cursor() as cursor:
+                                    cursor.execute('SELECT value FROM counter WHERE id = 1')
+                                    value = cursor.fetchone()[0] + 1
+                                    cursor.execute('UPDATE counter SET value = %s WHERE id = 1', [value])
+                                    cursor.execute('INSERT INTO mark (writer, value) VALUES (%s, %s)', [index, value])
+                            committed[index] += 1
+                        except OperationalError as exc:
+                            if 'locked' not in str(exc):
+                                raise
+                            lock_errors[index] += 1
+                finally:
+                    connections[BENCH_ALIAS].close()
+
+            workers = [threading.Thread(target=writer, args=(index,)) for index in range(threads)]
+            started = time.perf_counter()
+            for worker in workers:
+                worker.start()
+            for worker in workers:
+                worker.join()
+            elapsed = time.perf_counter() - started
+
+            with connections[BENCH_ALIAS].cursor() as cursor:
+                cursor.execute('PRAGMA journal_mode')
+                journal_mode = cursor.fetchone()[0]
+                cursor.execute('SELECT value FROM counter WHERE id = 1')
+                final_value = cursor.fetchone()[0]
+            connections[BENCH_ALIAS].close()
+        finally:
+            del connections[BENCH_ALIAS]
+            del connections.settings[BENCH_ALIAS]
+
+        return {
+            'journal_mode': journal_mode,
+            'transaction_mode': db_options.get('transaction_mode', 'DEFERRED'),
+            'committed': sum(committed),
+            'lock_errors': sum(lock_errors),
+            'lost_updates': sum(committed) - final_value,
+            'seconds': round(elapsed, 3),
+            'transactions_per_second': round(sum(committed) / elapsed, 1),
+        }
@@ -0,0 +1,118 @@
+import gzip
+import json
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.test import Client
+from django.urls import reverse
+from django.utils import timezone
+
+from attendance.models import AttendanceSession, AttendanceRecord, Enrollment, MarkingDevice
+
+
+class Command(BaseCommand):
+    help = (
+        'Post gzipped batches of card reader events for new sessions of the busiest lecturer through the '
+        'device API, then replay them, and report events per second as JSON.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--events', type=int, default=20000, help='Events to send (at most the rosters allow).')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Events per request.')
+        parser.add_argument('--min-events-per-second', type=float, default=10000,
+                            help='Fail when first-time throughput is below this.')
+        parser.add_argument('--keep', action='store_true', help='Keep the generated sessions and records.')
+
+    def handle(self, *args, **options):
+        if options['events'] < 1 or options['batch_size'] < 1:
+            raise CommandError('--events and --batch-size must be at least 1.')
+        lecturer = (
+            User.objects.filter(profile__role='lecturer')
+            .annotate(students=Count('courses_taught__enrollments')).order_by('-students').first()
+        )
+        if lecturer is None or lecturer.students == 0:
+            raise CommandError('No lecturer with enrolled students; run seed_university first.')
+
+        device = MarkingDevice(name='Device API benchmark', owner=lecturer)
+        token = device.issue_token()
+        sessions = []
+        try:
+            events = self.build_events(lecturer, sessions, options['events'])
+            batches = [events[start:start + options['batch_size']] for start in range(0, len(events), options['batch_size'])]
+            bodies = [gzip.compress(json.dumps({'events': batch}).encode()) for batch in batches]
+            client = Client(headers={'authorization': f'Bearer {token}'})
+
+            first = self.post_all(client, bodies)
+            replay = self.post_all(client, bodies)
+            recorded = AttendanceRecord.objects.filter(session__in=sessions).count()
+        finally:
+            device.delete()
+            if not options['keep']:
+                AttendanceSession.objects.filter(pk__in=[session.pk for session in sessions]).delete()
+
+        report = {
+            'database': connection.vendor,
+            'events': len(events),
+            'batch_size': options['batch_size'],
+            'gzip_bytes_per_event': round(sum(len(body) for body in bodies) / len(events), 1),
+            'seconds': round(first['seconds'], 3),
+            'events_per_second': round(len(events) / first['seconds'], 1),
+            'created': first['created'],
+            'replay_seconds': round(replay['seconds'], 3),
+            'replay_events_per_second': round(len(events) / replay['seconds'], 1),
+            'replay_unchanged': replay['unchanged'],
+            'recorded': recorded,
+        }
+        self.stdout.write(json.dumps(report, indent=2))
+        if first['created'] != len(events) or replay['unchanged'] != len(events) or recorded != len(events):
+            raise CommandError('Not every event was recorded exactly once.')
+        if report['events_per_second'] < options['min_events_per_second']:
+            raise CommandError(
+                f"{report['events_per_second']} events/s is below {options['min_events_per_second']}."
+            )
+
+    def build_events(self, lecturer, sessions, count):
+        """Create sessions across the lecturer's courses until their rosters cover ``count`` events."""
+        rosters = {}
+        for course_id, student_id in (
+            Enrollment.objects.filter(course__lecturer=lecturer, student__profile__student_id__isnull=False)
+            .values_list('course_id', 'student__profile__student_id')
+        ):
+            rosters.setdefault(course_id, []).append(student_id)
+        now = timezone.now()
+        events = []
+        while len(events) < count:
+            for course_id, student_ids in rosters.items():
+                session = AttendanceSession.objects.create(
+                    course_id=course_id, session_date=timezone.localdate(), session_time=timezone.localtime().time(),
+                    topic='Device API benchmark', created_by=lecturer,
+                )
+                sessions.append(session)
+                events.extend(
+                    {'session_id': session.pk, 'student_id': student_id,
+                     'status': 'present' if index % 5 else 'late', 'timestamp': now.isoformat()}
+                    for index, student_id in enumerate(student_ids)
+                )
+                if len(events) >= count:
+                    break
+        return events[:count]
+
+    def post_all(self, client, bodies):
+        totals = {'created': 0, 'unchanged': 0}
+        started = time.perf_counter()
+        for body in bodies:
+            response = client.post(
+                reverse('device_attendance'), body, content_type='application/json', headers={'content-encoding': 'gzip'},
+            )
+            if response.status_code != 200:
+                raise CommandError(f'Device API answered {response.status_code}: {response.content[:200]!r}')
+            summary = response.json()
+            if summary['rejected']:
+                raise CommandError(f"Events were rejected: {summary['rejected'][:5]}")
+            for name in totals:
+                totals[name] += summary[name]
+        totals['seconds'] = time.perf_counter() - started
+        return totals
@@ -0,0 +1,60 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from attendance.benchmarks import compare_to_baseline, pick_subjects, run_view_benchmarks
+from attendance.models import Course, Enrollment, AttendanceSession, AttendanceRecord
+
+
+class Command(BaseCommand):
+    help = (
+        'Drive dashboard, reports, attendance_mark and attendance_records through the test client and '
+        'report p50/p95 latency and query counts as JSON, optionally against a stored baseline.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=20, help='Timed requests per view.')
+        parser.add_argument('--warmup', type=int, default=2, help='Untimed requests per view before timing.')
+        parser.add_argument('--cold-cache', action='store_true',
+                            help='Clear the cache before every request so dashboards are always rebuilt.')
+        parser.add_argument('--baseline', metavar='PATH', help='Compare against a previously saved run.')
+        parser.add_argument('--save-baseline', metavar='PATH', help='Write this run to PATH for later comparison.')
+        parser.add_argument('--tolerance', type=float, default=0.2,
+                            help='Allowed p95 slowdown relative to the baseline (default: 0.2 = 20%%).')
+
+    def handle(self, *args, **options):
+        if options['iterations'] < 1:
+            raise CommandError('--iterations must be at least 1.')
+        subjects = pick_subjects()
+        if subjects is None:
+            raise CommandError('No sessions with enrolled students to benchmark; run seed_university first.')
+
+        report = {
+            'dataset': {
+                'courses': Course.objects.count(),
+                'enrollments': Enrollment.objects.count(),
+                'sessions': AttendanceSession.objects.count(),
+                'records': AttendanceRecord.objects.count(),
+            },
+            'iterations': options['iterations'],
+            'cold_cache': options['cold_cache'],
+            'results': run_view_benchmarks(
+                subjects, options['iterations'], options['warmup'], options['cold_cache']),
+        }
+
+        if options['baseline']:
+            try:
+                with open(options['baseline'], encoding='utf-8') as baseline_file:
+                    baseline = json.load(baseline_file)
+            except (OSError, ValueError) as exc:
+                raise CommandError(f"Could not read baseline {options['baseline']}: {exc}")
+            report['regressions'] = compare_to_baseline(
+                report['results'], baseline.get('results', {}), options['tolerance'])
+
+        if options['save_baseline']:
+            with open(options['save_baseline'], 'w', encoding='utf-8') as baseline_file:
+                json.dump(report, baseline_file, indent=2)
+
+        self.stdout.write(json.dumps(report, indent=2))
+        if report.get('regressions'):
+            raise CommandError(f"{len(report['regressions'])} regression(s) against the baseline.")
@@ -0,0 +1,71 @@
+from datetime import date, time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from attendance.models import UserProfile, Course, Enrollment, AttendanceSession
+from attendance.queryplans import view_querysets, inspect_plan
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = "Run EXPLAIN on each view's main querysets and fail if any of them needs a full table scan."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--analyze', action='store_true',
+                            help='Refresh planner statistics with ANALYZE before checking.')
+        parser.add_argument('--show-plans', action='store_true', help='Print the full plan of every queryset.')
+
+    def handle(self, *args, **options):
+        if options['analyze']:
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE')
+
+        failures = []
+        try:
+            # Sample rows are only created when the database has none; roll them back either way.
+            with transaction.atomic():
+                failures = self.check_plans(options['show_plans'])
+                raise Rollback
+        except Rollback:
+            pass
+
+        if failures:
+            raise CommandError(f"Full table scans found in: {', '.join(failures)}")
+        self.stdout.write(self.style.SUCCESS('No full table scans in view querysets.'))
+
+    def check_plans(self, show_plans):
+        failures = []
+        for label, queryset in view_querysets(*self.sample_rows()):
+            scans, sorts, plan = inspect_plan(queryset)
+            if scans:
+                failures.append(label)
+                self.stdout.write(self.style.ERROR(f"FAIL  {label}: full scan of {', '.join(scans)}"))
+            elif sorts:
+                self.stdout.write(self.style.WARNING(f'SORT  {label}: ordering is not served by an index'))
+            else:
+                self.stdout.write(f'ok    {label}')
+            if show_plans or scans:
+                self.stdout.write(plan)
+        return failures
+
+    def sample_rows(self):
+        session = AttendanceSession.objects.select_related('course__lecturer').order_by('pk').first()
+        enrollment = Enrollment.objects.filter(course=session.course).first() if session else None
+        if session and enrollment:
+            return session.course.lecturer, enrollment.student, session.course, session
+
+        lecturer = User.objects.create(username='__plan_lecturer__')
+        UserProfile.objects.create(user=lecturer, role='lecturer')
+        student = User.objects.create(username='__plan_student__')
+        UserProfile.objects.create(user=student, role='student', student_id='__plan__')
+        course = Course.objects.create(course_code='__PLAN__', course_name='Plan check', lecturer=lecturer)
+        Enrollment.objects.create(student=student, course=course)
+        session = AttendanceSession.objects.create(
+            course=course, session_date=date.today(), session_time=time(9, 0), created_by=lecturer,
+        )
+        return lecturer, student, course, session
@@ -0,0 +1,20 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from attendance.models import MarkingDevice
+
+
+class Command(BaseCommand):
+    help = 'Register a card reader for a lecturer and print its API token (shown only once).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('owner', help='Username of the lecturer whose sessions the device may mark.')
+        parser.add_argument('name', help='A label for the device, e.g. its room.')
+
+    def handle(self, *args, **options):
+        owner = User.objects.filter(username=options['owner'], profile__role='lecturer').first()
+        if owner is None:
+            raise CommandError(f"No lecturer with username {options['owner']!r}.")
+        device = MarkingDevice(name=options['name'], owner=owner)
+        token = device.issue_token()
+        self.stdout.write(f'Created device {device} with token:\n{token}')
@@ -0,0 +1,29 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from attendance.services import import_roster, read_roster_csv
+
+
+class Command(BaseCommand):
+    help = 'Enroll students into courses from a CSV of student_id,course_code pairs.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Path to the roster CSV file.')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        with open(options['path'], newline='', encoding='utf-8-sig') as roster:
+            summary = import_roster(read_roster_csv(roster))
+        elapsed = time.perf_counter() - started
+
+        if summary.unknown_students:
+            self.stdout.write(self.style.WARNING(
+                f"Unknown student IDs: {', '.join(sorted(summary.unknown_students))}"))
+        if summary.unknown_courses:
+            self.stdout.write(self.style.WARNING(
+                f"Unknown course codes: {', '.join(sorted(summary.unknown_courses))}"))
+        if summary.invalid_rows:
+            self.stdout.write(self.style.WARNING(
+                f"Invalid rows on lines: {', '.join(map(str, summary.invalid_rows))}"))
+        self.stdout.write(self.style.SUCCESS(f'{summary} in {elapsed:.2f}s.'))
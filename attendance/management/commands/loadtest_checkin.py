@@ -0,0 +1,120 @@
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.contrib.sessions.models import Session
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+from django.db.models import Count
+from django.test import Client
+from django.urls import reverse
+from django.utils import timezone
+
+from attendance.benchmarks import percentile
+from attendance.checkin import checkin_buffer, open_checkin, close_checkin
+from attendance.models import Course, AttendanceSession, AttendanceRecord
+
+
+class Command(BaseCommand):
+    help = (
+        'Simulate a burst of student self check-ins against a new session of the largest course and '
+        'report request latency and how long the buffered writes take to land, as JSON.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--students', type=int, default=500, help='Students checking in (at most the roster).')
+        parser.add_argument('--concurrency', type=int, default=50, help='Check-in requests in flight at once.')
+        parser.add_argument('--window', type=float, default=0,
+                            help='Spread arrivals evenly over this many seconds (default: all at once).')
+        parser.add_argument('--max-p95-ms', type=float, default=500,
+                            help='Fail when the p95 check-in latency exceeds this.')
+        parser.add_argument('--drain-timeout', type=float, default=30,
+                            help='Seconds to wait for buffered check-ins to be written.')
+        parser.add_argument('--keep', action='store_true', help='Keep the generated session and its records.')
+
+    def handle(self, *args, **options):
+        if getattr(settings, 'CHECKIN_FLUSH_INTERVAL', 0.25) is None:
+            raise CommandError('CHECKIN_FLUSH_INTERVAL is None, so check-ins would never be written.')
+        course = Course.objects.annotate(students=Count('enrollments')).order_by('-students').first()
+        if course is None or course.students == 0:
+            raise CommandError('No course with enrolled students; run seed_university first.')
+
+        now = timezone.localtime()
+        session = AttendanceSession.objects.create(
+            course=course, session_date=now.date(), session_time=now.time(),
+            topic='Check-in load test', created_by=course.lecturer,
+        )
+        students = User.objects.filter(enrollments__course=course).order_by('pk')[:options['students']]
+        cookies = {}
+        for student in students:
+            client = Client()
+            client.force_login(student)
+            cookies[student.pk] = client.cookies[settings.SESSION_COOKIE_NAME].value
+        code = open_checkin(session)
+
+        try:
+            report = self.run_burst(session, code, cookies, options)
+        finally:
+            close_checkin(session)
+            Session.objects.filter(session_key__in=cookies.values()).delete()
+            if not options['keep']:
+                session.delete()
+
+        self.stdout.write(json.dumps(report, indent=2))
+        if report['failures']:
+            raise CommandError(f"{report['failures']} check-in request(s) failed.")
+        if report['recorded'] < len(cookies):
+            raise CommandError(f"Only {report['recorded']} of {len(cookies)} check-ins were written.")
+        if report['p95_ms'] > options['max_p95_ms']:
+            raise CommandError(f"p95 latency {report['p95_ms']}ms exceeds {options['max_p95_ms']}ms.")
+
+    def run_burst(self, session, code, cookies, options):
+        url = reverse('attendance_checkin')
+        dashboard = reverse('dashboard')
+        spacing = options['window'] / len(cookies)
+        before = checkin_buffer.stats()
+
+        def check_in(index, session_key):
+            delay = started + index * spacing - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            client = Client()
+            client.cookies[settings.SESSION_COOKIE_NAME] = session_key
+            sent = time.perf_counter()
+            try:
+                response = client.post(url, {'code': code})
+            finally:
+                close_old_connections()
+            return (time.perf_counter() - sent) * 1000, response.status_code == 302 and response.url == dashboard
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['concurrency']) as executor:
+            results = list(executor.map(check_in, range(len(cookies)), cookies.values()))
+        answered = time.perf_counter()
+
+        # The requests ran in this process, so its buffer's counters show when every write has committed.
+        deadline = answered + options['drain_timeout']
+        after = checkin_buffer.stats()
+        while after['written'] - before['written'] < len(cookies) and time.perf_counter() < deadline:
+            time.sleep(0.01)
+            after = checkin_buffer.stats()
+        drained = time.perf_counter()
+        recorded = AttendanceRecord.objects.filter(session=session, status='present').count()
+
+        timings = [elapsed for elapsed, _ in results]
+        return {
+            'course': session.course.course_code,
+            'students': len(cookies),
+            'concurrency': options['concurrency'],
+            'window_seconds': options['window'],
+            'p50_ms': round(percentile(timings, 50), 2),
+            'p95_ms': round(percentile(timings, 95), 2),
+            'max_ms': round(max(timings), 2),
+            'requests_per_second': round(len(cookies) / (answered - started), 1),
+            'failures': sum(1 for _, ok in results if not ok),
+            'recorded': recorded,
+            'drain_seconds': round(drained - answered, 3),
+            'flushes': after['flushes'] - before['flushes'],
+        }
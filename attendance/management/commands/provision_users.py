@@ -0,0 +1,158 @@
+import csv
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from attendance.models import UserProfile
+from attendance.search import index_objects
+
+BATCH_SIZE = 1000
+CSV_COLUMNS = ['username', 'first_name', 'last_name', 'email', 'role', 'student_id', 'phone', 'password']
+ROLES = dict(UserProfile.ROLE_CHOICES)
+
+
+def _init_worker():
+    # Spawned (non-forked) workers start without Django configured.
+    if not django.apps.apps.ready:
+        django.setup()
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        'Create student and lecturer accounts in bulk from a CSV with the columns '
+        + ','.join(CSV_COLUMNS) + '. Passwords are hashed in parallel across all cores.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', nargs='?', help='Path to the accounts CSV file.')
+        parser.add_argument('--workers', type=int, default=os.cpu_count(),
+                            help='Number of password hashing processes (default: all cores).')
+        parser.add_argument('--benchmark', type=int, metavar='N',
+                            help='Provision N synthetic students, report accounts per second, then roll back.')
+
+    def handle(self, *args, **options):
+        if options['benchmark']:
+            accounts = [
+                {'username': f'bench{n:06d}', 'first_name': 'Bench', 'last_name': f'{n:06d}',
+                 'email': '', 'role': 'student', 'student_id': f'BENCH{n:06d}', 'phone': '',
+                 'password': f'bench-password-{n}'}
+                for n in range(options['benchmark'])
+            ]
+        elif options['path']:
+            with open(options['path'], newline='', encoding='utf-8-sig') as accounts_file:
+                accounts = list(csv.DictReader(accounts_file))
+        else:
+            raise CommandError('Provide a CSV path or --benchmark N.')
+
+        accounts, skipped = self.filter_accounts(accounts)
+        for reason in skipped:
+            self.stdout.write(self.style.WARNING(reason))
+
+        started = time.perf_counter()
+        hashes = self.hash_passwords(accounts, options['workers'])
+        hashed = time.perf_counter()
+
+        try:
+            with transaction.atomic():
+                created = self.create_accounts(accounts, hashes)
+                if options['benchmark']:
+                    raise Rollback
+        except Rollback:
+            pass
+        finished = time.perf_counter()
+
+        total = finished - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Provisioned {created} account(s), skipped {len(skipped)}, in {total:.2f}s '
+            f'(hashing {hashed - started:.2f}s, inserts {finished - hashed:.2f}s, '
+            f'{created / total if total else 0:.1f} accounts/s with {options["workers"]} worker(s)).'
+        ))
+
+    def filter_accounts(self, accounts):
+        """Drop invalid rows and rows whose username or student ID already exists (in the DB or the file)."""
+        usernames = set()
+        student_ids = set()
+        for start in range(0, len(accounts), BATCH_SIZE):
+            chunk = accounts[start:start + BATCH_SIZE]
+            usernames.update(User.objects.filter(
+                username__in=[a.get('username', '').strip() for a in chunk]).values_list('username', flat=True))
+            student_ids.update(UserProfile.objects.filter(
+                student_id__in=[a.get('student_id', '').strip() for a in chunk if a.get('student_id', '').strip()]
+            ).values_list('student_id', flat=True))
+
+        kept = []
+        skipped = []
+        for line_number, account in enumerate(accounts, start=2):
+            account = {column: (account.get(column) or '').strip() for column in CSV_COLUMNS}
+            username = account['username']
+            student_id = account['student_id'] if account['role'] == 'student' else ''
+            if not username or account['role'] not in ROLES:
+                skipped.append(f'Line {line_number}: missing username or invalid role.')
+            elif account['role'] == 'student' and not student_id:
+                skipped.append(f'Line {line_number}: student accounts need a student ID.')
+            elif username in usernames:
+                skipped.append(f'Line {line_number}: username {username} already exists.')
+            elif student_id and student_id in student_ids:
+                skipped.append(f'Line {line_number}: student ID {student_id} already exists.')
+            else:
+                usernames.add(username)
+                if student_id:
+                    student_ids.add(student_id)
+                account['student_id'] = student_id or None
+                kept.append(account)
+        return kept, skipped
+
+    def hash_passwords(self, accounts, workers):
+        passwords = [account['password'] for account in accounts]
+        hashes = [None if password else make_password(None) for password in passwords]
+        to_hash = [index for index, password in enumerate(passwords) if password]
+        if not to_hash:
+            return hashes
+
+        chunksize = max(1, len(to_hash) // (workers * 4))
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as executor:
+            for index, encoded in zip(to_hash, executor.map(
+                    make_password, [passwords[i] for i in to_hash], chunksize=chunksize)):
+                hashes[index] = encoded
+        return hashes
+
+    def create_accounts(self, accounts, hashes):
+        created = 0
+        for start in range(0, len(accounts), BATCH_SIZE):
+            chunk = accounts[start:start + BATCH_SIZE]
+            User.objects.bulk_create([
+                User(
+                    username=account['username'],
+                    first_name=account['first_name'],
+                    last_name=account['last_name'],
+                    email=account['email'],
+                    password=encoded,
+                )
+                for account, encoded in zip(chunk, hashes[start:start + BATCH_SIZE])
+            ])
+            # Not every backend returns primary keys from bulk inserts, so look them up.
+            user_ids = dict(User.objects.filter(
+                username__in=[account['username'] for account in chunk]).values_list('username', 'pk'))
+            UserProfile.objects.bulk_create([
+                UserProfile(
+                    user_id=user_ids[account['username']],
+                    role=account['role'],
+                    student_id=account['student_id'],
+                    phone=account['phone'],
+                )
+                for account in chunk
+            ])
+            # bulk_create skips the signals that keep the search index in sync.
+            index_objects('user', User.objects.filter(pk__in=user_ids.values()))
+            created += len(chunk)
+        return created
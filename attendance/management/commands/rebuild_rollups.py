@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from attendance.models import Course, Enrollment
+from attendance.caching import invalidate_dashboards
+from attendance.rollups import rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = 'Recompute per-enrollment attendance rollups from raw attendance records.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--course', action='append', dest='courses', metavar='COURSE_CODE',
+                            help='Only rebuild rollups for this course code (repeatable).')
+
+    def handle(self, *args, **options):
+        enrollments = Enrollment.objects.all()
+        if options['courses']:
+            codes = set(options['courses'])
+            found = set(Course.objects.filter(course_code__in=codes).values_list('course_code', flat=True))
+            if codes - found:
+                raise CommandError(f"Unknown course code(s): {', '.join(sorted(codes - found))}")
+            enrollments = enrollments.filter(course__course_code__in=codes)
+
+        written = rebuild_rollups(enrollments)
+        invalidate_dashboards(course_ids=enrollments.values_list('course_id', flat=True).distinct())
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {written} attendance rollup(s).'))
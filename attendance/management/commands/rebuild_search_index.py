@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from attendance.search import rebuild_search_index
+
+
+class Command(BaseCommand):
+    help = 'Recreate the search index entries for every user, course and session.'
+
+    def handle(self, *args, **options):
+        entries = rebuild_search_index()
+        self.stdout.write(self.style.SUCCESS(f'Indexed {entries} search entr{"y" if entries == 1 else "ies"}.'))
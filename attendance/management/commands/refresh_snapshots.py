@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from attendance.snapshots import refresh_snapshots
+
+
+class Command(BaseCommand):
+    help = (
+        'Refresh the weekly report snapshot, recomputing only course weeks with records or sessions '
+        'newer than the stored watermark or queued by deletions.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true', help='Rebuild every week instead of only changed ones.')
+
+    def handle(self, *args, **options):
+        summary = refresh_snapshots(full=options['full'])
+        self.stdout.write(self.style.SUCCESS(
+            f"{summary['mode'].capitalize()} refresh: {summary['weeks_recomputed']} course week(s) recomputed, "
+            f"{summary['course_weeks']} course and {summary['student_weeks']} student row(s) written; "
+            f"data as of {summary['as_of']:%Y-%m-%d %H:%M:%S %Z}."
+        ))
@@ -0,0 +1,50 @@
+import json
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from attendance.seeding import SEED_PREFIX, UniversitySize, clear_seeded_data, seed_university
+
+DEFAULTS = UniversitySize()
+
+
+class Command(BaseCommand):
+    help = (
+        'Generate a synthetic university (lecturers, courses, students, enrollments, sessions and '
+        'attendance records) deterministically from a seed.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lecturers', type=int, default=DEFAULTS.lecturers)
+        parser.add_argument('--courses', type=int, default=DEFAULTS.courses)
+        parser.add_argument('--students', type=int, default=DEFAULTS.students)
+        parser.add_argument('--courses-per-student', type=int, default=DEFAULTS.courses_per_student,
+                            help='Enrollments generated per student.')
+        parser.add_argument('--sessions-per-course', type=int, default=DEFAULTS.sessions_per_course,
+                            help='Sessions generated per course; every enrolled student gets a record in each.')
+        parser.add_argument('--seed', type=int, default=DEFAULTS.seed)
+        parser.add_argument('--password', default='password123', help='Password shared by every seeded account.')
+        parser.add_argument('--clear', action='store_true', help='Delete previously seeded data first.')
+
+    def handle(self, *args, **options):
+        size = UniversitySize(
+            lecturers=options['lecturers'],
+            courses=options['courses'],
+            students=options['students'],
+            courses_per_student=options['courses_per_student'],
+            sessions_per_course=options['sessions_per_course'],
+            seed=options['seed'],
+        )
+        if min(size.lecturers, size.courses, size.students) < 1:
+            raise CommandError('--lecturers, --courses and --students must all be at least 1.')
+
+        if options['clear']:
+            clear_seeded_data()
+        elif User.objects.filter(username__startswith=SEED_PREFIX).exists():
+            raise CommandError('Seeded data already exists; pass --clear to replace it.')
+
+        started = time.perf_counter()
+        created = seed_university(size, password=options['password'])
+        created['seconds'] = round(time.perf_counter() - started, 2)
+        self.stdout.write(json.dumps(created, indent=2))
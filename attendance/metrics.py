@@ -0,0 +1,143 @@
+import contextvars
+import threading
+import time
+from functools import wraps
+
+from django.template import base as template_base
+
+from .caching import dashboard_cache_stats
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+METRICS = {
+    'attendance_request_duration_seconds': ('Wall time spent handling the request.', DURATION_BUCKETS),
+    'attendance_request_db_queries': ('Database queries issued while handling the request.', QUERY_BUCKETS),
+    'attendance_request_db_seconds': ('Time spent executing SQL for the request.', DURATION_BUCKETS),
+    'attendance_request_template_seconds': ('Time spent rendering templates for the request.', DURATION_BUCKETS),
+}
+
+current_request_stats = contextvars.ContextVar('attendance_request_stats', default=None)
+
+
+class RequestStats:
+    def __init__(self, capture_sql=False):
+        self.queries = 0
+        self.sql_seconds = 0.0
+        self.template_seconds = 0.0
+        self.template_depth = 0
+        self.capture_sql = capture_sql
+        self.statements = []
+
+    def __call__(self, execute, sql, params, many, context):
+        """Database execute wrapper: count and time every statement."""
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.queries += 1
+            self.sql_seconds += elapsed
+            if self.capture_sql and len(self.statements) < 500:
+                self.statements.append((elapsed, sql))
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[index] += 1
+                break
+        self.total += value
+        self.count += 1
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.histograms = {}
+
+    def observe(self, view, stats, duration):
+        values = {
+            'attendance_request_duration_seconds': duration,
+            'attendance_request_db_queries': stats.queries,
+            'attendance_request_db_seconds': stats.sql_seconds,
+            'attendance_request_template_seconds': stats.template_seconds,
+        }
+        with self.lock:
+            for name, value in values.items():
+                key = (name, view)
+                if key not in self.histograms:
+                    self.histograms[key] = Histogram(METRICS[name][1])
+                self.histograms[key].observe(value)
+
+    def reset(self):
+        with self.lock:
+            self.histograms = {}
+
+    def render(self):
+        """Render every histogram, plus the dashboard cache counters, in Prometheus text format."""
+        lines = []
+        with self.lock:
+            for name, (help_text, _) in METRICS.items():
+                series = sorted((view, h) for (metric, view), h in self.histograms.items() if metric == name)
+                lines.append(f'# HELP {name} {help_text}')
+                lines.append(f'# TYPE {name} histogram')
+                for view, histogram in series:
+                    label = f'view="{_escape(view)}"'
+                    cumulative = 0
+                    for bound, count in zip(histogram.buckets, histogram.counts):
+                        cumulative += count
+                        lines.append(f'{name}_bucket{{{label},le="{bound}"}} {cumulative}')
+                    lines.append(f'{name}_bucket{{{label},le="+Inf"}} {histogram.count}')
+                    lines.append(f'{name}_sum{{{label}}} {histogram.total}')
+                    lines.append(f'{name}_count{{{label}}} {histogram.count}')
+
+        for name, value in dashboard_cache_stats().items():
+            metric = f'attendance_dashboard_cache_{name}_total'
+            lines.append(f'# HELP {metric} Dashboard cache {name}.')
+            lines.append(f'# TYPE {metric} counter')
+            lines.append(f'{metric} {value}')
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+registry = MetricsRegistry()
+
+
+def instrument_template_rendering():
+    """
+    Time Template.render for the active request.
+
+    Django only sends its ``template_rendered`` signal under the test runner, so
+    rendering is wrapped directly; nested renders ({% extends %}, {% include %})
+    are counted once, as part of the outermost template.
+    """
+    render = template_base.Template.render
+    if getattr(render, 'attendance_instrumented', False):
+        return
+
+    @wraps(render)
+    def timed_render(self, context):
+        stats = current_request_stats.get()
+        if stats is None or stats.template_depth:
+            return render(self, context)
+        stats.template_depth += 1
+        started = time.perf_counter()
+        try:
+            return render(self, context)
+        finally:
+            stats.template_seconds += time.perf_counter() - started
+            stats.template_depth -= 1
+
+    timed_render.attendance_instrumented = True
+    template_base.Template.render = timed_render
@@ -0,0 +1,201 @@
+import logging
+import time
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.contrib import auth
+from django.contrib.auth import get_user_model
+from django.db import connections, router
+from django.utils.functional import SimpleLazyObject
+
+from .models import UserProfile
+from . import metrics
+
+slow_request_logger = logging.getLogger('attendance.slow_requests')
+
+PRINCIPAL_SESSION_KEY = '_attendance_principal'
+USER_FIELDS = ['id', 'username', 'first_name', 'last_name', 'email', 'is_active', 'is_staff', 'is_superuser']
+PROFILE_FIELDS = ['id', 'user_id', 'role', 'student_id', 'phone']
+
+
+class Principal:
+    """Role and student ID of the requesting user, resolved once per request."""
+
+    def __init__(self, user):
+        profile = getattr(user, 'profile', None) if user.is_authenticated else None
+        self.has_profile = profile is not None
+        self.role = profile.role if profile else None
+        self.student_id = profile.student_id if profile else None
+
+    @property
+    def is_lecturer(self):
+        return self.role == 'lecturer'
+
+    @property
+    def is_student(self):
+        return self.role == 'student'
+
+
+def _from_db(model, field_names, values):
+    # Fields left out are deferred, so a stray save() cannot blank them.
+    ordered = [f.attname for f in model._meta.concrete_fields if f.attname in field_names]
+    return model.from_db(router.db_for_read(model), ordered, [values[name] for name in ordered])
+
+
+def _snapshot(user):
+    snapshot = {
+        'user': {name: getattr(user, name) for name in USER_FIELDS},
+        'profile': None,
+        'session_hash': None,
+        'expires': time.time() + getattr(settings, 'PRINCIPAL_SESSION_CACHE_TTL', 300),
+    }
+    profile = getattr(user, 'profile', None)
+    if profile is not None:
+        snapshot['profile'] = {name: getattr(profile, name) for name in PROFILE_FIELDS}
+    return snapshot
+
+
+def _user_from_snapshot(snapshot):
+    user = _from_db(get_user_model(), USER_FIELDS, snapshot['user'])
+    if snapshot['profile']:
+        user.profile = _from_db(UserProfile, PROFILE_FIELDS, snapshot['profile'])
+    return user
+
+
+def get_session_user(request):
+    """
+    Return the session's user without touching the database when a fresh snapshot exists.
+
+    Snapshots live for PRINCIPAL_SESSION_CACHE_TTL seconds, which bounds how long
+    a password change or deactivation elsewhere takes to end this session.
+    """
+    session = request.session
+    user_id = session.get(auth.SESSION_KEY)
+    session_hash = session.get(auth.HASH_SESSION_KEY)
+    snapshot = session.get(PRINCIPAL_SESSION_KEY)
+    if (user_id is not None and snapshot and snapshot['expires'] > time.time()
+            and str(snapshot['user']['id']) == str(user_id) and snapshot['session_hash'] == session_hash):
+        return _user_from_snapshot(snapshot)
+
+    user = auth.get_user(request)
+    if user.is_authenticated:
+        snapshot = _snapshot(user)
+        snapshot['session_hash'] = session.get(auth.HASH_SESSION_KEY)
+        session[PRINCIPAL_SESSION_KEY] = snapshot
+    else:
+        session.pop(PRINCIPAL_SESSION_KEY, None)
+    return user
+
+
+class PrincipalMiddleware:
+    """
+    Attach ``request.principal`` (role and student ID) for decorators, views and templates.
+
+    Must come after AuthenticationMiddleware. With PRINCIPAL_SESSION_CACHE enabled,
+    ``request.user`` is rebuilt from a short-lived snapshot in the session instead
+    of being queried on every request. Under ASGI the user and principal are
+    resolved up front, since lazy lookups cannot query from async views.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if getattr(settings, 'PRINCIPAL_SESSION_CACHE', False):
+            request.user = SimpleLazyObject(lambda: get_session_user(request))
+        request.principal = SimpleLazyObject(lambda: Principal(request.user))
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        if getattr(settings, 'PRINCIPAL_SESSION_CACHE', False):
+            user = await sync_to_async(get_session_user)(request)
+        else:
+            user = await request.auser()
+
+        async def auser():
+            return user
+
+        request.user = user
+        request.auser = auser
+        request.principal = await sync_to_async(Principal)(user)
+        return await self.get_response(request)
+
+
+class MetricsMiddleware:
+    """
+    Record wall time, query count, SQL time and template time per URL name.
+
+    Place it first in MIDDLEWARE so the numbers cover the whole stack. Requests
+    slower than SLOW_REQUEST_THRESHOLD_MS (when set) are logged with their SQL.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        metrics.instrument_template_rendering()
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        stats = self.start_request()
+        token = metrics.current_request_stats.set(stats)
+        started = time.perf_counter()
+        try:
+            with self.wrap_connections(stats):
+                response = self.get_response(request)
+        finally:
+            metrics.current_request_stats.reset(token)
+        self.finish_request(request, stats, time.perf_counter() - started)
+        return response
+
+    async def __acall__(self, request):
+        stats = self.start_request()
+        token = metrics.current_request_stats.set(stats)
+        started = time.perf_counter()
+        try:
+            # Async ORM calls run on the request's sync thread, whose connections
+            # differ from the event loop's, so the wrappers are installed there.
+            stack = await sync_to_async(self.wrap_connections)(stats)
+            try:
+                response = await self.get_response(request)
+            finally:
+                await sync_to_async(stack.close)()
+        finally:
+            metrics.current_request_stats.reset(token)
+        self.finish_request(request, stats, time.perf_counter() - started)
+        return response
+
+    def start_request(self):
+        return metrics.RequestStats(capture_sql=getattr(settings, 'SLOW_REQUEST_THRESHOLD_MS', None) is not None)
+
+    def wrap_connections(self, stats):
+        stack = ExitStack()
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(stats))
+        return stack
+
+    def finish_request(self, request, stats, duration):
+        threshold = getattr(settings, 'SLOW_REQUEST_THRESHOLD_MS', None)
+        match = request.resolver_match
+        view = match.view_name if match else 'unresolved'
+        metrics.registry.observe(view, stats, duration)
+
+        if threshold is not None and duration * 1000 >= threshold:
+            slow_request_logger.warning(
+                'Slow request %s %s (%s): %.0f ms, %d queries, %.0f ms SQL, %.0f ms templates\n%s',
+                request.method, request.path, view, duration * 1000, stats.queries,
+                stats.sql_seconds * 1000, stats.template_seconds * 1000,
+                '\n'.join(f'[{elapsed * 1000:.1f} ms] {sql}' for elapsed, sql in stats.statements),
+            )
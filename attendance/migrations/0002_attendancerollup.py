@@ -0,0 +1,64 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:56
+
+from collections import Counter, defaultdict
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def populate_rollups(apps, schema_editor):
+    Enrollment = apps.get_model('attendance', 'Enrollment')
+    AttendanceSession = apps.get_model('attendance', 'AttendanceSession')
+    AttendanceRecord = apps.get_model('attendance', 'AttendanceRecord')
+    AttendanceRollup = apps.get_model('attendance', 'AttendanceRollup')
+
+    sessions = dict(
+        AttendanceSession.objects.order_by().values('course')
+        .annotate(total=models.Count('pk')).values_list('course', 'total')
+    )
+    counts = defaultdict(Counter)
+    records = (
+        AttendanceRecord.objects.order_by().values('student', 'session__course', 'status')
+        .annotate(total=models.Count('pk')).values_list('student', 'session__course', 'status', 'total')
+    )
+    for student_id, course_id, status, total in records:
+        counts[(student_id, course_id)][status] = total
+
+    rollups = []
+    for pk, student_id, course_id in Enrollment.objects.values_list('pk', 'student', 'course'):
+        status_counts = counts[(student_id, course_id)]
+        rollups.append(AttendanceRollup(
+            enrollment_id=pk,
+            total_sessions=sessions.get(course_id, 0),
+            present=status_counts['present'],
+            late=status_counts['late'],
+            absent=status_counts['absent'],
+        ))
+    AttendanceRollup.objects.bulk_create(rollups, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AttendanceRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total_sessions', models.IntegerField(default=0)),
+                ('present', models.IntegerField(default=0)),
+                ('late', models.IntegerField(default=0)),
+                ('absent', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('enrollment', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='rollup', to='attendance.enrollment')),
+            ],
+            options={
+                'verbose_name': 'Attendance Rollup',
+                'verbose_name_plural': 'Attendance Rollups',
+            },
+        ),
+        migrations.RunPython(populate_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,75 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:29
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0003_composite_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SnapshotWatermark',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('records_marked_at', models.DateTimeField(blank=True, null=True)),
+                ('sessions_created_at', models.DateTimeField(blank=True, null=True)),
+                ('refreshed_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Snapshot Watermark',
+                'verbose_name_plural': 'Snapshot Watermarks',
+            },
+        ),
+        migrations.CreateModel(
+            name='SnapshotInvalidation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('week', models.DateField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='attendance.course')),
+            ],
+            options={
+                'verbose_name': 'Snapshot Invalidation',
+                'verbose_name_plural': 'Snapshot Invalidations',
+            },
+        ),
+        migrations.CreateModel(
+            name='CourseWeekSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('week', models.DateField(help_text='Monday of the week')),
+                ('sessions', models.IntegerField(default=0)),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='week_snapshots', to='attendance.course')),
+            ],
+            options={
+                'verbose_name': 'Course Week Snapshot',
+                'verbose_name_plural': 'Course Week Snapshots',
+                'unique_together': {('course', 'week')},
+            },
+        ),
+        migrations.CreateModel(
+            name='StudentWeekSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('week', models.DateField(help_text='Monday of the week')),
+                ('present', models.IntegerField(default=0)),
+                ('late', models.IntegerField(default=0)),
+                ('absent', models.IntegerField(default=0)),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='student_week_snapshots', to='attendance.course')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='week_snapshots', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Student Week Snapshot',
+                'verbose_name_plural': 'Student Week Snapshots',
+                'indexes': [models.Index(fields=['course', 'week'], name='snapshot_course_week_idx')],
+                'unique_together': {('course', 'student', 'week')},
+            },
+        ),
+    ]
@@ -0,0 +1,114 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:37
+
+from django.db import OperationalError, migrations, models
+
+FTS_TABLE = 'attendance_searchentry_fts'
+
+SQLITE_SQL = [
+    f"""CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(
+        kind, text, content='attendance_searchentry', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )""",
+    f"""CREATE TRIGGER attendance_searchentry_ai AFTER INSERT ON attendance_searchentry BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, kind, text) VALUES (new.id, new.kind, new.text);
+    END""",
+    f"""CREATE TRIGGER attendance_searchentry_ad AFTER DELETE ON attendance_searchentry BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, kind, text) VALUES ('delete', old.id, old.kind, old.text);
+    END""",
+    f"""CREATE TRIGGER attendance_searchentry_au AFTER UPDATE ON attendance_searchentry BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, kind, text) VALUES ('delete', old.id, old.kind, old.text);
+        INSERT INTO {FTS_TABLE}(rowid, kind, text) VALUES (new.id, new.kind, new.text);
+    END""",
+]
+SQLITE_DROP_SQL = [
+    'DROP TRIGGER IF EXISTS attendance_searchentry_ai',
+    'DROP TRIGGER IF EXISTS attendance_searchentry_ad',
+    'DROP TRIGGER IF EXISTS attendance_searchentry_au',
+    f'DROP TABLE IF EXISTS {FTS_TABLE}',
+]
+POSTGRESQL_SQL = [
+    'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+    'CREATE INDEX attendance_searchentry_text_trgm ON attendance_searchentry USING gin (text gin_trgm_ops)',
+]
+POSTGRESQL_DROP_SQL = ['DROP INDEX IF EXISTS attendance_searchentry_text_trgm']
+
+
+def _execute(schema_editor, statements):
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+def create_text_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        try:
+            _execute(schema_editor, SQLITE_SQL[:1])
+        except OperationalError:
+            # SQLite built without FTS5: searches fall back to LIKE on the plain table.
+            return
+        _execute(schema_editor, SQLITE_SQL[1:])
+    elif vendor == 'postgresql':
+        _execute(schema_editor, POSTGRESQL_SQL)
+
+
+def drop_text_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        _execute(schema_editor, SQLITE_DROP_SQL)
+    elif vendor == 'postgresql':
+        _execute(schema_editor, POSTGRESQL_DROP_SQL)
+
+
+def populate_entries(apps, schema_editor):
+    User = apps.get_model('auth', 'User')
+    Course = apps.get_model('attendance', 'Course')
+    AttendanceSession = apps.get_model('attendance', 'AttendanceSession')
+    SearchEntry = apps.get_model('attendance', 'SearchEntry')
+
+    entries = []
+    for pk, username, first_name, last_name, email, student_id in User.objects.values_list(
+            'pk', 'username', 'first_name', 'last_name', 'email', 'profile__student_id'):
+        name = f'{first_name} {last_name}'.strip() or username
+        entries.append(SearchEntry(
+            kind='user', object_id=pk,
+            title=f'{name} ({student_id})' if student_id else name,
+            text=' '.join(filter(None, [username, first_name, last_name, email, student_id])),
+        ))
+    for pk, code, name, description in Course.objects.values_list('pk', 'course_code', 'course_name', 'description'):
+        entries.append(SearchEntry(
+            kind='course', object_id=pk, title=f'{code} - {name}', text=' '.join(filter(None, [code, name, description])),
+        ))
+    for pk, code, session_date, topic in AttendanceSession.objects.values_list(
+            'pk', 'course__course_code', 'session_date', 'topic'):
+        entries.append(SearchEntry(
+            kind='session', object_id=pk, title=' '.join(filter(None, [code, session_date.isoformat(), topic])),
+            text=' '.join(filter(None, [code, session_date.isoformat(), topic])),
+        ))
+    SearchEntry.objects.bulk_create(entries, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0005_semester_archive'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('user', 'User'), ('course', 'Course'), ('session', 'Session')], max_length=10)),
+                ('object_id', models.BigIntegerField()),
+                ('title', models.CharField(max_length=300)),
+                ('text', models.TextField()),
+            ],
+            options={
+                'verbose_name': 'Search Entry',
+                'verbose_name_plural': 'Search Entries',
+                'unique_together': {('kind', 'object_id')},
+            },
+        ),
+        migrations.RunPython(create_text_index, drop_text_index),
+        migrations.RunPython(populate_entries, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0008_record_freshness_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='attendancerecord',
+            name='event_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+    ]
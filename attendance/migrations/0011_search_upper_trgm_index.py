@@ -0,0 +1,38 @@
+from django.db import migrations
+
+# The non-SQLite search fallback filters on UPPER(text) LIKE '%TOKEN%', so the
+# trigram index has to be on that expression for PostgreSQL to use it.
+POSTGRESQL_SQL = [
+    'DROP INDEX IF EXISTS attendance_searchentry_text_trgm',
+    'CREATE INDEX attendance_searchentry_upper_text_trgm ON attendance_searchentry '
+    'USING gin ((UPPER(text)) gin_trgm_ops)',
+]
+POSTGRESQL_REVERSE_SQL = [
+    'DROP INDEX IF EXISTS attendance_searchentry_upper_text_trgm',
+    'CREATE INDEX attendance_searchentry_text_trgm ON attendance_searchentry USING gin (text gin_trgm_ops)',
+]
+
+
+def _execute(schema_editor, statements):
+    if schema_editor.connection.vendor == 'postgresql':
+        for statement in statements:
+            schema_editor.execute(statement)
+
+
+def create_upper_index(apps, schema_editor):
+    _execute(schema_editor, POSTGRESQL_SQL)
+
+
+def restore_plain_index(apps, schema_editor):
+    _execute(schema_editor, POSTGRESQL_REVERSE_SQL)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0010_session_updated_at'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_upper_index, restore_plain_index),
+    ]
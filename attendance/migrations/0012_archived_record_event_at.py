@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0011_search_upper_trgm_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='archivedrecord',
+            name='event_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+    ]
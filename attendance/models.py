@@ -1,4 +1,8 @@
+import hashlib
+import secrets
+
 from django.db import models
+from django.db.models.functions import Now
 from django.contrib.auth.models import User
 from django.utils import timezone
 
@@ -41,6 +45,9 @@ class Course(models.Model):
     
     class Meta:
         ordering = ['course_code']
+        indexes = [
+            models.Index(fields=['lecturer', 'course_code'], name='course_lecturer_code_idx'),
+        ]
         verbose_name = 'Course'
         verbose_name_plural = 'Courses'
 
@@ -56,6 +63,10 @@ class Enrollment(models.Model):
     class Meta:
         unique_together = ['student', 'course']
         ordering = ['-enrolled_at']
+        indexes = [
+            models.Index(fields=['student', '-enrolled_at'], name='enrollment_student_idx'),
+            models.Index(fields=['course', '-enrolled_at'], name='enrollment_course_idx'),
+        ]
         verbose_name = 'Enrollment'
         verbose_name_plural = 'Enrollments'
 
@@ -67,6 +78,8 @@ class AttendanceSession(models.Model):
     topic = models.CharField(max_length=200, blank=True)
     created_by = models.ForeignKey(User, on_delete=models.CASCADE)
     created_at = models.DateTimeField(auto_now_add=True)
+    # db_default covers the raw INSERT ... SELECT that restores archived sessions.
+    updated_at = models.DateTimeField(auto_now=True, db_default=Now())
     
     def __str__(self):
         return f"{self.course.course_code} - {self.session_date} {self.session_time}"
@@ -80,6 +93,9 @@ class AttendanceSession(models.Model):
     class Meta:
         ordering = ['-session_date', '-session_time']
         unique_together = ['course', 'session_date', 'session_time']
+        indexes = [
+            models.Index(fields=['created_by', '-session_date', '-session_time'], name='session_creator_date_idx'),
+        ]
         verbose_name = 'Attendance Session'
         verbose_name_plural = 'Attendance Sessions'
 
@@ -96,6 +112,8 @@ class AttendanceRecord(models.Model):
     status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='absent')
     remarks = models.TextField(blank=True)
     marked_at = models.DateTimeField(auto_now=True)
+    # Device clock time of the last card reader event for this record; None if only marked in the app.
+    event_at = models.DateTimeField(null=True, blank=True, editable=False)
     
     def __str__(self):
         return f"{self.student.get_full_name()} - {self.session.course.course_code} - {self.status}"
@@ -103,5 +121,193 @@ class AttendanceRecord(models.Model):
     class Meta:
         unique_together = ['session', 'student']
         ordering = ['-marked_at']
+        indexes = [
+            models.Index(fields=['student', 'status', 'session'], name='record_student_status_idx'),
+            # marked_at makes it covering for the per-course freshness checks too.
+            models.Index(fields=['session', 'status', 'marked_at'], name='record_session_status_idx'),
+        ]
         verbose_name = 'Attendance Record'
         verbose_name_plural = 'Attendance Records'
+
+
+class AttendanceRollup(models.Model):
+    enrollment = models.OneToOneField(Enrollment, on_delete=models.CASCADE, related_name='rollup')
+    total_sessions = models.IntegerField(default=0)
+    present = models.IntegerField(default=0)
+    late = models.IntegerField(default=0)
+    absent = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"Rollup for {self.enrollment}"
+    
+    def get_attendance_rate(self):
+        rate = (self.present / self.total_sessions * 100) if self.total_sessions > 0 else 0
+        return round(rate, 1)
+    
+    class Meta:
+        verbose_name = 'Attendance Rollup'
+        verbose_name_plural = 'Attendance Rollups'
+
+
+class CourseWeekSnapshot(models.Model):
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='week_snapshots')
+    week = models.DateField(help_text='Monday of the week')
+    sessions = models.IntegerField(default=0)
+    
+    def __str__(self):
+        return f"{self.course.course_code} - week of {self.week}"
+    
+    class Meta:
+        unique_together = ['course', 'week']
+        verbose_name = 'Course Week Snapshot'
+        verbose_name_plural = 'Course Week Snapshots'
+
+
+class StudentWeekSnapshot(models.Model):
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='student_week_snapshots')
+    student = models.ForeignKey(User, on_delete=models.CASCADE, related_name='week_snapshots')
+    week = models.DateField(help_text='Monday of the week')
+    present = models.IntegerField(default=0)
+    late = models.IntegerField(default=0)
+    absent = models.IntegerField(default=0)
+    
+    def __str__(self):
+        return f"{self.student.get_full_name()} - {self.course.course_code} - week of {self.week}"
+    
+    class Meta:
+        unique_together = ['course', 'student', 'week']
+        indexes = [
+            models.Index(fields=['course', 'week'], name='snapshot_course_week_idx'),
+        ]
+        verbose_name = 'Student Week Snapshot'
+        verbose_name_plural = 'Student Week Snapshots'
+
+
+class SnapshotInvalidation(models.Model):
+    """A course week whose snapshot must be recomputed because rows were deleted or moved out of it."""
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='+')
+    week = models.DateField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        verbose_name = 'Snapshot Invalidation'
+        verbose_name_plural = 'Snapshot Invalidations'
+
+
+class SnapshotWatermark(models.Model):
+    name = models.CharField(max_length=50, unique=True)
+    records_marked_at = models.DateTimeField(null=True, blank=True)
+    sessions_created_at = models.DateTimeField(null=True, blank=True)
+    refreshed_at = models.DateTimeField(null=True, blank=True)
+    
+    def __str__(self):
+        return f"{self.name} as of {self.refreshed_at}"
+    
+    class Meta:
+        verbose_name = 'Snapshot Watermark'
+        verbose_name_plural = 'Snapshot Watermarks'
+
+
+class ArchivedSession(models.Model):
+    """An AttendanceSession moved out of the hot table with its semester; keeps its original id."""
+    id = models.BigIntegerField(primary_key=True)
+    semester = models.CharField(max_length=10)
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='archived_sessions')
+    session_date = models.DateField()
+    session_time = models.TimeField()
+    topic = models.CharField(max_length=200, blank=True)
+    created_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    created_at = models.DateTimeField()
+    
+    def __str__(self):
+        return f"{self.course.course_code} - {self.session_date} {self.session_time} ({self.semester})"
+    
+    class Meta:
+        ordering = ['-session_date', '-session_time']
+        indexes = [
+            models.Index(fields=['semester', 'course'], name='archived_session_semester_idx'),
+        ]
+        verbose_name = 'Archived Session'
+        verbose_name_plural = 'Archived Sessions'
+
+
+class ArchivedRecord(models.Model):
+    """An AttendanceRecord moved out of the hot table with its session; keeps its original id."""
+    id = models.BigIntegerField(primary_key=True)
+    session = models.ForeignKey(ArchivedSession, on_delete=models.CASCADE, related_name='attendance_records')
+    student = models.ForeignKey(User, on_delete=models.CASCADE, related_name='archived_attendance_records')
+    status = models.CharField(max_length=10, choices=AttendanceRecord.STATUS_CHOICES)
+    remarks = models.TextField(blank=True)
+    marked_at = models.DateTimeField()
+    event_at = models.DateTimeField(null=True, blank=True, editable=False)
+    
+    def __str__(self):
+        return f"{self.student.get_full_name()} - {self.session.course.course_code} - {self.status}"
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['student', 'session'], name='archived_record_student_idx'),
+        ]
+        verbose_name = 'Archived Record'
+        verbose_name_plural = 'Archived Records'
+
+
+class SearchEntry(models.Model):
+    """
+    One searchable row per user, course or session, kept in sync by signals.
+
+    ``text`` is indexed by an FTS5 table on SQLite or a trigram index on
+    PostgreSQL (see attendance.search); ``title`` is what search results show.
+    """
+    KIND_CHOICES = (
+        ('user', 'User'),
+        ('course', 'Course'),
+        ('session', 'Session'),
+    )
+    
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    object_id = models.BigIntegerField()
+    title = models.CharField(max_length=300)
+    text = models.TextField()
+    
+    def __str__(self):
+        return f"{self.kind}: {self.title}"
+    
+    class Meta:
+        unique_together = ['kind', 'object_id']
+        verbose_name = 'Search Entry'
+        verbose_name_plural = 'Search Entries'
+
+
+class MarkingDevice(models.Model):
+    """
+    A card reader or other device that posts attendance for its owner's sessions.
+
+    Only a SHA-256 hash of the device's bearer token is stored; the token itself
+    is shown once, when issue_token() creates it.
+    """
+    name = models.CharField(max_length=100)
+    owner = models.ForeignKey(User, on_delete=models.CASCADE, related_name='marking_devices', limit_choices_to={'profile__role': 'lecturer'})
+    token_hash = models.CharField(max_length=64, unique=True, editable=False)
+    is_active = models.BooleanField(default=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_seen_at = models.DateTimeField(null=True, blank=True)
+    
+    def __str__(self):
+        return f"{self.name} ({self.owner.username})"
+    
+    @staticmethod
+    def hash_token(token):
+        return hashlib.sha256(token.encode()).hexdigest()
+    
+    def issue_token(self):
+        """Replace the device's token with a new random one, save, and return it."""
+        token = secrets.token_urlsafe(32)
+        self.token_hash = self.hash_token(token)
+        self.save()
+        return token
+    
+    class Meta:
+        verbose_name = 'Marking Device'
+        verbose_name_plural = 'Marking Devices'
@@ -0,0 +1,55 @@
+import re
+
+from django.db import connections
+
+from .models import Course, Enrollment, AttendanceSession, AttendanceRecord
+from .reporting import course_report_queryset
+from .services import marking_roster_queryset, roster_ids_queryset
+
+# SQLite reports "SCAN <table>" for a full table scan and "SCAN <table> USING
+# [COVERING] INDEX ..." for an index walk; PostgreSQL reports "Seq Scan on <table>".
+SQLITE_FULL_SCAN = re.compile(r'\bSCAN (?!CONSTANT ROW)(\w+)(?! USING)(?:\s|$)')
+POSTGRES_FULL_SCAN = re.compile(r'Seq Scan on (\w+)')
+SORT_STEP = re.compile(r'USE TEMP B-TREE FOR ORDER BY|\bSort\b')
+
+
+def view_querysets(lecturer, student, course, session):
+    """The main querysets issued by the views in ``attendance.views``, keyed by view and purpose."""
+    return [
+        ('dashboard: lecturer courses', Course.objects.filter(lecturer=lecturer)),
+        ('dashboard: lecturer enrollments', Enrollment.objects.filter(course__lecturer=lecturer)),
+        ('dashboard: recent sessions', AttendanceSession.objects.filter(
+            created_by=lecturer).order_by('-session_date', '-session_time')),
+        ('dashboard: student rollups', Enrollment.objects.filter(
+            student=student).select_related('course', 'rollup')),
+        ('course_list: lecturer', Course.objects.filter(lecturer=lecturer)),
+        ('course_list: student', Enrollment.objects.filter(student=student).select_related('course')),
+        ('enrollment_list: lecturer', Enrollment.objects.filter(
+            course__lecturer=lecturer).order_by('-enrolled_at', '-pk')),
+        ('enrollment_list: student', Enrollment.objects.filter(student=student).order_by('-enrolled_at', '-pk')),
+        ('attendance_session_list: lecturer', AttendanceSession.objects.filter(
+            created_by=lecturer).order_by('-session_date', '-session_time', '-pk')),
+        ('attendance_session_list: student', AttendanceSession.objects.filter(
+            course__enrollments__student=student).distinct().order_by('-session_date', '-session_time', '-pk')),
+        ('attendance_mark: roster', marking_roster_queryset(session)),
+        ('attendance_mark: roster ids', roster_ids_queryset(session)),
+        ('attendance_mark: existing records', AttendanceRecord.objects.filter(session=session).order_by()),
+        ('attendance_records: student', AttendanceRecord.objects.filter(
+            student=student).select_related('session__course').order_by('-session__session_date', '-pk')),
+        ('attendance_records: student matrix records', AttendanceRecord.objects.filter(
+            student=student, status='present').order_by().values_list('session_id', flat=True)),
+        ('attendance_records: student matrix sessions', AttendanceSession.objects.filter(
+            course__enrollments__student=student).order_by('course__course_code', 'session_date', 'session_time')),
+        ('attendance_records: lecturer', AttendanceRecord.objects.filter(
+            session__course__lecturer=lecturer).order_by('-session__session_date', '-pk')),
+        ('attendance_records: lecturer by course', AttendanceRecord.objects.filter(
+            session__course=course, status='present').order_by('-session__session_date')),
+        ('reports: course report', course_report_queryset(course)),
+    ]
+
+
+def inspect_plan(queryset):
+    """Return (tables read by a full table scan, whether the plan sorts, raw plan) for ``queryset``."""
+    plan = queryset.explain()
+    pattern = POSTGRES_FULL_SCAN if connections[queryset.db].vendor == 'postgresql' else SQLITE_FULL_SCAN
+    return sorted(set(pattern.findall(plan))), bool(SORT_STEP.search(plan)), plan
@@ -0,0 +1,104 @@
+from dataclasses import dataclass
+
+from django.contrib.auth.models import User
+from django.db.models import Count, F, IntegerField, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from .models import Enrollment, AttendanceSession, AttendanceRecord
+
+
+@dataclass
+class ReportRow:
+    student: User
+    student_id: str
+    total_sessions: int
+    present: int
+    absent: int
+    late: int
+
+    @property
+    def attendance_rate(self):
+        rate = (self.present / self.total_sessions * 100) if self.total_sessions > 0 else 0
+        return round(rate, 1)
+
+
+def _status_count(status):
+    return Count(
+        'student__attendance_records',
+        filter=Q(
+            student__attendance_records__session__course=F('course'),
+            student__attendance_records__status=status,
+        ),
+    )
+
+
+def annotate_attendance_counts(enrollments):
+    """Annotate an Enrollment queryset with total_sessions, present, absent and late for its course."""
+    total_sessions = (
+        AttendanceSession.objects.filter(course=OuterRef('course'))
+        .order_by()
+        .values('course')
+        .annotate(total=Count('pk'))
+        .values('total')
+    )
+    return enrollments.annotate(
+        total_sessions=Coalesce(Subquery(total_sessions, output_field=IntegerField()), Value(0)),
+        present=_status_count('present'),
+        absent=_status_count('absent'),
+        late=_status_count('late'),
+    )
+
+
+def course_report_queryset(course):
+    return annotate_attendance_counts(
+        Enrollment.objects.filter(course=course, student__profile__role='student')
+        .select_related('student__profile')
+    ).order_by('student__last_name', 'student__first_name', 'student__username')
+
+
+def _report_row(enrollment):
+    return ReportRow(
+        student=enrollment.student,
+        student_id=enrollment.student.profile.student_id,
+        total_sessions=enrollment.total_sessions,
+        present=enrollment.present,
+        absent=enrollment.absent,
+        late=enrollment.late,
+    )
+
+
+def build_course_report(course):
+    """Return one ReportRow per student enrolled in ``course`` using a single grouped query."""
+    return [_report_row(enrollment) for enrollment in course_report_queryset(course)]
+
+
+async def abuild_course_report(course):
+    """Async version of :func:`build_course_report`."""
+    return [_report_row(enrollment) async for enrollment in course_report_queryset(course).aiterator()]
+
+
+def build_attendance_matrix(student):
+    """
+    Return {course_code: {'dates': [...], 'statuses': [...]}} for every course ``student`` is enrolled in.
+
+    ``dates`` are ISO session dates in chronological order and ``statuses`` is the
+    parallel array of codes (1 present, 0 otherwise) used by the trend charts.
+    Two queries are issued regardless of how many courses or sessions there are.
+    """
+    present = set(
+        AttendanceRecord.objects.filter(student=student, status='present')
+        .order_by()
+        .values_list('session_id', flat=True)
+    )
+    sessions = (
+        AttendanceSession.objects.filter(course__enrollments__student=student)
+        .order_by('course__course_code', 'session_date', 'session_time')
+        .values_list('pk', 'course__course_code', 'session_date')
+    )
+
+    matrix = {}
+    for session_id, course_code, session_date in sessions:
+        row = matrix.setdefault(course_code, {'dates': [], 'statuses': []})
+        row['dates'].append(session_date.strftime('%Y-%m-%d'))
+        row['statuses'].append(1 if session_id in present else 0)
+    return matrix
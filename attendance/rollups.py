@@ -0,0 +1,95 @@
+from collections import defaultdict
+
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Enrollment, AttendanceRollup
+from .reporting import annotate_attendance_counts
+
+ROLLUP_FIELDS = ['total_sessions', 'present', 'late', 'absent']
+ROLLUP_BATCH_SIZE = 500
+
+
+def apply_status_changes(course_id, changes):
+    """
+    Adjust rollups for ``changes``, an iterable of (student_id, old_status, new_status).
+
+    ``None`` stands for "no record", so creating a record is (student, None, status)
+    and deleting one is (student, status, None). Changes are grouped by transition,
+    so marking a whole roster costs a handful of UPDATE statements.
+    """
+    grouped = defaultdict(list)
+    for student_id, old_status, new_status in changes:
+        if old_status != new_status:
+            grouped[(old_status, new_status)].append(student_id)
+
+    for (old_status, new_status), student_ids in grouped.items():
+        updates = {'updated_at': timezone.now()}
+        if old_status:
+            updates[old_status] = F(old_status) - 1
+        if new_status:
+            updates[new_status] = F(new_status) + 1
+        for start in range(0, len(student_ids), ROLLUP_BATCH_SIZE):
+            AttendanceRollup.objects.filter(
+                enrollment__course_id=course_id,
+                enrollment__student_id__in=student_ids[start:start + ROLLUP_BATCH_SIZE],
+            ).update(**updates)
+
+
+def apply_status_deltas(course_id, deltas):
+    """
+    Adjust rollups by ``deltas``, {(student_id, status): change}, for changes
+    spanning many sessions at once. Students sharing the same change are
+    updated together.
+    """
+    grouped = defaultdict(list)
+    for (student_id, status), change in deltas.items():
+        if change:
+            grouped[(status, change)].append(student_id)
+
+    for (status, change), student_ids in grouped.items():
+        for start in range(0, len(student_ids), ROLLUP_BATCH_SIZE):
+            AttendanceRollup.objects.filter(
+                enrollment__course_id=course_id,
+                enrollment__student_id__in=student_ids[start:start + ROLLUP_BATCH_SIZE],
+            ).update(**{status: F(status) + change, 'updated_at': timezone.now()})
+
+
+def apply_session_change(course_id, delta):
+    AttendanceRollup.objects.filter(enrollment__course_id=course_id).update(
+        total_sessions=F('total_sessions') + delta,
+        updated_at=timezone.now(),
+    )
+
+
+def rebuild_rollups(enrollments=None):
+    """Recompute rollups from raw attendance rows and return how many were written."""
+    if enrollments is None:
+        enrollments = Enrollment.objects.all()
+
+    counted = annotate_attendance_counts(enrollments.order_by()).values('pk', *ROLLUP_FIELDS)
+    now = timezone.now()
+    written = 0
+    batch = []
+    for row in counted.iterator(chunk_size=ROLLUP_BATCH_SIZE):
+        batch.append(AttendanceRollup(
+            enrollment_id=row['pk'],
+            updated_at=now,
+            **{name: row[name] for name in ROLLUP_FIELDS},
+        ))
+        if len(batch) >= ROLLUP_BATCH_SIZE:
+            written += _upsert(batch)
+            batch = []
+    if batch:
+        written += _upsert(batch)
+    return written
+
+
+def _upsert(rollups):
+    AttendanceRollup.objects.bulk_create(
+        rollups,
+        update_conflicts=True,
+        unique_fields=['enrollment'],
+        update_fields=ROLLUP_FIELDS + ['updated_at'],
+    )
+    return len(rollups)
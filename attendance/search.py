@@ -0,0 +1,156 @@
+import re
+
+from django.contrib.auth.models import User
+from django.db import connections, transaction
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Upper
+
+from .models import Course, AttendanceSession, SearchEntry
+
+FTS_TABLE = 'attendance_searchentry_fts'
+INDEX_BATCH_SIZE = 1000
+TOKEN_RE = re.compile(r'\w+')
+
+_fts_tables = {}
+
+
+def _user_entries(users):
+    rows = users.values_list('pk', 'username', 'first_name', 'last_name', 'email', 'profile__student_id')
+    for pk, username, first_name, last_name, email, student_id in rows.iterator(chunk_size=INDEX_BATCH_SIZE):
+        name = f'{first_name} {last_name}'.strip() or username
+        yield SearchEntry(
+            kind='user', object_id=pk,
+            title=f'{name} ({student_id})' if student_id else name,
+            text=' '.join(filter(None, [username, first_name, last_name, email, student_id])),
+        )
+
+
+def _course_entries(courses):
+    rows = courses.values_list('pk', 'course_code', 'course_name', 'description')
+    for pk, code, name, description in rows.iterator(chunk_size=INDEX_BATCH_SIZE):
+        yield SearchEntry(
+            kind='course', object_id=pk, title=f'{code} - {name}',
+            text=' '.join(filter(None, [code, name, description])),
+        )
+
+
+def _session_entries(sessions):
+    rows = sessions.values_list('pk', 'course__course_code', 'session_date', 'topic')
+    for pk, code, session_date, topic in rows.iterator(chunk_size=INDEX_BATCH_SIZE):
+        text = ' '.join(filter(None, [code, session_date.isoformat(), topic]))
+        yield SearchEntry(kind='session', object_id=pk, title=text, text=text)
+
+
+INDEXERS = {
+    'user': (User, _user_entries),
+    'course': (Course, _course_entries),
+    'session': (AttendanceSession, _session_entries),
+}
+
+
+def index_objects(kind, queryset):
+    """(Re)build the search entries of ``kind`` for every object in ``queryset``."""
+    _, build = INDEXERS[kind]
+    with transaction.atomic():
+        SearchEntry.objects.filter(kind=kind, object_id__in=queryset.values('pk')).delete()
+        batch = []
+        for entry in build(queryset.order_by()):
+            batch.append(entry)
+            if len(batch) >= INDEX_BATCH_SIZE:
+                SearchEntry.objects.bulk_create(batch)
+                batch = []
+        SearchEntry.objects.bulk_create(batch)
+
+
+def unindex_objects(kind, object_ids):
+    SearchEntry.objects.filter(kind=kind, object_id__in=object_ids).delete()
+
+
+def rebuild_search_index():
+    """Recreate every search entry from the source tables and return how many there are."""
+    with transaction.atomic():
+        SearchEntry.objects.all().delete()
+        for kind, (model, _) in INDEXERS.items():
+            index_objects(kind, model.objects.all())
+    return SearchEntry.objects.count()
+
+
+def _has_fts(connection):
+    key = (connection.alias, connection.settings_dict['NAME'])
+    if key not in _fts_tables:
+        _fts_tables[key] = connection.vendor == 'sqlite' and FTS_TABLE in connection.introspection.table_names()
+    return _fts_tables[key]
+
+
+def _fts_query(tokens, kinds):
+    # Column filters keep "user" or "course" in a topic from matching the kind column and vice versa.
+    query = '{text} : (' + ' '.join(f'"{token}"*' for token in tokens) + ')'
+    if kinds is not None:
+        query = '{kind} : (' + ' OR '.join(f'"{kind}"' for kind in kinds) + ') AND ' + query
+    return query
+
+
+def matching_entries(term, kinds=None, limit=None, within=None):
+    """
+    Return a SearchEntry queryset whose text has a word starting with each word of ``term``.
+
+    ``within`` (a SearchEntry queryset) restricts the candidates and ``limit``
+    caps how many matches are taken, in index order, before the caller sorts
+    them; broad prefixes then stop after a few hits instead of sorting
+    thousands. SQLite answers from the FTS5 table; other backends fall back to
+    ``UPPER(text) LIKE`` on the plain table (see like_entries()), which
+    PostgreSQL serves from its trigram index.
+    """
+    tokens = TOKEN_RE.findall(term.lower())
+    if not tokens:
+        return SearchEntry.objects.none()
+
+    connection = connections[SearchEntry.objects.db]
+    if _has_fts(connection):
+        sql = f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s'
+        params = [_fts_query(tokens, kinds)]
+        if within is None:
+            if limit is not None:
+                sql += ' LIMIT %s'
+                params.append(limit)
+            return SearchEntry.objects.filter(pk__in=RawSQL(sql, params))
+        # SQLite plans a subquery filter on an FTS scan badly, so intersect with
+        # the (small) candidate set while streaming matches and stop at ``limit``.
+        allowed = set(within.values_list('pk', flat=True))
+        found = []
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            while limit is None or len(found) < limit:
+                rows = cursor.fetchmany(INDEX_BATCH_SIZE)
+                if not rows:
+                    break
+                found.extend(pk for pk, in rows if pk in allowed)
+        return SearchEntry.objects.filter(pk__in=found[:limit])
+
+    entries = like_entries(tokens, kinds)
+    if within is not None:
+        entries = entries.filter(pk__in=within.values('pk'))
+    if limit is not None:
+        entries = SearchEntry.objects.filter(pk__in=list(entries.values_list('pk', flat=True)[:limit]))
+    return entries
+
+
+def like_entries(tokens, kinds=None):
+    """
+    The fallback for backends without FTS5: entries whose text contains every token, case-insensitively.
+
+    Written as ``UPPER(text) LIKE '%TOKEN%'`` rather than ``icontains`` so every
+    backend gets the same expression, the one PostgreSQL's trigram index is
+    built on (migration 0011).
+    """
+    entries = SearchEntry.objects.alias(upper_text=Upper('text'))
+    if kinds is not None:
+        entries = entries.filter(kind__in=kinds)
+    for token in tokens:
+        entries = entries.filter(upper_text__contains=token.upper())
+    return entries
+
+
+def matching_ids(term, kind):
+    """Subquery of the object ids of ``kind`` matching ``term``, for use in ``pk__in`` style filters."""
+    return matching_entries(term, [kind]).values('object_id')
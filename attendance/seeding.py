@@ -0,0 +1,154 @@
+import random
+from dataclasses import dataclass, asdict
+from datetime import date, time, timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import transaction
+
+from .database import delete_rows
+from .models import UserProfile, Course, Enrollment, AttendanceSession, AttendanceRecord, AttendanceRollup
+from .rollups import rebuild_rollups
+from .search import index_objects, unindex_objects
+
+SEED_PREFIX = 'seed-'
+BATCH_SIZE = 2000
+STATUS_WEIGHTS = {'present': 0.8, 'late': 0.08, 'absent': 0.12}
+
+
+@dataclass
+class UniversitySize:
+    lecturers: int = 20
+    courses: int = 100
+    students: int = 2000
+    courses_per_student: int = 5
+    sessions_per_course: int = 24
+    seed: int = 42
+
+
+def _bulk_create(model, objects):
+    for start in range(0, len(objects), BATCH_SIZE):
+        model.objects.bulk_create(objects[start:start + BATCH_SIZE])
+
+
+def _create_users(prefix, count, password, role):
+    width = len(str(count))
+    users = [
+        User(
+            username=f'{SEED_PREFIX}{prefix}{n:0{width}d}',
+            first_name=prefix.capitalize(),
+            last_name=f'{n:0{width}d}',
+            password=password,
+        )
+        for n in range(1, count + 1)
+    ]
+    _bulk_create(User, users)
+    users = list(User.objects.filter(username__startswith=f'{SEED_PREFIX}{prefix}').order_by('username'))
+    _bulk_create(UserProfile, [
+        UserProfile(
+            user=user,
+            role=role,
+            student_id=f'SEED{index:07d}' if role == 'student' else None,
+        )
+        for index, user in enumerate(users, start=1)
+    ])
+    return users
+
+
+def clear_seeded_data():
+    """Delete everything created by :func:`seed_university`."""
+    users = User.objects.filter(username__startswith=SEED_PREFIX)
+    with transaction.atomic():
+        unindex_objects('session', AttendanceSession.objects.filter(course__lecturer__in=users).values('pk'))
+        # The rollup and cache signal receivers stop Django from fast-deleting
+        # cascades, so clear the large tables with plain DELETE statements first.
+        courses = Course.objects.filter(lecturer__in=users).values('pk')
+        delete_rows(AttendanceRecord, 'session', AttendanceSession.objects.filter(course__in=courses).values('pk'))
+        delete_rows(AttendanceSession, 'course', courses)
+        delete_rows(AttendanceRollup, 'enrollment', Enrollment.objects.filter(course__in=courses).values('pk'))
+        delete_rows(Enrollment, 'course', courses)
+        return users.delete()
+
+
+def seed_university(size, password='password123'):
+    """
+    Generate a synthetic university of ``size`` (a UniversitySize) deterministically from ``size.seed``.
+
+    Every seeded username starts with SEED_PREFIX so the data can be removed
+    again with :func:`clear_seeded_data`. Returns the number of rows created per model.
+    """
+    rng = random.Random(size.seed)
+    password = make_password(password)
+    statuses = list(STATUS_WEIGHTS)
+    weights = list(STATUS_WEIGHTS.values())
+
+    with transaction.atomic():
+        lecturers = _create_users('lecturer', size.lecturers, password, 'lecturer')
+        students = _create_users('student', size.students, password, 'student')
+
+        width = len(str(size.courses))
+        _bulk_create(Course, [
+            Course(
+                course_code=f'SEED{n:0{width}d}',
+                course_name=f'Seeded Course {n}',
+                lecturer=lecturers[(n - 1) % len(lecturers)],
+            )
+            for n in range(1, size.courses + 1)
+        ])
+        courses = list(Course.objects.filter(lecturer__in=lecturers).order_by('course_code'))
+
+        roster = {course.pk: [] for course in courses}
+        enrollments = []
+        for student in students:
+            for course in rng.sample(courses, min(size.courses_per_student, len(courses))):
+                roster[course.pk].append(student.pk)
+                enrollments.append(Enrollment(student=student, course=course))
+        _bulk_create(Enrollment, enrollments)
+
+        first_day = date(2025, 1, 6)
+        sessions = []
+        for course in courses:
+            slot = time(8 + rng.randrange(9), 0)
+            for week in range(size.sessions_per_course):
+                sessions.append(AttendanceSession(
+                    course=course,
+                    session_date=first_day + timedelta(days=week * 7 + rng.randrange(5)),
+                    session_time=slot,
+                    topic=f'Week {week + 1}',
+                    created_by=course.lecturer,
+                ))
+        _bulk_create(AttendanceSession, sessions)
+
+        records = []
+        record_count = 0
+        session_rows = AttendanceSession.objects.filter(
+            course__in=courses).order_by('course_id', 'session_date').values_list('pk', 'course_id')
+        for session_id, course_id in session_rows.iterator():
+            for student_id in roster[course_id]:
+                records.append(AttendanceRecord(
+                    session_id=session_id,
+                    student_id=student_id,
+                    status=rng.choices(statuses, weights)[0],
+                ))
+            if len(records) >= BATCH_SIZE:
+                _bulk_create(AttendanceRecord, records)
+                record_count += len(records)
+                records = []
+        _bulk_create(AttendanceRecord, records)
+        record_count += len(records)
+
+        rebuild_rollups(Enrollment.objects.filter(course__in=courses))
+        # bulk_create skips the signals that keep the search index in sync.
+        index_objects('user', User.objects.filter(pk__in=[user.pk for user in lecturers + students]))
+        index_objects('course', Course.objects.filter(pk__in=[course.pk for course in courses]))
+        index_objects('session', AttendanceSession.objects.filter(course__in=courses))
+
+    return {
+        'lecturers': len(lecturers),
+        'students': len(students),
+        'courses': len(courses),
+        'enrollments': len(enrollments),
+        'sessions': len(sessions),
+        'records': record_count,
+        'size': asdict(size),
+    }
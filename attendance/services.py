@@ -0,0 +1,404 @@
+import csv
+from collections import Counter, defaultdict
+from dataclasses import asdict, dataclass, field
+
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+from django.db.models import FilteredRelation, Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import UserProfile, Course, Enrollment, AttendanceRecord
+from .rollups import apply_status_changes, apply_status_deltas, rebuild_rollups
+from .caching import invalidate_dashboards
+from .database import upsert_rows
+
+BULK_BATCH_SIZE = 500
+MARK_STATUSES = {status for status, _ in AttendanceRecord.STATUS_CHOICES}
+
+
+@dataclass
+class MarkingSummary:
+    created: list = field(default_factory=list)
+    updated: list = field(default_factory=list)
+    unchanged: list = field(default_factory=list)
+    conflicts: list = field(default_factory=list)
+
+    def __str__(self):
+        text = f"{len(self.created)} created, {len(self.updated)} updated, {len(self.unchanged)} unchanged"
+        if self.conflicts:
+            text += f", {len(self.conflicts)} changed by someone else and not saved"
+        return text
+
+
+def mark_attendance(session, marks, versions=None):
+    """
+    Apply ``marks`` ({student_id: (status, remarks)}) to ``session``; a remarks
+    of None keeps whatever remarks the record already has.
+
+    Existing records are loaded once and only rows whose status or remarks
+    differ are written, all inside a single transaction together with the
+    matching rollup adjustments.
+
+    ``versions`` ({student_id: marked_at}, None for "no record yet") makes the
+    listed students' marks conditional: a mark made against a record that has
+    since been created or changed is not written and lands in ``conflicts``.
+    The existing records are read with SELECT ... FOR UPDATE, so versions are
+    compared in memory and the updates still go out in one bulk_update; creates
+    skip rows another writer inserted first. (SQLite has no row locks, but its
+    single writer makes a concurrent commit fail this transaction instead.)
+    """
+    summary = MarkingSummary()
+    versions = versions or {}
+    now = timezone.now()
+
+    with transaction.atomic():
+        existing = {
+            record.student_id: record
+            for record in AttendanceRecord.objects.filter(session=session).order_by().select_for_update()
+        }
+
+        to_create = []
+        to_update = []
+        status_changes = []
+        for student_id, (status, remarks) in marks.items():
+            record = existing.get(student_id)
+            if remarks is None:
+                remarks = record.remarks if record else ''
+            if record is not None and record.status == status and record.remarks == remarks:
+                summary.unchanged.append(student_id)
+            elif student_id in versions and versions[student_id] != (record.marked_at if record else None):
+                summary.conflicts.append(student_id)
+            elif record is None:
+                to_create.append(AttendanceRecord(
+                    session=session, student_id=student_id, status=status, remarks=remarks,
+                ))
+            else:
+                status_changes.append((student_id, record.status, status))
+                record.status = status
+                record.remarks = remarks
+                record.marked_at = now
+                to_update.append(record)
+                summary.updated.append(student_id)
+
+        if to_create:
+            AttendanceRecord.objects.bulk_create(to_create, batch_size=BULK_BATCH_SIZE, ignore_conflicts=True)
+            # A row someone else inserted first keeps its own marked_at, so only ours match.
+            inserted = set(
+                AttendanceRecord.objects.filter(session=session, student_id__in=[r.student_id for r in to_create])
+                .values_list('student_id', 'marked_at')
+            )
+            for record in to_create:
+                if (record.student_id, record.marked_at) in inserted:
+                    summary.created.append(record.student_id)
+                    status_changes.append((record.student_id, None, record.status))
+                else:
+                    summary.conflicts.append(record.student_id)
+        if to_update:
+            AttendanceRecord.objects.bulk_update(
+                to_update, ['status', 'remarks', 'marked_at'], batch_size=BULK_BATCH_SIZE,
+            )
+        # bulk_create/bulk_update skip model signals, so keep the rollups and dashboards in step here.
+        apply_status_changes(session.course_id, status_changes)
+        invalidate_dashboards(user_ids=[student_id for student_id, _, _ in status_changes])
+
+    return summary
+
+
+def roster_ids_queryset(session):
+    return (
+        Enrollment.objects.filter(course_id=session.course_id, student__profile__role='student')
+        .values_list('student_id', flat=True)
+    )
+
+
+def marking_roster_queryset(session):
+    return (
+        User.objects.filter(enrollments__course_id=session.course_id, profile__role='student')
+        .annotate(record=FilteredRelation(
+            'attendance_records', condition=Q(attendance_records__session_id=session.pk),
+        ))
+        .order_by('last_name', 'first_name', 'username')
+        .values_list(
+            'id', 'username', 'first_name', 'last_name', 'profile__student_id',
+            'record__status', 'record__remarks', 'record__marked_at',
+        )
+    )
+
+
+def marking_roster(session):
+    """
+    Return one dict per student enrolled in ``session``'s course, with their
+    student number and the session record's status, remarks and version
+    (``marked_at``, None when unmarked), from a single joined query.
+    """
+    rows = marking_roster_queryset(session)
+    return [
+        {
+            'id': pk,
+            'student_id': student_id,
+            'name': f'{first_name} {last_name}'.strip() or username,
+            'status': status or 'absent',
+            'remarks': remarks or '',
+            'version': marked_at,
+        }
+        for pk, username, first_name, last_name, student_id, status, remarks, marked_at in rows
+    ]
+
+
+def parse_marking_delta(payload, roster):
+    """
+    Validate ``{"changes": [{student, status, remarks, version}, ...]}`` from the marking page.
+
+    ``student`` is a user id that must be in ``roster`` (a set of ids) and
+    ``version`` the ISO 8601 ``marked_at`` the page last saw, or null for an
+    unmarked student. Returns (marks, versions, rejected) in the form
+    mark_attendance() takes, with rejected as (index, reason) pairs.
+    """
+    changes = payload.get('changes') if isinstance(payload, dict) else None
+    if not isinstance(changes, list):
+        raise ValueError('Expected an object with a "changes" list.')
+
+    marks = {}
+    versions = {}
+    rejected = []
+    for index, change in enumerate(changes):
+        if not isinstance(change, dict):
+            rejected.append((index, 'not an object'))
+            continue
+        student = change.get('student')
+        status = change.get('status')
+        remarks = change.get('remarks', '')
+        version = change.get('version')
+        try:
+            parsed_version = parse_datetime(version) if isinstance(version, str) else None
+        except ValueError:
+            parsed_version = None
+        if parsed_version is not None and timezone.is_naive(parsed_version):
+            parsed_version = timezone.make_aware(parsed_version)
+        if not isinstance(student, int) or isinstance(student, bool) or student not in roster:
+            rejected.append((index, 'student is not enrolled in the course'))
+        elif status not in MARK_STATUSES:
+            rejected.append((index, f'status must be one of {", ".join(sorted(MARK_STATUSES))}'))
+        elif not isinstance(remarks, str):
+            rejected.append((index, 'remarks must be a string'))
+        elif version is not None and parsed_version is None:
+            rejected.append((index, 'version must be an ISO 8601 date and time or null'))
+        else:
+            marks[student] = (status, remarks)
+            versions[student] = parsed_version
+    return marks, versions, rejected
+
+
+@dataclass
+class RosterImportSummary:
+    created: int = 0
+    already_enrolled: int = 0
+    duplicate_rows: int = 0
+    unknown_students: set = field(default_factory=set)
+    unknown_courses: set = field(default_factory=set)
+    invalid_rows: list = field(default_factory=list)
+
+    def __str__(self):
+        return (
+            f"{self.created} enrolled, {self.already_enrolled} already enrolled, "
+            f"{self.duplicate_rows} duplicate rows, {len(self.unknown_students)} unknown student IDs, "
+            f"{len(self.unknown_courses)} unknown course codes, {len(self.invalid_rows)} invalid rows"
+        )
+
+
+def _chunks(items, size=BULK_BATCH_SIZE):
+    items = list(items)
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def read_roster_csv(lines):
+    """Yield (line_number, student_id, course_code) from CSV ``lines``, skipping an optional header."""
+    for line_number, row in enumerate(csv.reader(lines), start=1):
+        cells = [cell.strip() for cell in row]
+        if not any(cells):
+            continue
+        if line_number == 1 and [cell.lower() for cell in cells[:2]] == ['student_id', 'course_code']:
+            continue
+        yield line_number, *(cells + ['', ''])[:2]
+
+
+def import_roster(rows, courses=None):
+    """
+    Enroll students from ``rows`` of (line_number, student_id, course_code).
+
+    Student IDs and course codes are resolved with batched lookups, existing
+    enrollments are loaded once per batch of courses, and new pairs are
+    inserted with ``bulk_create(ignore_conflicts=True)`` in chunks.
+    ``courses`` limits which courses may be imported into (e.g. a lecturer's own).
+    """
+    summary = RosterImportSummary()
+    pairs = []
+    for line_number, student_id, course_code in rows:
+        if not student_id or not course_code:
+            summary.invalid_rows.append(line_number)
+        else:
+            pairs.append((student_id, course_code))
+
+    student_ids = {}
+    for chunk in _chunks({student_id for student_id, _ in pairs}):
+        student_ids.update(
+            UserProfile.objects.filter(role='student', student_id__in=chunk).values_list('student_id', 'user_id')
+        )
+
+    if courses is None:
+        courses = Course.objects.all()
+    course_ids = {}
+    for chunk in _chunks({course_code for _, course_code in pairs}):
+        course_ids.update(courses.filter(course_code__in=chunk).values_list('course_code', 'pk'))
+
+    existing = set()
+    for chunk in _chunks(set(course_ids.values())):
+        existing.update(Enrollment.objects.filter(course_id__in=chunk).values_list('student_id', 'course_id'))
+
+    seen = set()
+    to_create = []
+    for student_id, course_code in pairs:
+        user_id = student_ids.get(student_id)
+        course_id = course_ids.get(course_code)
+        if user_id is None:
+            summary.unknown_students.add(student_id)
+        if course_id is None:
+            summary.unknown_courses.add(course_code)
+        if user_id is None or course_id is None:
+            continue
+        key = (user_id, course_id)
+        if key in seen:
+            summary.duplicate_rows += 1
+        elif key in existing:
+            summary.already_enrolled += 1
+        else:
+            to_create.append(Enrollment(student_id=user_id, course_id=course_id))
+        seen.add(key)
+
+    with transaction.atomic():
+        for chunk in _chunks(to_create):
+            Enrollment.objects.bulk_create(chunk, ignore_conflicts=True)
+        # bulk_create skips the post_save signals that create rollups and invalidate dashboards.
+        course_ids = {enrollment.course_id for enrollment in to_create}
+        rebuild_rollups(Enrollment.objects.filter(course_id__in=course_ids, rollup__isnull=True))
+        invalidate_dashboards(
+            user_ids=[enrollment.student_id for enrollment in to_create], course_ids=course_ids,
+        )
+    summary.created = len(to_create)
+    return summary
+
+
+@dataclass
+class DeviceBatchSummary:
+    created: int = 0
+    updated: int = 0
+    unchanged: int = 0
+    stale: int = 0
+    superseded: int = 0
+    rejected: list = field(default_factory=list)
+
+    def as_dict(self):
+        summary = asdict(self)
+        summary['rejected'] = [{'index': index, 'error': error} for index, error in sorted(self.rejected)]
+        return summary
+
+
+def record_device_events(events, sessions):
+    """
+    Apply device ``events`` of (index, session_id, student_id, status, timestamp)
+    and return a DeviceBatchSummary; ``sessions`` limits which sessions may be
+    marked (e.g. the device owner's).
+
+    Student numbers, sessions, enrollments and existing records are resolved
+    with batched lookups, and every change is written with a single executemany()
+    INSERT ... ON CONFLICT DO UPDATE in one transaction with the rollup and
+    dashboard updates. Within a batch the latest event per student and session
+    wins. Staleness is judged in device time: an event no newer than the
+    record's last device event (``event_at``) is skipped, so resubmitting a
+    batch changes nothing, while marks made in the app never block a later tap.
+    """
+    summary = DeviceBatchSummary()
+
+    student_ids = {}
+    for chunk in _chunks({student_id for _, _, student_id, _, _ in events}):
+        student_ids.update(
+            UserProfile.objects.filter(role='student', student_id__in=chunk).values_list('student_id', 'user_id')
+        )
+    course_ids = {}
+    for chunk in _chunks({session_id for _, session_id, _, _, _ in events}):
+        course_ids.update(sessions.filter(pk__in=chunk).values_list('pk', 'course_id'))
+    enrolled = set()
+    for chunk in _chunks(set(course_ids.values())):
+        enrolled.update(Enrollment.objects.filter(course_id__in=chunk).values_list('course_id', 'student_id'))
+
+    latest = {}
+    for index, session_id, student_id, status, timestamp in events:
+        course_id = course_ids.get(session_id)
+        user_id = student_ids.get(student_id)
+        if course_id is None:
+            summary.rejected.append((index, 'unknown session'))
+        elif user_id is None:
+            summary.rejected.append((index, 'unknown student'))
+        elif (course_id, user_id) not in enrolled:
+            summary.rejected.append((index, 'student is not enrolled in the course'))
+        else:
+            key = (session_id, user_id)
+            if key in latest:
+                summary.superseded += 1
+                if latest[key][1] >= timestamp:
+                    continue
+            latest[key] = (status, timestamp)
+
+    event_at = AttendanceRecord._meta.get_field('event_at')
+    with transaction.atomic():
+        existing = {}
+        for chunk in _chunks({session_id for session_id, _ in latest}):
+            for session_id, student_id, status, last_event_at in (
+                AttendanceRecord.objects.filter(session_id__in=chunk).order_by()
+                .values_list('session_id', 'student_id', 'status', 'event_at')
+            ):
+                existing[(session_id, student_id)] = (status, last_event_at)
+
+        to_write = []
+        to_advance = []
+        deltas = defaultdict(Counter)
+        for (session_id, student_id), (status, timestamp) in latest.items():
+            course_deltas = deltas[course_ids[session_id]]
+            current = existing.get((session_id, student_id))
+            row = (session_id, student_id, status, event_at.get_db_prep_save(timestamp, connection))
+            if current is None:
+                summary.created += 1
+            elif current[0] == status:
+                summary.unchanged += 1
+                if current[1] is None or current[1] < timestamp:
+                    to_advance.append(row)
+                continue
+            elif current[1] is not None and current[1] >= timestamp:
+                summary.stale += 1
+                continue
+            else:
+                summary.updated += 1
+                course_deltas[(student_id, current[0])] -= 1
+            course_deltas[(student_id, status)] += 1
+            to_write.append(row)
+
+        # marked_at is the server time, not the device's, so the snapshot watermark sees these rows.
+        upsert_rows(
+            AttendanceRecord, ['session_id', 'student_id', 'status', 'event_at'], to_write,
+            unique_fields=['session_id', 'student_id'], update_fields=['status', 'marked_at', 'event_at'],
+            defaults={'remarks': '', 'marked_at': timezone.now()},
+        )
+        # Same status, newer tap: only the device time moves, so an older tap uploaded later stays stale.
+        upsert_rows(
+            AttendanceRecord, ['session_id', 'student_id', 'status', 'event_at'], to_advance,
+            unique_fields=['session_id', 'student_id'], update_fields=['event_at'],
+            defaults={'remarks': '', 'marked_at': timezone.now()},
+        )
+        # The upsert skips model signals, so keep the rollups and dashboards in step here.
+        for course_id, course_deltas in deltas.items():
+            apply_status_deltas(course_id, course_deltas)
+        invalidate_dashboards(user_ids={student_id for _, student_id, _, _ in to_write})
+
+    return summary
@@ -0,0 +1,222 @@
+from django.contrib.auth.models import User
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+
+from .models import UserProfile, Course, Enrollment, AttendanceSession, AttendanceRecord
+from .caching import invalidate_course_choices, invalidate_dashboards
+from . import freshness, rollups, search, snapshots
+
+
+def _deleted_directly(origin, model):
+    # Cascaded deletes (a session, course or user going away) are handled by
+    # the owner's own receiver, so only react when these rows were the target.
+    return isinstance(origin, model) or getattr(origin, 'model', None) is model
+
+
+@receiver(pre_save, sender=AttendanceRecord)
+def remember_previous_record(sender, instance, raw=False, **kwargs):
+    instance._rollup_previous = None
+    instance._snapshot_previous = None
+    if instance.pk and not raw:
+        previous = (
+            AttendanceRecord.objects.filter(pk=instance.pk)
+            .values_list('session__course_id', 'student_id', 'status', 'session_id', 'session__session_date')
+            .first()
+        )
+        if previous is not None:
+            instance._rollup_previous = previous[:3]
+            instance._snapshot_previous = previous[3:]
+
+
+@receiver(post_save, sender=AttendanceRecord)
+def record_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    course_id = instance.session.course_id
+    previous = getattr(instance, '_rollup_previous', None)
+
+    if previous is None:
+        rollups.apply_status_changes(course_id, [(instance.student_id, None, instance.status)])
+        return
+
+    previous_course_id, previous_student_id, previous_status = previous
+    if (previous_course_id, previous_student_id) == (course_id, instance.student_id):
+        rollups.apply_status_changes(course_id, [(instance.student_id, previous_status, instance.status)])
+    else:
+        # Moved to another session's course or another student: the count leaves one enrollment for the other.
+        rollups.apply_status_changes(previous_course_id, [(previous_student_id, previous_status, None)])
+        rollups.apply_status_changes(course_id, [(instance.student_id, None, instance.status)])
+
+
+@receiver(post_delete, sender=AttendanceRecord)
+def record_deleted(sender, instance, origin=None, **kwargs):
+    if not _deleted_directly(origin, AttendanceRecord):
+        return
+    rollups.apply_status_changes(instance.session.course_id, [(instance.student_id, instance.status, None)])
+
+
+@receiver(pre_save, sender=AttendanceSession)
+def remember_previous_course(sender, instance, raw=False, **kwargs):
+    instance._rollup_previous_course_id = None
+    instance._snapshot_previous = None
+    if instance.pk and not raw:
+        instance._snapshot_previous = (
+            AttendanceSession.objects.filter(pk=instance.pk).values_list('course_id', 'session_date').first()
+        )
+        if instance._snapshot_previous is not None:
+            instance._rollup_previous_course_id = instance._snapshot_previous[0]
+
+
+@receiver(post_save, sender=AttendanceSession)
+def session_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    previous_course_id = getattr(instance, '_rollup_previous_course_id', None)
+    if created or previous_course_id is None:
+        rollups.apply_session_change(instance.course_id, 1)
+    elif previous_course_id != instance.course_id:
+        rollups.rebuild_rollups(Enrollment.objects.filter(course_id__in=[previous_course_id, instance.course_id]))
+
+
+@receiver(post_delete, sender=AttendanceSession)
+def session_deleted(sender, instance, origin=None, **kwargs):
+    if _deleted_directly(origin, AttendanceSession):
+        rollups.rebuild_rollups(Enrollment.objects.filter(course_id=instance.course_id))
+
+
+@receiver(post_save, sender=Enrollment)
+def enrollment_saved(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        rollups.rebuild_rollups(Enrollment.objects.filter(pk=instance.pk))
+
+
+# Report snapshots find new and changed rows by watermark; deletions and rows
+# moved to another week leave nothing behind to find, so queue their old week.
+
+@receiver(post_save, sender=AttendanceRecord)
+def invalidate_moved_record_snapshot(sender, instance, raw=False, **kwargs):
+    previous = getattr(instance, '_snapshot_previous', None)
+    if not raw and previous is not None and previous[0] != instance.session_id:
+        snapshots.invalidate_week(instance._rollup_previous[0], previous[1])
+
+
+@receiver(post_delete, sender=AttendanceRecord)
+def invalidate_deleted_record_snapshot(sender, instance, origin=None, **kwargs):
+    if _deleted_directly(origin, AttendanceRecord):
+        snapshots.invalidate_week(instance.session.course_id, instance.session.session_date)
+
+
+@receiver(post_save, sender=AttendanceSession)
+def invalidate_moved_session_snapshot(sender, instance, created, raw=False, **kwargs):
+    previous = getattr(instance, '_snapshot_previous', None)
+    if not raw and previous is not None and previous != (instance.course_id, instance.session_date):
+        # The session keeps its created_at, so neither week would be found by watermark.
+        snapshots.invalidate_week(*previous)
+        snapshots.invalidate_week(instance.course_id, instance.session_date)
+
+
+@receiver(post_delete, sender=AttendanceSession)
+def invalidate_deleted_session_snapshot(sender, instance, origin=None, **kwargs):
+    if _deleted_directly(origin, AttendanceSession):
+        snapshots.invalidate_week(instance.course_id, instance.session_date)
+
+
+@receiver(post_delete, sender=AttendanceRecord)
+def touch_course_of_deleted_record(sender, instance, origin=None, **kwargs):
+    if _deleted_directly(origin, AttendanceRecord):
+        freshness.touch_courses([instance.session.course_id])
+
+
+@receiver(post_delete, sender=AttendanceSession)
+def touch_course_of_deleted_session(sender, instance, origin=None, **kwargs):
+    if _deleted_directly(origin, AttendanceSession):
+        freshness.touch_courses([instance.course_id])
+
+
+@receiver(post_save, sender=AttendanceRecord)
+@receiver(post_delete, sender=AttendanceRecord)
+def invalidate_record_dashboards(sender, instance, raw=False, **kwargs):
+    if not raw:
+        previous = getattr(instance, '_rollup_previous', None)
+        invalidate_dashboards(user_ids={instance.student_id, previous[1] if previous else instance.student_id})
+
+
+@receiver(post_save, sender=AttendanceSession)
+@receiver(post_delete, sender=AttendanceSession)
+def invalidate_session_dashboards(sender, instance, raw=False, **kwargs):
+    if not raw:
+        course_ids = [instance.course_id, getattr(instance, '_rollup_previous_course_id', None)]
+        invalidate_dashboards(user_ids=[instance.created_by_id], course_ids=course_ids)
+
+
+@receiver(post_save, sender=Enrollment)
+@receiver(post_delete, sender=Enrollment)
+def invalidate_enrollment_dashboards(sender, instance, raw=False, **kwargs):
+    if not raw:
+        invalidate_dashboards(user_ids=[instance.student_id], course_ids=[instance.course_id])
+
+
+@receiver(post_save, sender=Course)
+@receiver(post_delete, sender=Course)
+def invalidate_course_dashboards(sender, instance, raw=False, **kwargs):
+    if not raw:
+        invalidate_dashboards(user_ids=[instance.lecturer_id], course_ids=[instance.pk])
+
+
+@receiver(pre_save, sender=Course)
+def remember_previous_lecturer(sender, instance, raw=False, **kwargs):
+    instance._choices_previous_lecturer_id = None
+    if instance.pk and not raw:
+        instance._choices_previous_lecturer_id = (
+            Course.objects.filter(pk=instance.pk).values_list('lecturer_id', flat=True).first()
+        )
+
+
+@receiver(post_save, sender=Course)
+@receiver(post_delete, sender=Course)
+def invalidate_lecturer_course_choices(sender, instance, raw=False, **kwargs):
+    if not raw:
+        invalidate_course_choices([instance.lecturer_id, getattr(instance, '_choices_previous_lecturer_id', None)])
+
+
+# Search index: one entry per user, course and session.
+
+USER_SEARCH_FIELDS = {'username', 'first_name', 'last_name', 'email'}
+
+
+@receiver(post_save, sender=User)
+def index_user(sender, instance, raw=False, update_fields=None, **kwargs):
+    # Logins save last_login only; skip saves that touch nothing searchable.
+    if not raw and (update_fields is None or USER_SEARCH_FIELDS & set(update_fields)):
+        search.index_objects('user', User.objects.filter(pk=instance.pk))
+
+
+@receiver(post_save, sender=UserProfile)
+def index_profile(sender, instance, raw=False, **kwargs):
+    if not raw:
+        search.index_objects('user', User.objects.filter(pk=instance.user_id))
+
+
+@receiver(post_save, sender=Course)
+def index_course(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    search.index_objects('course', Course.objects.filter(pk=instance.pk))
+    if not created:
+        # Session entries include the course code.
+        search.index_objects('session', AttendanceSession.objects.filter(course=instance))
+
+
+@receiver(post_save, sender=AttendanceSession)
+def index_session(sender, instance, raw=False, **kwargs):
+    if not raw:
+        search.index_objects('session', AttendanceSession.objects.filter(pk=instance.pk))
+
+
+@receiver(post_delete, sender=User)
+@receiver(post_delete, sender=Course)
+@receiver(post_delete, sender=AttendanceSession)
+def unindex_deleted(sender, instance, **kwargs):
+    kind = {User: 'user', Course: 'course', AttendanceSession: 'session'}[sender]
+    search.unindex_objects(kind, [instance.pk])
+
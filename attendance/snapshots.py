@@ -0,0 +1,185 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Max, Q, Sum
+from django.db.models.functions import TruncWeek
+from django.utils import timezone
+
+from .models import (
+    Enrollment, AttendanceSession, AttendanceRecord,
+    CourseWeekSnapshot, StudentWeekSnapshot, SnapshotInvalidation, SnapshotWatermark,
+)
+from .database import insert_from
+from .reporting import ReportRow
+
+SNAPSHOT_NAME = 'reports'
+# Course weeks recomputed per query; keeps the OR-ed filters well under SQLite's expression limits.
+BUCKETS_PER_QUERY = 100
+STATUSES = ['present', 'late', 'absent']
+
+
+def week_of(day):
+    """Return the Monday of the week containing ``day``."""
+    return day - timedelta(days=day.weekday())
+
+
+def invalidate_week(course_id, day):
+    """Queue the week of ``day`` in ``course_id`` for recomputation on the next refresh."""
+    SnapshotInvalidation.objects.create(course_id=course_id, week=week_of(day))
+
+
+def invalidate_weeks(course_days):
+    """Bulk version of :func:`invalidate_week` for an iterable of (course_id, day)."""
+    weeks = {(course_id, week_of(day)) for course_id, day in course_days}
+    SnapshotInvalidation.objects.bulk_create([SnapshotInvalidation(course_id=course_id, week=week) for course_id, week in weeks])
+
+
+def _bucket_filter(buckets, course_field, date_field):
+    query = Q()
+    for course_id, week in buckets:
+        query |= Q(**{course_field: course_id, f'{date_field}__range': (week, week + timedelta(days=6))})
+    return query
+
+
+def _dirty_buckets(watermark, invalidations):
+    """Return the (course_id, week) pairs with records or sessions past ``watermark``, plus ``invalidations``."""
+    buckets = set(invalidations)
+    for queryset, course_field, date_field in (
+        (AttendanceRecord.objects.filter(marked_at__gt=watermark.records_marked_at),
+         'session__course_id', 'session__session_date'),
+        (AttendanceSession.objects.filter(created_at__gt=watermark.sessions_created_at),
+         'course_id', 'session_date'),
+    ):
+        for course_id, day in queryset.order_by().values_list(course_field, date_field).distinct():
+            buckets.add((course_id, week_of(day)))
+    return buckets
+
+
+def _advance(current, latest, horizon):
+    # Never move past ``horizon``: a transaction still open at refresh time can
+    # commit rows stamped before it, and those must be newer than the watermark.
+    if latest is None:
+        return current or horizon
+    return min(latest, horizon)
+
+
+def _recompute(buckets):
+    """
+    Replace the snapshot rows of ``buckets`` (None for everything) and return (course weeks, student weeks).
+
+    Weeks are grouped in the database and written with INSERT ... SELECT, so
+    no per-row objects are built in Python.
+    """
+    if buckets is None:
+        chunks = [None]
+    else:
+        buckets = sorted(buckets)
+        chunks = [buckets[start:start + BUCKETS_PER_QUERY] for start in range(0, len(buckets), BUCKETS_PER_QUERY)]
+
+    course_weeks = student_weeks = 0
+    for chunk in chunks:
+        course_snapshots = CourseWeekSnapshot.objects.all()
+        student_snapshots = StudentWeekSnapshot.objects.all()
+        sessions = AttendanceSession.objects.all()
+        records = AttendanceRecord.objects.all()
+        if chunk is not None:
+            course_snapshots = course_snapshots.filter(_bucket_filter(chunk, 'course_id', 'week'))
+            student_snapshots = student_snapshots.filter(_bucket_filter(chunk, 'course_id', 'week'))
+            sessions = sessions.filter(_bucket_filter(chunk, 'course_id', 'session_date'))
+            records = records.filter(_bucket_filter(chunk, 'session__course_id', 'session__session_date'))
+        course_snapshots.delete()
+        student_snapshots.delete()
+
+        course_weeks += insert_from(CourseWeekSnapshot, ['course_id', 'week', 'sessions'], (
+            sessions.order_by().annotate(week=TruncWeek('session_date'))
+            .values('course_id', 'week').annotate(total=Count('pk'))
+            .values_list('course_id', 'week', 'total')
+        ))
+        student_weeks += insert_from(StudentWeekSnapshot, ['course_id', 'student_id', 'week', *STATUSES], (
+            records.order_by().annotate(week=TruncWeek('session__session_date'))
+            .values('session__course_id', 'student_id', 'week')
+            .annotate(**{status: Count('pk', filter=Q(status=status)) for status in STATUSES})
+            .values_list('session__course_id', 'student_id', 'week', *STATUSES)
+        ))
+    return course_weeks, student_weeks
+
+
+def refresh_snapshots(full=False):
+    """
+    Bring the weekly report snapshot up to date and return a summary dict.
+
+    Only course weeks with records marked or sessions created since the last
+    watermark, or queued by invalidate_week() because rows were deleted or
+    moved, are recomputed; ``full`` (or a first run) rebuilds every week.
+    The refresh runs in one transaction, so readers never see a half-applied
+    snapshot.
+    """
+    started = timezone.now()
+    horizon = started - timedelta(seconds=getattr(settings, 'SNAPSHOT_WATERMARK_OVERLAP', 60))
+    with transaction.atomic():
+        watermark, _ = SnapshotWatermark.objects.select_for_update().get_or_create(name=SNAPSHOT_NAME)
+        records_marked_at = AttendanceRecord.objects.aggregate(latest=Max('marked_at'))['latest']
+        sessions_created_at = AttendanceSession.objects.aggregate(latest=Max('created_at'))['latest']
+        last_invalidation = SnapshotInvalidation.objects.aggregate(last=Max('pk'))['last'] or 0
+        invalidations = SnapshotInvalidation.objects.filter(pk__lte=last_invalidation)
+
+        full = full or watermark.refreshed_at is None
+        if full:
+            buckets = None
+        else:
+            buckets = _dirty_buckets(watermark, invalidations.values_list('course_id', 'week'))
+        course_weeks, student_weeks = _recompute(buckets)
+        invalidations.delete()
+
+        watermark.records_marked_at = _advance(watermark.records_marked_at, records_marked_at, horizon)
+        watermark.sessions_created_at = _advance(watermark.sessions_created_at, sessions_created_at, horizon)
+        watermark.refreshed_at = started
+        watermark.save()
+
+    return {
+        'mode': 'full' if full else 'incremental',
+        'weeks_recomputed': 'all' if buckets is None else len(buckets),
+        'course_weeks': course_weeks,
+        'student_weeks': student_weeks,
+        'as_of': started,
+    }
+
+
+def snapshot_as_of():
+    """Return when the snapshot was last refreshed, or None if it has never been built."""
+    return SnapshotWatermark.objects.filter(name=SNAPSHOT_NAME).values_list('refreshed_at', flat=True).first()
+
+
+def build_snapshot_report(course):
+    """
+    Return (rows, as_of): ReportRows for ``course`` summed from the weekly snapshot.
+
+    Rows match build_course_report() as of the last refresh; ``as_of`` is None
+    (and rows empty) when the snapshot has never been built.
+    """
+    as_of = snapshot_as_of()
+    if as_of is None:
+        return [], None
+
+    total_sessions = CourseWeekSnapshot.objects.filter(course=course).aggregate(total=Sum('sessions'))['total'] or 0
+    counts = {
+        row['student_id']: row
+        for row in StudentWeekSnapshot.objects.filter(course=course).order_by()
+        .values('student_id').annotate(**{status: Sum(status) for status in STATUSES})
+    }
+    enrollments = (
+        Enrollment.objects.filter(course=course, student__profile__role='student')
+        .select_related('student__profile')
+        .order_by('student__last_name', 'student__first_name', 'student__username')
+    )
+    rows = []
+    for enrollment in enrollments:
+        status_counts = counts.get(enrollment.student_id, {})
+        rows.append(ReportRow(
+            student=enrollment.student,
+            student_id=enrollment.student.profile.student_id,
+            total_sessions=total_sessions,
+            **{status: status_counts.get(status, 0) for status in STATUSES},
+        ))
+    return rows, as_of
@@ -1,3 +1,1632 @@
-from django.test import TestCase
+import csv
+import gzip
+import importlib
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import zipfile
+from datetime import date, datetime, time, timedelta
+from io import BytesIO, StringIO
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import Count, Max, Min
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from .models import (
+    UserProfile, Course, Enrollment, AttendanceSession, AttendanceRecord, AttendanceRollup,
+    ArchivedSession, ArchivedRecord, SearchEntry, MarkingDevice,
+)
+from .reporting import build_course_report, build_attendance_matrix
+from .services import mark_attendance, marking_roster, import_roster, read_roster_csv, record_device_events
+from .caching import dashboard_cache_stats
+from .metrics import registry as metrics_registry
+from .benchmarks import compare_to_baseline
+from .checkin import checkin_buffer
+from .analytics import course_trends, dropping_students, weekly_series
+from .snapshots import build_snapshot_report, refresh_snapshots
+from .forms import AttendanceSessionForm
+from .archive import archive_semester, restore_semester, semester_of
+from .rollups import rebuild_rollups
+from .seeding import SEED_PREFIX, clear_seeded_data
+from .search import like_entries, matching_entries, rebuild_search_index
+from .admin import SessionDateQuerySet
+
+
+def make_lecturer(username='lecturer'):
+    user = User.objects.create_user(username=username, first_name='Lec', last_name='Turer')
+    UserProfile.objects.create(user=user, role='lecturer')
+    return user
+
+
+def make_student(number):
+    user = User.objects.create_user(
+        username=f'student{number}',
+        first_name='Student', last_name=f'{number:04d}',
+    )
+    UserProfile.objects.create(user=user, role='student', student_id=f'S{number:05d}')
+    return user
+
+
+class ReportEngineTests(TestCase):
+    def setUp(self):
+        self.lecturer = make_lecturer()
+        self.course = Course.objects.create(course_code='CS101', course_name='Intro', lecturer=self.lecturer)
+        self.sessions = [
+            AttendanceSession.objects.create(
+                course=self.course, session_date=date(2025, 1, day), session_time=time(9, 0),
+                created_by=self.lecturer,
+            )
+            for day in (6, 7, 8)
+        ]
+        self.next_number = 1
+
+    def enroll(self, count):
+        students = []
+        for _ in range(count):
+            student = make_student(self.next_number)
+            self.next_number += 1
+            Enrollment.objects.create(student=student, course=self.course)
+            for session, status in zip(self.sessions, ['present', 'late', 'absent']):
+                AttendanceRecord.objects.create(session=session, student=student, status=status)
+            students.append(student)
+        return students
+
+    def test_rows_match_records(self):
+        student = self.enroll(1)[0]
+        AttendanceRecord.objects.filter(student=student, status='absent').update(status='present')
+
+        rows = build_course_report(self.course)
+
+        self.assertEqual(len(rows), 1)
+        row = rows[0]
+        self.assertEqual(row.student, student)
+        self.assertEqual(row.student_id, 'S00001')
+        self.assertEqual((row.total_sessions, row.present, row.absent, row.late), (3, 2, 0, 1))
+        self.assertEqual(row.attendance_rate, 66.7)
+
+    def test_counts_are_scoped_to_course(self):
+        student = self.enroll(1)[0]
+        other = Course.objects.create(course_code='CS102', course_name='Other', lecturer=self.lecturer)
+        other_session = AttendanceSession.objects.create(
+            course=other, session_date=date(2025, 1, 6), session_time=time(9, 0), created_by=self.lecturer,
+        )
+        AttendanceRecord.objects.create(session=other_session, student=student, status='present')
+
+        row = build_course_report(self.course)[0]
+
+        self.assertEqual((row.total_sessions, row.present, row.absent, row.late), (3, 1, 1, 1))
+
+    def test_query_count_is_constant_as_roster_grows(self):
+        self.client.force_login(self.lecturer)
+        url = reverse('reports') + f'?course={self.course.pk}'
+
+        self.enroll(2)
+        with CaptureQueriesContext(connection) as small:
+            response = self.client.get(url)
+        self.assertEqual(len(response.context['report_data']), 2)
+
+        self.enroll(20)
+        with CaptureQueriesContext(connection) as large:
+            response = self.client.get(url)
+        self.assertEqual(len(response.context['report_data']), 22)
+
+        self.assertEqual(len(small.captured_queries), len(large.captured_queries))
+        with self.assertNumQueries(1):
+            build_course_report(self.course)
+
+
+class BulkMarkingTests(TestCase):
+    def setUp(self):
+        self.lecturer = make_lecturer()
+        self.course = Course.objects.create(course_code='CS101', course_name='Intro', lecturer=self.lecturer)
+        self.session = AttendanceSession.objects.create(
+            course=self.course, session_date=date(2025, 1, 6), session_time=time(9, 0), created_by=self.lecturer,
+        )
+        self.students = [make_student(number) for number in range(1, 4)]
+        for student in self.students:
+            Enrollment.objects.create(student=student, course=self.course)
+
+    def test_only_changed_rows_are_written(self):
+        first, second, third = self.students
+        AttendanceRecord.objects.create(session=self.session, student=first, status='present')
+        AttendanceRecord.objects.create(session=self.session, student=second, status='present')
+
+        summary = mark_attendance(self.session, {
+            first.id: ('present', ''),
+            second.id: ('late', 'Bus delay'),
+            third.id: ('absent', ''),
+        })
+
+        self.assertEqual(summary.created, [third.id])
+        self.assertEqual(summary.updated, [second.id])
+        self.assertEqual(summary.unchanged, [first.id])
+        statuses = dict(AttendanceRecord.objects.values_list('student_id', 'status'))
+        self.assertEqual(statuses, {first.id: 'present', second.id: 'late', third.id: 'absent'})
+
+    def test_mark_view_saves_roster(self):
+        self.client.force_login(self.lecturer)
+        data = {f'status_{student.id}': 'present' for student in self.students}
+        data[f'remarks_{self.students[0].id}'] = 'Front row'
+
+        response = self.client.post(reverse('attendance_mark', args=[self.session.id]), data)
+
+        self.assertRedirects(response, reverse('attendance_session_list'))
+        self.assertEqual(AttendanceRecord.objects.filter(session=self.session, status='present').count(), 3)
+        self.assertEqual(AttendanceRecord.objects.get(student=self.students[0]).remarks, 'Front row')
+
+
+class RollupTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.lecturer = make_lecturer()
+        self.course = Course.objects.create(course_code='CS101', course_name='Intro', lecturer=self.lecturer)
+        self.student = make_student(1)
+        self.enrollment = Enrollment.objects.create(student=self.student, course=self.course)
+
+    def add_session(self, day):
+        return AttendanceSession.objects.create(
+            course=self.course, session_date=date(2025, 1, day), session_time=time(9, 0), created_by=self.lecturer,
+        )
+
+    def assertRollup(self, total_sessions, present, late, absent):
+        rollup = AttendanceRollup.objects.get(enrollment=self.enrollment)
+        self.assertEqual(
+            (rollup.total_sessions, rollup.present, rollup.late, rollup.absent),
+            (total_sessions, present, late, absent),
+        )
+
+    def test_single_row_changes_are_tracked(self):
+        first = self.add_session(6)
+        second = self.add_session(7)
+        self.assertRollup(2, 0, 0, 0)
+
+        record = AttendanceRecord.objects.create(session=first, student=self.student, status='present')
+        AttendanceRecord.objects.create(session=second, student=self.student, status='late')
+        self.assertRollup(2, 1, 1, 0)
+
+        record.status = 'absent'
+        record.save()
+        self.assertRollup(2, 0, 1, 1)
+
+        record.delete()
+        self.assertRollup(2, 0, 1, 0)
+
+        second.delete()
+        self.assertRollup(1, 0, 0, 0)
+
+    def test_reassigning_a_record_moves_its_count(self):
+        other = make_student(2)
+        other_enrollment = Enrollment.objects.create(student=other, course=self.course)
+        record = AttendanceRecord.objects.create(session=self.add_session(6), student=self.student, status='late')
+
+        record.student = other
+        record.save()
+
+        self.assertRollup(1, 0, 0, 0)
+        self.assertEqual(AttendanceRollup.objects.get(enrollment=other_enrollment).late, 1)
+        rollups = sorted(AttendanceRollup.objects.values_list('enrollment_id', 'present', 'late', 'absent'))
+        rebuild_rollups()
+        self.assertEqual(sorted(AttendanceRollup.objects.values_list('enrollment_id', 'present', 'late', 'absent')), rollups)
+
+    def test_bulk_marking_updates_rollups(self):
+        session = self.add_session(6)
+        mark_attendance(session, {self.student.id: ('present', '')})
+        self.assertRollup(1, 1, 0, 0)
+        mark_attendance(session, {self.student.id: ('late', '')})
+        self.assertRollup(1, 0, 1, 0)
+
+    def test_rebuild_command_repairs_drift(self):
+        session = self.add_session(6)
+        AttendanceRecord.objects.create(session=session, student=self.student, status='present')
+        AttendanceRollup.objects.update(total_sessions=9, present=0)
+
+        call_command('rebuild_rollups', stdout=StringIO())
+
+        self.assertRollup(1, 1, 0, 0)
+
+    def test_student_dashboard_reads_rollups(self):
+        session = self.add_session(6)
+        AttendanceRecord.objects.create(session=session, student=self.student, status='present')
+        self.client.force_login(self.student)
+
+        response = self.client.get(reverse('dashboard'))
+
+        stat = response.context['attendance_stats'][0]
+        self.assertEqual((stat['total_sessions'], stat['attended'], stat['attendance_rate']), (1, 1, 100.0))
+
+
+class AttendanceMatrixTests(TestCase):
+    def test_matrix_is_built_in_fixed_queries(self):
+        lecturer = make_lecturer()
+        student = make_student(1)
+        for code in ('CS101', 'MA101'):
+            course = Course.objects.create(course_code=code, course_name=code, lecturer=lecturer)
+            Enrollment.objects.create(student=student, course=course)
+            for day, status in ((8, 'present'), (6, 'late'), (7, None)):
+                session = AttendanceSession.objects.create(
+                    course=course, session_date=date(2025, 1, day), session_time=time(9, 0), created_by=lecturer,
+                )
+                if status:
+                    AttendanceRecord.objects.create(session=session, student=student, status=status)
+
+        with self.assertNumQueries(2):
+            matrix = build_attendance_matrix(student)
+
+        self.assertEqual(sorted(matrix), ['CS101', 'MA101'])
+        self.assertEqual(matrix['CS101'], {
+            'dates': ['2025-01-06', '2025-01-07', '2025-01-08'],
+            'statuses': [0, 0, 1],
+        })
+
+
+class QueryPlanTests(TestCase):
+    def test_view_querysets_avoid_full_table_scans(self):
+        call_command('check_query_plans', stdout=StringIO())
+
+
+class RecordExportTests(TestCase):
+    def setUp(self):
+        self.lecturer = make_lecturer()
+        self.course = Course.objects.create(course_code='CS101', course_name='Intro', lecturer=self.lecturer)
+        session = AttendanceSession.objects.create(
+            course=self.course, session_date=date(2025, 1, 6), session_time=time(9, 0), created_by=self.lecturer,
+        )
+        for number, status in ((1, 'present'), (2, 'absent')):
+            student = make_student(number)
+            Enrollment.objects.create(student=student, course=self.course)
+            AttendanceRecord.objects.create(session=session, student=student, status=status, remarks='<ok> & fine')
+        self.client.force_login(self.lecturer)
+
+    def export(self, **params):
+        response = self.client.get(reverse('attendance_records_export'), params)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content)
+
+    def test_csv_export_applies_filters(self):
+        rows = list(csv.reader(StringIO(self.export(format='csv', status='present').decode())))
+
+        self.assertEqual(rows[0][0], 'Student ID')
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(rows[1][:4], ['S00001', 'Student', '0001', 'CS101'])
+
+    def test_xlsx_export_is_a_valid_workbook(self):
+        workbook = zipfile.ZipFile(BytesIO(self.export(format='xlsx')))
+
+        self.assertIsNone(workbook.testzip())
+        sheet = workbook.read('xl/worksheets/sheet1.xml').decode()
+        self.assertEqual(sheet.count('<row>'), 3)
+        self.assertIn('&lt;ok&gt; &amp; fine', sheet)
+
+    def test_unknown_format_is_rejected(self):
+        response = self.client.get(reverse('attendance_records_export'), {'format': 'pdf'})
+        self.assertEqual(response.status_code, 400)
+
+
+class KeysetPaginationTests(TestCase):
+    def setUp(self):
+        self.lecturer = make_lecturer()
+        self.courses = [
+            Course.objects.create(course_code=code, course_name=code, lecturer=self.lecturer)
+            for code in ('CS101', 'MA101')
+        ]
+        for day in range(1, 8):
+            for course in self.courses:
+                AttendanceSession.objects.create(
+                    course=course, session_date=date(2025, 1, day), session_time=time(9, 0), created_by=self.lecturer,
+                )
+        self.client.force_login(self.lecturer)
+        self.url = reverse('attendance_session_list')
+
+    def get_page(self, params):
+        response = self.client.get(self.url, params)
+        return response.context['page']
+
+    def page_ids(self, page):
+        return [session.pk for session in page]
+
+    @mock.patch('attendance.pagination.PAGE_SIZE', 4)
+    def test_pages_cover_every_row_once_in_order(self):
+        page = self.get_page({})
+        pages = [page]
+        while page.has_next():
+            page = self.get_page({'after': page.next_cursor})
+            pages.append(page)
+
+        expected = list(AttendanceSession.objects.order_by(
+            '-session_date', '-session_time', '-pk').values_list('pk', flat=True))
+        self.assertEqual([pk for page in pages for pk in self.page_ids(page)], expected)
+        self.assertEqual(len(pages), 4)
+
+        back = self.get_page({'before': pages[2].previous_cursor})
+        self.assertEqual(self.page_ids(back), self.page_ids(pages[1]))
+
+    @mock.patch('attendance.pagination.PAGE_SIZE', 4)
+    def test_cursor_is_stable_when_rows_are_inserted(self):
+        first = self.get_page({})
+        AttendanceSession.objects.create(
+            course=self.courses[0], session_date=date(2025, 2, 1), session_time=time(9, 0), created_by=self.lecturer,
+        )
+        second = self.get_page({'after': first.next_cursor})
+
+        expected = list(AttendanceSession.objects.filter(session_date__lte=date(2025, 1, 7)).order_by(
+            '-session_date', '-session_time', '-pk').values_list('pk', flat=True))
+        self.assertEqual(self.page_ids(first) + self.page_ids(second), expected[:8])
+
+    @mock.patch('attendance.pagination.PAGE_SIZE', 3)
+    def test_filters_carry_through_cursors(self):
+        course = self.courses[0]
+        student = make_student(1)
+        Enrollment.objects.create(student=student, course=course)
+        for session in AttendanceSession.objects.all():
+            AttendanceRecord.objects.create(session=session, student=student, status='present')
+
+        response = self.client.get(reverse('attendance_records'), {'course': course.pk})
+        page = response.context['page']
+        self.assertIn(f'course={course.pk}', page.next_query_string())
+
+        response = self.client.get(reverse('attendance_records') + '?' + page.next_query_string())
+        self.assertEqual(len(response.context['page']), 3)
+        self.assertTrue(all(record.session.course_id == course.pk for record in response.context['page']))
+
+
+class RosterImportTests(TestCase):
+    def setUp(self):
+        self.lecturer = make_lecturer()
+        self.course = Course.objects.create(course_code='CS101', course_name='Intro', lecturer=self.lecturer)
+        self.other = Course.objects.create(
+            course_code='MA101', course_name='Maths', lecturer=make_lecturer('other'),
+        )
+        self.students = [make_student(number) for number in range(1, 4)]
+        Enrollment.objects.create(student=self.students[0], course=self.course)
+
+    def test_import_reports_unknowns_and_duplicates(self):
+        lines = [
+            'student_id,course_code',
+            'S00001,CS101',
+            'S00002,CS101',
+            'S00002,CS101',
+            'S00003,MA101',
+            'S99999,CS101',
+            'S00003,XX999',
+            ',CS101',
+        ]
+
+        summary = import_roster(read_roster_csv(lines))
+
+        self.assertEqual(summary.created, 2)
+        self.assertEqual(summary.already_enrolled, 1)
+        self.assertEqual(summary.duplicate_rows, 1)
+        self.assertEqual(summary.unknown_students, {'S99999'})
+        self.assertEqual(summary.unknown_courses, {'XX999'})
+        self.assertEqual(summary.invalid_rows, [8])
+        self.assertTrue(Enrollment.objects.filter(student=self.students[1], course=self.course).exists())
+        self.assertEqual(AttendanceRollup.objects.count(), Enrollment.objects.count())
+
+    def test_view_only_imports_into_own_courses(self):
+        self.client.force_login(self.lecturer)
+        roster = SimpleUploadedFile('roster.csv', b'S00002,CS101\nS00003,MA101\n', content_type='text/csv')
+
+        response = self.client.post(reverse('enrollment_import'), {'roster': roster})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['summary'].created, 1)
+        self.assertEqual(response.context['summary'].unknown_courses, {'MA101'})
+        self.assertFalse(Enrollment.objects.filter(course=self.other).exists())
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class ProvisionUsersTests(TestCase):
+    def test_accounts_are_created_and_existing_ones_skipped(self):
+        make_student(1)
+        path = self.write_csv([
+            'username,first_name,last_name,email,role,student_id,phone,password',
+            'alice,Alice,Banda,alice@example.com,student,S10001,,secret-pass',
+            'lecturer2,Lec,Two,,lecturer,,,',
+            'student1,Dup,User,,student,S20000,,x',
+            'carol,Carol,Dup,,student,S00001,,x',
+            'dave,Dave,NoId,,student,,,x',
+        ])
+        out = StringIO()
+
+        call_command('provision_users', path, workers=1, stdout=out)
+
+        alice = User.objects.get(username='alice')
+        self.assertTrue(alice.check_password('secret-pass'))
+        self.assertEqual(alice.profile.student_id, 'S10001')
+        self.assertFalse(User.objects.get(username='lecturer2').has_usable_password())
+        self.assertEqual(User.objects.get(username='lecturer2').profile.role, 'lecturer')
+        self.assertFalse(User.objects.filter(username__in=['carol', 'dave']).exists())
+        self.assertIn('Provisioned 2 account(s), skipped 3', out.getvalue())
+
+    def write_csv(self, lines):
+        handle = tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False)
+        handle.write('\n'.join(lines) + '\n')
+        handle.close()
+        self.addCleanup(os.remove, handle.name)
+        return handle.name
+
+
+class DashboardCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.lecturer = make_lecturer()
+        self.course = Course.objects.create(course_code='CS101', course_name='Intro', lecturer=self.lecturer)
+        self.students = [make_student(number) for number in (1, 2)]
+        for student in self.students:
+            Enrollment.objects.create(student=student, course=self.course)
+        self.session = AttendanceSession.objects.create(
+            course=self.course, session_date=date(2025, 1, 6), session_time=time(9, 0), created_by=self.lecturer,
+        )
+
+    def dashboard_for(self, user):
+        self.client.force_login(user)
+        return self.client.get(reverse('dashboard')).context
+
+    def test_repeat_visits_are_served_from_cache(self):
+        self.dashboard_for(self.lecturer)
+        before = dashboard_cache_stats()
+
+        with CaptureQueriesContext(connection) as queries:
+            context = self.dashboard_for(self.lecturer)
+
+        self.assertEqual(dashboard_cache_stats()['hits'], before['hits'] + 1)
+        self.assertEqual(context['total_students'], 2)
+        # Only the conditional-GET validator query counts enrollments; the dashboard itself is not rebuilt.
+        self.assertEqual(sum('attendance_enrollment' in q['sql'] for q in queries.captured_queries), 1)
+
+    def test_marking_invalidates_only_the_affected_student(self):
+        first, second = self.students
+        self.dashboard_for(first)
+        self.dashboard_for(second)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            mark_attendance(self.session, {first.id: ('present', '')})
+
+        before = dashboard_cache_stats()
+        self.assertEqual(self.dashboard_for(first)['attendance_stats'][0]['attended'], 1)
+        self.assertEqual(self.dashboard_for(second)['attendance_stats'][0]['attended'], 0)
+        after = dashboard_cache_stats()
+        self.assertEqual((after['misses'] - before['misses'], after['hits'] - before['hits']), (1, 1))
+
+    def test_new_session_invalidates_course_dashboards(self):
+        student = self.students[0]
+        self.assertEqual(self.dashboard_for(student)['attendance_stats'][0]['total_sessions'], 1)
+        self.assertEqual(self.dashboard_for(self.lecturer)['total_sessions'], 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            AttendanceSession.objects.create(
+                course=self.course, session_date=date(2025, 1, 7), session_time=time(9, 0), created_by=self.lecturer,
+            )
+
+        self.assertEqual(self.dashboard_for(student)['attendance_stats'][0]['total_sessions'], 2)
+        self.assertEqual(self.dashboard_for(self.lecturer)['total_sessions'], 2)
+
+
+class PrincipalMiddlewareTests(TestCase):
+    def setUp(self):
+        self.lecturer = make_lecturer()
+        Course.objects.create(course_code='CS101', course_name='Intro', lecturer=self.lecturer)
+        self.client.force_login(self.lecturer)
+
+    def user_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('course_list'))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.context['principal'].is_lecturer)
+        return [q['sql'] for q in queries.captured_queries if 'auth_user' in q['sql'] or 'userprofile' in q['sql']]
+
+    def test_user_and_profile_load_in_one_query(self):
+        queries = self.user_queries()
+
+        self.assertEqual(len(queries), 1)
+        self.assertIn('attendance_userprofile', queries[0])
+
+    @override_settings(PRINCIPAL_SESSION_CACHE=True)
+    def test_cached_session_mode_skips_user_query_on_repeat_requests(self):
+        self.assertEqual(len(self.user_queries()), 1)
+        self.assertEqual(self.user_queries(), [])
+
+    def test_student_is_forbidden_from_lecturer_views(self):
+        self.client.force_login(make_student(1))
+        response = self.client.get(reverse('course_create'))
+        self.assertEqual(response.status_code, 403)
+
+
+class MetricsTests(TestCase):
+    def setUp(self):
+        metrics_registry.reset()
+        self.lecturer = make_lecturer()
+        self.client.force_login(self.lecturer)
+
+    def test_views_are_recorded_and_exposed_to_staff(self):
+        self.client.get(reverse('course_list'))
+        self.client.get(reverse('course_list'))
+
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 302)
+
+        self.lecturer.is_staff = True
+        self.lecturer.save()
+        response = self.client.get(reverse('metrics'))
+
+        self.assertEqual(response.status_code, 200)
+        body = response.content.decode()
+        self.assertIn('attendance_request_duration_seconds_count{view="course_list"} 2', body)
+        self.assertIn('attendance_request_db_queries_bucket{view="course_list",le="+Inf"} 2', body)
+        template_seconds = re.search(r'attendance_request_template_seconds_sum\{view="course_list"\} (\S+)', body)
+        self.assertGreater(float(template_seconds.group(1)), 0)
+        self.assertIn('attendance_dashboard_cache_hits_total', body)
+
+    @override_settings(SLOW_REQUEST_THRESHOLD_MS=0)
+    def test_slow_requests_are_logged_with_sql(self):
+        with self.assertLogs('attendance.slow_requests', level='WARNING') as logs:
+            self.client.get(reverse('course_list'))
+
+        self.assertIn('course_list', logs.output[0])
+        self.assertIn('attendance_course', logs.output[0])
+
+
+class SeedAndBenchmarkTests(TestCase):
+    SIZE = {'lecturers': 2, 'courses': 3, 'students': 12, 'courses_per_student': 2, 'sessions_per_course': 2}
+
+    def setUp(self):
+        cache.clear()
+
+    def seed(self, **options):
+        call_command('seed_university', password='', stdout=StringIO(), **{**self.SIZE, **options})
+        return list(AttendanceRecord.objects.order_by(
+            'session__course__course_code', 'session__session_date', 'student__username'
+        ).values_list('session__course__course_code', 'session__session_date', 'student__username', 'status'))
+
+    def test_seeding_is_deterministic_and_builds_rollups(self):
+        first = self.seed()
+        self.assertEqual(len(first), 12 * 2 * 2)
+        self.assertEqual(AttendanceRollup.objects.count(), 24)
+        self.assertEqual(sum(AttendanceRollup.objects.values_list('total_sessions', flat=True)), 48)
+
+        self.assertEqual(self.seed(clear=True), first)
+        self.assertNotEqual(self.seed(clear=True, seed=7), first)
+
+    def test_clearing_leaves_other_data_alone(self):
+        self.seed()
+        lecturer = make_lecturer()
+        course = Course.objects.create(course_code='CS101', course_name='Intro', lecturer=lecturer)
+        session = AttendanceSession.objects.create(
+            course=course, session_date=date(2025, 1, 6), session_time=time(9, 0), created_by=lecturer,
+        )
+        student = make_student(1)
+        Enrollment.objects.create(student=student, course=course)
+        mark_attendance(session, {student.id: ('present', '')})
+
+        clear_seeded_data()
+
+        self.assertEqual(list(AttendanceRecord.objects.values_list('session__course', flat=True)), [course.pk])
+        self.assertEqual(list(AttendanceRollup.objects.values_list('present', flat=True)), [1])
+        self.assertFalse(User.objects.filter(username__startswith=SEED_PREFIX).exists())
+
+    def test_bench_views_reports_json_and_flags_regressions(self):
+        self.seed()
+        AttendanceRecord.objects.update(remarks='Kept')
+        out = StringIO()
+        call_command('bench_views', iterations=2, warmup=0, stdout=out)
+        # The POST scenario re-submits what is on record, remarks included.
+        self.assertEqual(set(AttendanceRecord.objects.values_list('remarks', flat=True)), {'Kept'})
+        results = json.loads(out.getvalue())['results']
+        self.assertEqual(set(results), {
+            'dashboard:lecturer', 'dashboard:student', 'reports', 'attendance_mark:get',
+            'attendance_mark:post', 'attendance_records:lecturer', 'attendance_records:student',
+        })
+        self.assertTrue(all(row['p95_ms'] >= row['p50_ms'] > 0 for row in results.values()))
+
+        baseline = {name: {**row, 'queries': row['queries'] - 1} for name, row in results.items()}
+        regressions = compare_to_baseline(results, baseline)
+        self.assertEqual(len(regressions), len(results))
+        self.assertIn('queries', regressions[0])
+        self.assertEqual(compare_to_baseline(results, results), [])
+
+
+class AsyncViewTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.lecturer = make_lecturer()
+        self.course = Course.objects.create(course_code='CS101', course_name='Intro', lecturer=self.lecturer)
+        self.student = make_student(1)
+        Enrollment.objects.create(student=self.student, course=self.course)
+        session = AttendanceSession.objects.create(
+            course=self.course, session_date=date(2025, 1, 6), session_time=time(9, 0), created_by=self.lecturer,
+        )
+        AttendanceRecord.objects.create(session=session, student=self.student, status='present')
+
+    async def test_async_dashboards_match_the_sync_ones(self):
+        for user, keys in (
+            (self.lecturer, ['total_courses', 'total_students', 'total_sessions']),
+            (self.student, ['total_courses']),
+        ):
+            await self.async_client.aforce_login(user)
+            sync_response = await self.async_client.get(reverse('dashboard'))
+            await cache.aclear()
+            async_response = await self.async_client.get(reverse('dashboard_async'))
+
+            self.assertEqual(async_response.status_code, 200)
+            self.assertEqual(async_response.templates[0].name, sync_response.templates[0].name)
+            for key in keys:
+                self.assertEqual(async_response.context[key], sync_response.context[key])
+        self.assertEqual(async_response.context['attendance_stats'][0]['attendance_rate'], 100.0)
+
+    async def test_async_reports_match_and_stay_lecturer_only(self):
+        await self.async_client.aforce_login(self.lecturer)
+        params = {'course': self.course.pk}
+        sync_rows = (await self.async_client.get(reverse('reports'), params)).context['report_data']
+        response = await self.async_client.get(reverse('reports_async'), params)
+
+        self.assertEqual(response.context['report_data'], sync_rows)
+        self.assertEqual([c.pk for c in response.context['courses']], [self.course.pk])
+
+        await self.async_client.aforce_login(self.student)
+        self.assertEqual((await self.async_client.get(reverse('reports_async'), params)).status_code, 403)
+
+
+    async def test_async_reports_read_the_same_sources_and_revalidate(self):
+        await self.async_client.aforce_login(self.lecturer)
+        url = reverse('reports_async')
+        await sync_to_async(refresh_snapshots)()
+
+        response = await self.async_client.get(url, {'course': self.course.pk, 'source': 'snapshot'})
+        self.assertEqual((response.context['source'], len(response.context['report_data'])), ('snapshot', 1))
+        revalidated = await self.async_client.get(
+            url, {'course': self.course.pk, 'source': 'snapshot'}, headers={'if-none-match': response['ETag']},
+        )
+        self.assertEqual(revalidated.status_code, 304)
+
+        await sync_to_async(archive_semester)('2025-1')
+        response = await self.async_client.get(url, {'course': self.course.pk, 'semester': '2025-1'})
+        self.assertEqual(response.context['source'], 'archive')
+        self.assertEqual(response.context['report_data'][0].present, 1)
+
+class AsgiBenchmarkTests(TransactionTestCase):
+    def test_sync_and_async_views_are_benchmarked_through_asgi(self):
+        call_command('seed_university', lecturers=1, courses=2, students=4, courses_per_student=1,
+                     sessions_per_course=2, password='', stdout=StringIO())
+        out = StringIO()
+
+        call_command('bench_async', requests=4, concurrency=2, warmup=1, stdout=out)
+
+        results = json.loads(out.getvalue())['results']
+        self.assertEqual(set(results), {'dashboard:lecturer', 'dashboard:student', 'reports'})
+        for modes in results.values():
+            self.assertGreater(modes['async']['requests_per_second'], 0)
+            self.assertGreaterEqual(modes['sync']['p95_ms'], modes['sync']['p50_ms'])
+
+
+@override_settings(CHECKIN_FLUSH_INTERVAL=None)
+class SelfCheckinTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.lecturer = make_lecturer()
+        self.course = Course.objects.create(course_code='CS101', course_name='Intro', lecturer=self.lecturer)
+        self.students = [make_student(number) for number in range(1, 41)]
+        for student in self.students:
+            Enrollment.objects.create(student=student, course=self.course)
+        self.outsider = make_student(99)
+        self.session = AttendanceSession.objects.create(
+            course=self.course, session_date=date(2025, 1, 6), session_time=time(9, 0), created_by=self.lecturer,
+        )
+        AttendanceRecord.objects.create(
+            session=self.session, student=self.students[0], status='absent', remarks='Sick note',
+        )
+        self.addCleanup(checkin_buffer.flush)
+
+    def open_code(self):
+        self.client.force_login(self.lecturer)
+        self.client.post(reverse('attendance_checkin_control', args=[self.session.pk]), {'action': 'open'})
+        return self.client.get(reverse('attendance_mark', args=[self.session.pk])).context['checkin']['code']
+
+    def check_in(self, user, code):
+        self.client.force_login(user)
+        return self.client.post(reverse('attendance_checkin'), {'code': code})
+
+    def test_check_ins_are_validated_from_cache_and_written_in_one_batch(self):
+        code = self.open_code()
+
+        for student in self.students:
+            self.client.force_login(student)
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.post(reverse('attendance_checkin'), {'code': code.lower()})
+            self.assertRedirects(response, reverse('dashboard'), fetch_redirect_response=False)
+            self.assertFalse([
+                q for q in queries.captured_queries
+                if q['sql'].startswith(('INSERT', 'UPDATE'))
+                or 'attendance_enrollment' in q['sql'] or 'attendance_attendance' in q['sql']
+            ])
+        self.check_in(self.students[1], code)
+
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(checkin_buffer.flush(), len(self.students))
+        self.assertLess(len(queries), 12)
+
+        records = AttendanceRecord.objects.filter(session=self.session)
+        self.assertEqual(records.filter(status='present').count(), len(self.students))
+        self.assertEqual(records.get(student=self.students[0]).remarks, 'Sick note')
+        self.assertEqual(AttendanceRollup.objects.get(enrollment__student=self.students[0]).present, 1)
+
+    def test_invalid_closed_and_foreign_codes_are_rejected(self):
+        code = self.open_code()
+
+        self.assertEqual(self.check_in(self.outsider, code).status_code, 200)
+        self.assertEqual(self.check_in(self.students[0], 'ZZZZZZ').status_code, 200)
+
+        self.client.force_login(self.lecturer)
+        self.client.post(reverse('attendance_checkin_control', args=[self.session.pk]), {'action': 'close'})
+        self.assertEqual(self.check_in(self.students[0], code).status_code, 200)
+
+        self.assertEqual(checkin_buffer.flush(), 0)
+
+
+class CheckinLoadTests(TransactionTestCase):
+    def test_burst_is_absorbed_and_flushed_in_the_background(self):
+        call_command('seed_university', lecturers=1, courses=1, students=60, courses_per_student=1,
+                     sessions_per_course=1, password='', stdout=StringIO())
+        out = StringIO()
+
+        call_command('loadtest_checkin', students=60, concurrency=10, max_p95_ms=5000, stdout=out)
+
+        report = json.loads(out.getvalue())
+        self.assertEqual((report['failures'], report['recorded']), (0, 60))
+        self.assertLess(report['flushes'], 60)
+
+
+class DatabaseProfileTests(SimpleTestCase):
+    def test_tuned_sqlite_profile_removes_lock_errors(self):
+        # Run outside the test runner, which refuses connections to databases it did not set up.
+        result = subprocess.run(
+            [sys.executable, 'manage.py', 'bench_db_writes', '--threads', '4', '--transactions', '30'],
+            cwd=settings.BASE_DIR, capture_output=True, text=True, check=True,
+        )
+
+        report = json.loads(result.stdout)
+        self.assertEqual((report['default']['journal_mode'], report['tuned']['journal_mode']), ('delete', 'wal'))
+        self.assertEqual(report['tuned']['lock_errors'], 0)
+        self.assertEqual(report['tuned']['committed'], 120)
+        self.assertEqual(report['tuned']['lost_updates'], 0)
+
+
+class TrendAnalyticsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.lecturer = make_lecturer()
+        self.course = Course.objects.create(course_code='CS101', course_name='Intro', lecturer=self.lecturer)
+        self.steady, self.dropping = make_student(1), make_student(2)
+        for student in (self.steady, self.dropping):
+            Enrollment.objects.create(student=student, course=self.course)
+        # Four weekly sessions; the second student stops attending after week two.
+        for week in range(4):
+            session = AttendanceSession.objects.create(
+                course=self.course, session_date=date(2025, 1, 6 + week * 7), session_time=time(9, 0),
+                created_by=self.lecturer,
+            )
+            AttendanceRecord.objects.create(session=session, student=self.steady, status='present')
+            AttendanceRecord.objects.create(
+                session=session, student=self.dropping, status='present' if week < 2 else 'absent',
+            )
+
+    def test_weekly_curves_and_dropping_students(self):
+        trends = course_trends(self.course, window=2)
+        series = weekly_series(trends)
+
+        self.assertEqual(series['weeks'], ['2025-01-06', '2025-01-13', '2025-01-20', '2025-01-27'])
+        self.assertEqual(series['rate'], [100.0, 100.0, 50.0, 50.0])
+        self.assertEqual(series['moving_average'], [100.0, 100.0, 75.0, 50.0])
+        dropping = dropping_students(trends)
+        self.assertEqual([row['student'] for row in dropping], [self.dropping])
+        self.assertEqual((dropping[0]['overall'], dropping[0]['recent']), (50.0, 0.0))
+
+    def test_cached_arrays_are_recomputed_after_marking(self):
+        course_trends(self.course)
+        with CaptureQueriesContext(connection) as queries:
+            course_trends(self.course)
+        self.assertEqual(len(queries), 1)
+
+        session = AttendanceSession.objects.filter(course=self.course).first()
+        mark_attendance(session, {self.dropping.id: ('present', '')})
+
+        self.assertEqual(weekly_series(course_trends(self.course))['rate'][-1], 100.0)
+
+    def test_moving_a_session_to_another_week_is_picked_up(self):
+        course_trends(self.course)
+        session = AttendanceSession.objects.filter(course=self.course).order_by('session_date').last()
+        session.session_date = date(2025, 2, 3)
+        session.save()
+
+        self.assertEqual(weekly_series(course_trends(self.course))['weeks'][-1], '2025-02-03')
+
+    def test_trends_page_renders_for_the_course_lecturer(self):
+        self.client.force_login(self.lecturer)
+        response = self.client.get(reverse('trends'), {'course': self.course.pk})
+
+        self.assertContains(response, 'trend-data')
+        self.assertContains(response, 'S00002')
+        self.client.force_login(self.steady)
+        self.assertEqual(self.client.get(reverse('trends')).status_code, 403)
+
+
+class ReportSnapshotTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.lecturer = make_lecturer()
+        self.course = Course.objects.create(course_code='CS101', course_name='Intro', lecturer=self.lecturer)
+        self.students = [make_student(number) for number in (1, 2, 3)]
+        for student in self.students:
+            Enrollment.objects.create(student=student, course=self.course)
+        self.sessions = [self.add_session(day) for day in (6, 8, 14)]
+        for session in self.sessions:
+            mark_attendance(session, {student.id: ('present', '') for student in self.students})
+
+    def add_session(self, day):
+        return AttendanceSession.objects.create(
+            course=self.course, session_date=date(2025, 1, day), session_time=time(9, 0), created_by=self.lecturer,
+        )
+
+    def assertMatchesLive(self):
+        rows, as_of = build_snapshot_report(self.course)
+        self.assertIsNotNone(as_of)
+        self.assertEqual(rows, build_course_report(self.course))
+
+    def test_incremental_refresh_tracks_changes_and_deletions(self):
+        self.assertEqual(refresh_snapshots()['mode'], 'full')
+        self.assertMatchesLive()
+
+        mark_attendance(self.sessions[0], {self.students[0].id: ('late', '')})
+        AttendanceRecord.objects.get(session=self.sessions[2], student=self.students[1]).delete()
+        summary = refresh_snapshots()
+        # Only the two touched weeks are recomputed.
+        self.assertEqual((summary['mode'], summary['weeks_recomputed']), ('incremental', 2))
+        self.assertMatchesLive()
+
+        self.sessions[1].delete()
+        self.add_session(21)
+        refresh_snapshots()
+        self.assertMatchesLive()
+
+        moved = self.sessions[2]
+        moved.session_date = date(2025, 1, 28)
+        moved.save()
+        refresh_snapshots()
+        self.assertMatchesLive()
+
+    def test_quiet_refresh_recomputes_nothing(self):
+        # Rows older than SNAPSHOT_WATERMARK_OVERLAP are behind the watermark after one refresh.
+        AttendanceRecord.objects.update(marked_at=timezone.now() - timedelta(hours=1))
+        AttendanceSession.objects.update(created_at=timezone.now() - timedelta(hours=1))
+        refresh_snapshots()
+
+        with CaptureQueriesContext(connection) as queries:
+            summary = refresh_snapshots()
+
+        self.assertEqual((summary['weeks_recomputed'], summary['student_weeks']), (0, 0))
+        self.assertFalse([query for query in queries if 'INSERT INTO "attendance_studentweeksnapshot"' in query['sql']])
+
+    def test_reports_page_reads_the_snapshot(self):
+        self.client.force_login(self.lecturer)
+        url = reverse('reports')
+
+        response = self.client.get(url, {'course': self.course.pk, 'source': 'snapshot'})
+        self.assertEqual(response.context['source'], 'live')
+        self.assertNotContains(response, 'Data as of')
+
+        call_command('refresh_snapshots', stdout=StringIO())
+        mark_attendance(self.sessions[0], {self.students[0].id: ('absent', '')})
+        response = self.client.get(url, {'course': self.course.pk, 'source': 'snapshot'})
+
+        self.assertContains(response, 'Data as of')
+        row = response.context['report_data'][0]
+        self.assertEqual((row.present, row.absent), (3, 0))
+
+
+class SemesterArchiveTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.lecturer = make_lecturer()
+        self.course = Course.objects.create(course_code='CS101', course_name='Intro', lecturer=self.lecturer)
+        self.students = [make_student(number) for number in (1, 2)]
+        for student in self.students:
+            Enrollment.objects.create(student=student, course=self.course)
+        self.old_sessions = [
+            AttendanceSession.objects.create(
+                course=self.course, session_date=date(2024, 9, day), session_time=time(9, 0), created_by=self.lecturer,
+            )
+            for day in (2, 9, 16)
+        ]
+        self.current = AttendanceSession.objects.create(
+            course=self.course, session_date=timezone.localdate(), session_time=time(9, 0), created_by=self.lecturer,
+        )
+        for session in self.old_sessions + [self.current]:
+            mark_attendance(session, {self.students[0].id: ('present', ''), self.students[1].id: ('absent', 'sick')})
+
+    def rollups(self):
+        return sorted(AttendanceRollup.objects.values_list('enrollment_id', 'total_sessions', 'present', 'late', 'absent'))
+
+    def assertRollupsConsistent(self):
+        before = self.rollups()
+        rebuild_rollups()
+        self.assertEqual(self.rollups(), before)
+
+    def test_archive_and_restore_round_trip(self):
+        originals = sorted(AttendanceRecord.objects.values_list('pk', 'session_id', 'student_id', 'status', 'remarks', 'marked_at'))
+
+        summary = archive_semester('2024-2', batch_size=2)
+
+        self.assertEqual((summary.sessions, summary.records, summary.batches), (3, 6, 2))
+        self.assertEqual(list(AttendanceSession.objects.all()), [self.current])
+        self.assertEqual(ArchivedRecord.objects.filter(session__semester='2024-2').count(), 6)
+        self.assertRollupsConsistent()
+        self.assertEqual(archive_semester('2024-2').sessions, 0)
+
+        restore_semester('2024-2')
+
+        self.assertFalse(ArchivedSession.objects.exists())
+        self.assertEqual(
+            sorted(AttendanceRecord.objects.values_list('pk', 'session_id', 'student_id', 'status', 'remarks', 'marked_at')),
+            originals,
+        )
+        self.assertRollupsConsistent()
+
+    def test_device_time_survives_the_round_trip(self):
+        session = self.old_sessions[0]
+        tapped = timezone.make_aware(datetime.combine(session.session_date, time(9, 5)))
+        earlier = [(0, session.pk, 'S00002', 'present', tapped - timedelta(minutes=4))]
+        record_device_events([(0, session.pk, 'S00002', 'late', tapped)], AttendanceSession.objects.all())
+
+        archive_semester('2024-2')
+        restore_semester('2024-2')
+
+        # An older batch uploaded after the restore is still judged against the restored device time.
+        self.assertEqual(record_device_events(earlier, AttendanceSession.objects.all()).stale, 1)
+        record = AttendanceRecord.objects.get(session=session, student=self.students[1])
+        self.assertEqual((record.status, record.event_at), ('late', tapped))
+
+    def test_restore_reports_sessions_taken_by_live_ones(self):
+        archive_semester('2024-2')
+        clash = self.old_sessions[1]
+        AttendanceSession.objects.create(
+            course=self.course, session_date=clash.session_date, session_time=clash.session_time, created_by=self.lecturer,
+        )
+
+        out = StringIO()
+        call_command('archive_semesters', '--restore', '--semester', '2024-2', stdout=out)
+
+        self.assertIn('Left 1 archived session(s) of 2024-2 in the archive', out.getvalue())
+        self.assertEqual(list(ArchivedSession.objects.values_list('pk', flat=True)), [clash.pk])
+        self.assertEqual(ArchivedRecord.objects.count(), 2)
+        self.assertEqual(AttendanceSession.objects.count(), 4)
+        self.assertRollupsConsistent()
+
+    def test_interrupted_archive_resumes(self):
+        with mock.patch('attendance.archive.invalidate_weeks', side_effect=[None, RuntimeError('killed')]):
+            with self.assertRaises(RuntimeError):
+                archive_semester('2024-2', batch_size=1)
+        # The first batch committed; the failed one rolled back entirely.
+        self.assertEqual(ArchivedSession.objects.count(), 1)
+        self.assertEqual(AttendanceRecord.objects.count(), 6)
+
+        summary = archive_semester('2024-2', batch_size=1)
+
+        self.assertEqual((summary.sessions, ArchivedRecord.objects.count()), (2, 6))
+        self.assertRollupsConsistent()
+
+    def test_command_archives_closed_semesters_only(self):
+        with self.assertRaises(ValueError):
+            archive_semester(semester_of(timezone.localdate()))
+        out = StringIO()
+        call_command('archive_semesters', stdout=out)
+
+        self.assertIn('Archived 2024-2: 3 session(s) and 6 record(s)', out.getvalue())
+        self.assertEqual(list(AttendanceSession.objects.all()), [self.current])
+
+    def test_records_and_reports_read_through_the_archive(self):
+        archive_semester('2024-2')
+        self.client.force_login(self.lecturer)
+
+        response = self.client.get(reverse('attendance_records'))
+        self.assertEqual(len(response.context['records']), 2)
+        response = self.client.get(reverse('attendance_records'), {'semester': '2024-2'})
+        self.assertEqual(len(response.context['records']), 6)
+        self.assertContains(response, 'sick')
+
+        response = self.client.get(reverse('reports'), {'course': self.course.pk, 'semester': '2024-2'})
+        rows = {row.student: row for row in response.context['report_data']}
+        self.assertEqual((rows[self.students[0]].total_sessions, rows[self.students[0]].present), (3, 3))
+        self.assertEqual(rows[self.students[1]].absent, 3)
+
+        self.client.force_login(self.students[1])
+        response = self.client.get(reverse('attendance_records'), {'semester': '2024-2'})
+        self.assertEqual(response.context['semesters'], ['2024-2'])
+        self.assertEqual(len(response.context['records']), 3)
+
+
+
+class SearchIndexTests(TestCase):
+    def setUp(self):
+        self.lecturer = make_lecturer()
+        self.course = Course.objects.create(course_code='CS101', course_name='Intro to Programming', lecturer=self.lecturer)
+        self.student = make_student(1)
+        Enrollment.objects.create(student=self.student, course=self.course)
+        self.session = AttendanceSession.objects.create(
+            course=self.course, session_date=date(2025, 3, 3), session_time=time(9, 0),
+            topic='Recursion basics', created_by=self.lecturer,
+        )
+        other = make_lecturer('other')
+        self.other_course = Course.objects.create(course_code='CS102', course_name='Intro to Databases', lecturer=other)
+        self.outsider = make_student(2)
+        Enrollment.objects.create(student=self.outsider, course=self.other_course)
+
+    def matches(self, term, kind):
+        return sorted(matching_entries(term, [kind]).values_list('object_id', flat=True))
+
+    def test_signals_keep_the_index_in_sync(self):
+        self.assertEqual(self.matches('S0000', 'user'), [self.student.pk, self.outsider.pk])
+        self.assertEqual(self.matches('recur', 'session'), [self.session.pk])
+        self.assertEqual(self.matches('intro prog', 'course'), [self.course.pk])
+
+        self.course.course_code = 'CS199'
+        self.course.save()
+        self.assertEqual(self.matches('cs199', 'course'), [self.course.pk])
+        self.assertEqual(self.matches('cs199', 'session'), [self.session.pk])
+        self.assertEqual(self.matches('cs101', 'session'), [])
+
+        self.session.delete()
+        self.assertEqual(self.matches('recur', 'session'), [])
+        self.outsider.delete()
+        self.assertEqual(self.matches('S0000', 'user'), [self.student.pk])
+
+    def test_rebuild_restores_a_lost_index(self):
+        expected = sorted(SearchEntry.objects.values_list('kind', 'object_id', 'text'))
+        SearchEntry.objects.all().delete()
+
+        self.assertEqual(rebuild_search_index(), len(expected))
+        self.assertEqual(sorted(SearchEntry.objects.values_list('kind', 'object_id', 'text')), expected)
+        self.assertEqual(self.matches('recur', 'session'), [self.session.pk])
+
+    def test_search_view_is_limited_to_the_lecturers_courses(self):
+        self.client.force_login(self.lecturer)
+
+        response = self.client.get(reverse('search'), {'q': 'intro'})
+
+        results = dict(response.context['results'])
+        self.assertEqual([entry.object_id for entry in results['Course']], [self.course.pk])
+        response = self.client.get(reverse('search'), {'q': 'student'})
+        self.assertEqual([entry.object_id for entry in dict(response.context['results'])['User']], [self.student.pk])
+
+    def test_admin_search_uses_the_index(self):
+        admin = User.objects.create_superuser('admin', 'admin@example.com', 'pw')
+        self.client.force_login(admin)
+
+        response = self.client.get(reverse('admin:attendance_userprofile_changelist'), {'q': 'S00002'})
+
+        self.assertEqual([profile.user for profile in response.context['cl'].result_list], [self.outsider])
+        response = self.client.get(reverse('admin:attendance_attendancesession_changelist'), {'q': 'recursion'})
+        self.assertEqual(list(response.context['cl'].result_list), [self.session])
+
+
+    def test_fallback_filters_on_the_indexed_upper_text_expression(self):
+        migration = importlib.import_module('attendance.migrations.0011_search_upper_trgm_index')
+        entries = like_entries(['recur', 'cs101'], ['session'])
+
+        sql, params = entries.query.sql_with_params()
+
+        self.assertIn('gin ((UPPER(text)) gin_trgm_ops)', migration.POSTGRESQL_SQL[1])
+        self.assertEqual(sql.count('UPPER("attendance_searchentry"."text") LIKE'), 2)
+        self.assertEqual(params[-2:], ('%RECUR%', '%CS101%'))
+        self.assertEqual(list(entries.values_list('object_id', flat=True)), [self.session.pk])
+
+class AdminChangelistTests(TestCase):
+    # Session and user lookups, the page and its COUNT, list filter choices and date drill-down; never per row.
+    QUERIES = {
+        'userprofile': 5, 'course': 6, 'enrollment': 6,
+        'attendancesession': 8, 'attendancerecord': 8, 'attendancerollup': 5,
+    }
+
+    def setUp(self):
+        self.admin = User.objects.create_superuser('admin', 'admin@example.com', 'pw')
+        self.lecturer = make_lecturer()
+        self.students = [make_student(number) for number in range(1, 4)]
+        self.course = Course.objects.create(course_code='CS101', course_name='Intro', lecturer=self.lecturer)
+        for student in self.students:
+            Enrollment.objects.create(student=student, course=self.course)
+        self.add_session(1)
+        self.client.force_login(self.admin)
+
+    def add_session(self, day):
+        session = AttendanceSession.objects.create(
+            course=self.course, session_date=date(2025, 3, day), session_time=time(9, 0), created_by=self.lecturer,
+        )
+        mark_attendance(session, {student.id: ('present', '') for student in self.students})
+
+    def changelist(self, name, **params):
+        return self.client.get(reverse(f'admin:attendance_{name}_changelist'), params)
+
+    def test_query_count_is_pinned_per_changelist(self):
+        for day in range(2, 6):
+            self.add_session(day)
+
+        for name, expected in self.QUERIES.items():
+            with self.subTest(name), self.assertNumQueries(expected):
+                response = self.changelist(name)
+            self.assertEqual(response.status_code, 200)
+
+    def test_record_date_drilldown_reads_sessions(self):
+        self.add_session(2)
+
+        response = self.changelist('attendancerecord')
+
+        self.assertContains(response, 'session__session_date__day=2')
+        self.assertEqual(response.context['cl'].result_count, 6)
+        response = self.changelist('attendancerecord', session__session_date__day='2',
+                                   session__session_date__month='3', session__session_date__year='2025')
+        self.assertEqual(len(response.context['cl'].result_list), 3)
+
+    def test_drilldown_bounds_are_rewritten_to_the_sessions_table(self):
+        self.add_session(9)
+        records = SessionDateQuerySet(AttendanceRecord)
+
+        with CaptureQueriesContext(connection) as queries:
+            bounds = records.aggregate(first=Min('session__session_date'), last=Max('session__session_date'))
+
+        self.assertEqual(bounds, {'first': date(2025, 3, 1), 'last': date(2025, 3, 9)})
+        sql = queries.captured_queries[0]['sql']
+        self.assertRegex(sql, r'FROM "attendance_attendancesession" WHERE EXISTS')
+        # Anything but the date_hierarchy bounds is left to the records table.
+        self.assertEqual(records.aggregate(total=Count('pk'), last=Max('session__session_date'))['total'], 6)
+        self.assertEqual(records.aggregate(last=Max('marked_at'))['last'], AttendanceRecord.objects.latest('marked_at').marked_at)
+
+    def test_course_filter_lists_only_courses_with_sessions(self):
+        Course.objects.create(course_code='CS999', course_name='Unused', lecturer=self.lecturer)
+        other = Course.objects.create(course_code='CS102', course_name='Other', lecturer=self.lecturer)
+        AttendanceSession.objects.create(
+            course=other, session_date=date(2025, 3, 1), session_time=time(9, 0), created_by=self.lecturer,
+        )
+
+        response = self.changelist('attendancerecord')
+
+        self.assertContains(response, f'session__course__id__exact={other.pk}')
+        self.assertNotContains(response, 'CS999')
+
+    @override_settings(ADMIN_ESTIMATED_COUNT_ABOVE=0)
+    def test_unfiltered_changelist_uses_estimated_count(self):
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        self.add_session(2)
+
+        # The estimate is only as fresh as the last ANALYZE; filtered pages count exactly.
+        self.assertEqual(self.changelist('attendancerecord').context['cl'].result_count, 3)
+        self.assertEqual(self.changelist('attendancerecord', status__exact='present').context['cl'].result_count, 6)
+
+
+class AutocompleteTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.lecturer = make_lecturer()
+        self.course = Course.objects.create(course_code='CS101', course_name='Intro', lecturer=self.lecturer)
+        Course.objects.create(course_code='CS201', course_name='Algorithms', lecturer=make_lecturer('other'))
+        self.students = [make_student(number) for number in range(1, 4)]
+        self.client.force_login(self.lecturer)
+
+    def test_student_endpoint_pages_through_prefix_matches(self):
+        with override_settings(AUTOCOMPLETE_PAGE_SIZE=2):
+            first = self.client.get(reverse('autocomplete_students'), {'q': 'S0000'}).json()
+            second = self.client.get(reverse('autocomplete_students'), {'q': 'S0000', 'page': 2}).json()
+
+        self.assertEqual([result['id'] for result in first['results'] + second['results']], [s.pk for s in self.students])
+        self.assertEqual((first['pagination']['more'], second['pagination']['more']), (True, False))
+        self.assertEqual(first['results'][0]['text'], 'Student 0001 (S00001)')
+        self.assertEqual(self.client.get(reverse('autocomplete_students'), {'q': 'S00002'}).json()['results'][0]['id'],
+                         self.students[1].pk)
+
+    def test_course_endpoint_only_lists_own_courses(self):
+        results = self.client.get(reverse('autocomplete_courses'), {'q': 'cs'}).json()['results']
+
+        self.assertEqual(results, [{'id': self.course.pk, 'text': 'CS101 - Intro'}])
+        self.client.force_login(self.students[0])
+        self.assertEqual(self.client.get(reverse('autocomplete_courses')).status_code, 403)
+
+    def test_enrollment_form_renders_only_the_selected_student(self):
+        response = self.client.get(reverse('enrollment_create'))
+        self.assertContains(response, f'data-autocomplete-url="{reverse("autocomplete_students")}"')
+        self.assertNotContains(response, 'S00001')
+
+        response = self.client.post(reverse('enrollment_create'), {'student': self.students[0].pk, 'course': ''})
+        self.assertContains(response, f'<option value="{self.students[0].pk}" selected>Student 0001 (S00001)</option>', html=True)
+        self.client.post(reverse('enrollment_create'), {'student': self.students[0].pk, 'course': self.course.pk})
+        self.assertTrue(Enrollment.objects.filter(student=self.students[0], course=self.course).exists())
+
+    def test_course_choices_are_cached_until_a_course_changes(self):
+        AttendanceSessionForm(lecturer=self.lecturer)
+        with self.assertNumQueries(0):
+            choices = list(AttendanceSessionForm(lecturer=self.lecturer).fields['course'].choices)
+        self.assertEqual(choices, [('', '---------'), (self.course.pk, 'CS101 - Intro')])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.course.course_name = 'Introduction'
+            self.course.save()
+        self.assertEqual(AttendanceSessionForm(lecturer=self.lecturer).fields['course'].choices[1][1], 'CS101 - Introduction')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.course.lecturer = User.objects.get(username='other')
+            self.course.save()
+        self.assertEqual(AttendanceSessionForm(lecturer=self.lecturer).fields['course'].choices, [('', '---------')])
+
+
+class DeviceApiTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.lecturer = make_lecturer()
+        self.course = Course.objects.create(course_code='CS101', course_name='Intro', lecturer=self.lecturer)
+        self.students = [make_student(number) for number in (1, 2, 3)]
+        for student in self.students[:2]:
+            Enrollment.objects.create(student=student, course=self.course)
+        self.session = AttendanceSession.objects.create(
+            course=self.course, session_date=date(2025, 3, 3), session_time=time(9, 0), created_by=self.lecturer,
+        )
+        self.device = MarkingDevice(name='Room 1', owner=self.lecturer)
+        self.token = self.device.issue_token()
+
+    def event(self, student, status='present', minutes=0, session=None):
+        return {
+            'session_id': (session or self.session).pk, 'student_id': student.profile.student_id, 'status': status,
+            'timestamp': (timezone.now() + timedelta(minutes=minutes)).isoformat(),
+        }
+
+    def post(self, events, token=None, compress=True):
+        body = json.dumps({'events': events}).encode()
+        headers = {'authorization': f'Bearer {token or self.token}'}
+        if compress:
+            body = gzip.compress(body)
+            headers['content-encoding'] = 'gzip'
+        return self.client.post(reverse('device_attendance'), body, content_type='application/json', headers=headers)
+
+    def records(self):
+        return dict(AttendanceRecord.objects.values_list('student__profile__student_id', 'status'))
+
+    def test_batch_is_upserted_and_safe_to_resubmit(self):
+        events = [self.event(self.students[0], 'late', minutes=-1), self.event(self.students[1]),
+                  self.event(self.students[0], 'present')]
+
+        summary = self.post(events).json()
+
+        self.assertEqual((summary['created'], summary['superseded'], summary['rejected']), (2, 1, []))
+        self.assertEqual(self.records(), {'S00001': 'present', 'S00002': 'present'})
+        rollups = sorted(AttendanceRollup.objects.values_list('enrollment_id', 'present', 'late', 'absent'))
+        rebuild_rollups()
+        self.assertEqual(sorted(AttendanceRollup.objects.values_list('enrollment_id', 'present', 'late', 'absent')), rollups)
+
+        replay = self.post(events, compress=False).json()
+        self.assertEqual((replay['created'], replay['updated'], replay['unchanged']), (0, 0, 2))
+
+    def test_staleness_is_judged_in_device_time(self):
+        tap = self.event(self.students[0], 'late', minutes=-10)
+        self.post([tap])
+        mark_attendance(self.session, {self.students[0].id: ('absent', 'sick')})
+
+        # A late upload of the same (or an older) tap does not undo the correction made in the app...
+        self.assertEqual(self.post([tap]).json()['stale'], 1)
+        summary = self.post([self.event(self.students[0], 'present', minutes=-20)]).json()
+        self.assertEqual((summary['stale'], self.records()['S00001']), (1, 'absent'))
+
+        # ...but a later tap still lands, however long after the app mark it is uploaded.
+        summary = self.post([self.event(self.students[0], 'present', minutes=-5)]).json()
+        self.assertEqual((summary['updated'], self.records()['S00001']), (1, 'present'))
+        self.assertEqual(AttendanceRecord.objects.get(student=self.students[0]).remarks, 'sick')
+
+    def test_unchanged_taps_advance_the_device_time(self):
+        self.post([self.event(self.students[0], 'present', minutes=-10)])
+        self.post([self.event(self.students[0], 'present', minutes=-2)])
+
+        summary = self.post([self.event(self.students[0], 'late', minutes=-5)]).json()
+
+        self.assertEqual((summary['stale'], self.records()['S00001']), (1, 'present'))
+
+    def test_bad_events_are_rejected_individually(self):
+        other = Course.objects.create(course_code='CS102', course_name='Other', lecturer=make_lecturer('other'))
+        foreign = AttendanceSession.objects.create(
+            course=other, session_date=date(2025, 3, 3), session_time=time(9, 0), created_by=other.lecturer,
+        )
+        events = [
+            self.event(self.students[0]),
+            self.event(self.students[2]),
+            self.event(self.students[0], session=foreign),
+            {**self.event(self.students[1]), 'status': 'asleep'},
+            {**self.event(self.students[1]), 'student_id': 'S99999'},
+            {**self.event(self.students[1]), 'timestamp': '2025-02-30T10:00:00'},
+        ]
+
+        summary = self.post(events).json()
+
+        self.assertEqual(summary['created'], 1)
+        self.assertEqual(summary['rejected'], [
+            {'index': 1, 'error': 'student is not enrolled in the course'},
+            {'index': 2, 'error': 'unknown session'},
+            {'index': 3, 'error': 'status must be one of absent, late, present'},
+            {'index': 4, 'error': 'unknown student'},
+            {'index': 5, 'error': 'timestamp must be an ISO 8601 date and time'},
+        ])
+
+    def test_requests_need_a_valid_token_and_body(self):
+        self.assertEqual(self.post([], token='wrong').status_code, 401)
+        self.device.is_active = False
+        self.device.save()
+        self.assertEqual(self.post([]).status_code, 401)
+        self.device.is_active = True
+        self.device.save()
+
+        url = reverse('device_attendance')
+        headers = {'authorization': f'Bearer {self.token}'}
+        self.assertEqual(self.client.post(url, b'not gzip', content_type='application/json',
+                                          headers={**headers, 'content-encoding': 'gzip'}).status_code, 400)
+        self.assertEqual(self.client.post(url, b'[1, 2]', content_type='application/json', headers=headers).status_code, 400)
+        with override_settings(DEVICE_API_MAX_BODY_BYTES=100):
+            self.assertEqual(self.post([self.event(self.students[0])] * 10).status_code, 413)
+            self.assertEqual(self.post([self.event(self.students[0])] * 10, compress=False).status_code, 413)
+        self.assertEqual(self.client.get(url, headers=headers).status_code, 405)
+        self.assertIsNotNone(MarkingDevice.objects.get().last_seen_at)
+
+    @override_settings(DATA_UPLOAD_MAX_MEMORY_SIZE=100)
+    def test_uncompressed_batches_are_limited_by_the_device_setting(self):
+        response = self.post([self.event(student) for student in self.students[:2]], compress=False)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['created'], 2)
+
+    def test_benchmark_command_reports_throughput(self):
+        call_command('seed_university', lecturers=1, courses=2, students=30, courses_per_student=1,
+                     sessions_per_course=1, password='', stdout=StringIO())
+        out = StringIO()
+
+        call_command('bench_device_api', events=80, batch_size=25, min_events_per_second=0, stdout=out)
+
+        report = json.loads(out.getvalue())
+        self.assertEqual((report['created'], report['replay_unchanged'], report['recorded']), (80, 80, 80))
+        self.assertEqual(MarkingDevice.objects.count(), 1)
+
+
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.lecturer = make_lecturer()
+        self.course = Course.objects.create(course_code='CS101', course_name='Intro', lecturer=self.lecturer)
+        self.student = make_student(1)
+        Enrollment.objects.create(student=self.student, course=self.course)
+        self.session = AttendanceSession.objects.create(
+            course=self.course, session_date=date(2025, 3, 3), session_time=time(9, 0), created_by=self.lecturer,
+        )
+        mark_attendance(self.session, {self.student.id: ('present', '')})
+
+    def revalidate(self, url, response):
+        return self.client.get(url, headers={'if-none-match': response['ETag']})
+
+    def test_unchanged_pages_answer_304_without_rebuilding(self):
+        self.client.force_login(self.lecturer)
+        url = reverse('reports') + f'?course={self.course.pk}'
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('private', response['Cache-Control'])
+        self.assertIn('no-cache', response['Cache-Control'])
+
+        # Session and user lookups plus the single validator query.
+        with self.assertNumQueries(3):
+            self.assertEqual(self.revalidate(url, response).status_code, 304)
+        modified_since = {'if-modified-since': response['Last-Modified']}
+        self.assertEqual(self.client.get(url, headers=modified_since).status_code, 304)
+
+    def test_marking_a_record_changes_the_validators(self):
+        pages = [(self.lecturer, reverse('attendance_records'), 'late'), (self.student, reverse('dashboard'), 'absent')]
+        for user, url, status in pages:
+            self.client.force_login(user)
+            before = self.client.get(url)
+            self.assertEqual(self.revalidate(url, before).status_code, 304)
+
+            mark_attendance(self.session, {self.student.id: (status, '')})
+
+            after = self.revalidate(url, before)
+            self.assertEqual(after.status_code, 200)
+            self.assertNotEqual(after['ETag'], before['ETag'])
+            self.assertEqual(self.revalidate(url, after).status_code, 304)
+
+    def test_editing_a_session_changes_the_etag(self):
+        self.client.force_login(self.student)
+        url = reverse('attendance_records')
+        response = self.client.get(url)
+
+        self.session.topic = 'Moved to the lab'
+        self.session.save()
+
+        response = self.revalidate(url, response)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Moved to the lab')
+
+    def test_deletions_and_logins_change_the_etag(self):
+        self.client.force_login(self.student)
+        url = reverse('attendance_records')
+        response = self.client.get(url)
+
+        AttendanceRecord.objects.all().delete()
+        self.assertEqual(self.revalidate(url, response).status_code, 200)
+
+        response = self.client.get(url)
+        self.client.logout()
+        self.client.force_login(self.student)
+        self.assertEqual(self.revalidate(url, response).status_code, 200)
+
+    def test_removing_sessions_changes_the_etag_without_counting_records(self):
+        self.client.force_login(self.lecturer)
+        url = reverse('attendance_records')
+        other = AttendanceSession.objects.create(
+            course=self.course, session_date=date(2024, 9, 2), session_time=time(9, 0), created_by=self.lecturer,
+        )
+        mark_attendance(other, {self.student.id: ('late', '')})
+
+        response = self.client.get(url)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.revalidate(url, response).status_code, 304)
+        self.assertNotRegex(queries.captured_queries[-1]['sql'], r'COUNT\([^)]*\) AS "value" FROM "attendance_attendance')
+
+        archive_semester('2024-2')
+        response = self.revalidate(url, response)
+        self.assertEqual(response.status_code, 200)
+
+        self.session.delete()
+        self.assertEqual(self.revalidate(url, response).status_code, 200)
+
+    def test_pending_messages_force_a_full_render(self):
+        self.client.force_login(self.lecturer)
+        other = make_student(2)
+        self.client.post(reverse('enrollment_create'), {'student': other.pk, 'course': self.course.pk})
+
+        response = self.client.get(reverse('dashboard'))
+        self.assertNotIn('ETag', response)
+        self.assertEqual(len(response.context['messages']), 1)
+        self.assertIn('ETag', self.client.get(reverse('dashboard')))
+
+
+class MarkingDeltaTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.lecturer = make_lecturer()
+        self.course = Course.objects.create(course_code='CS101', course_name='Intro', lecturer=self.lecturer)
+        self.session = AttendanceSession.objects.create(
+            course=self.course, session_date=date(2025, 1, 6), session_time=time(9, 0), created_by=self.lecturer,
+        )
+        self.students = [make_student(number) for number in range(1, 4)]
+        for student in self.students:
+            Enrollment.objects.create(student=student, course=self.course)
+        self.client.force_login(self.lecturer)
+
+    def post_delta(self, *changes):
+        return self.client.post(
+            reverse('attendance_mark_delta', args=[self.session.pk]),
+            json.dumps({'changes': list(changes)}), content_type='application/json',
+        )
+
+    def test_roster_is_one_query_whatever_its_size(self):
+        url = reverse('attendance_mark', args=[self.session.pk])
+        mark_attendance(self.session, {self.students[0].id: ('late', 'Bus')})
+        with CaptureQueriesContext(connection) as small:
+            response = self.client.get(url)
+        for number in range(4, 10):
+            Enrollment.objects.create(student=make_student(number), course=self.course)
+        with CaptureQueriesContext(connection) as large:
+            self.client.get(url)
+
+        self.assertEqual(len(small.captured_queries), len(large.captured_queries))
+        first = response.context['students'][0]
+        self.assertEqual((first['student_id'], first['status'], first['remarks']), ('S00001', 'late', 'Bus'))
+        self.assertContains(response, f'value="{first["version"].isoformat()}"')
+
+    def test_delta_saves_only_the_changed_rows_and_returns_versions(self):
+        first, second, _ = self.students
+        response = self.post_delta(
+            {'student': first.id, 'status': 'present', 'remarks': '', 'version': None},
+            {'student': second.id, 'status': 'late', 'remarks': 'Bus', 'version': None},
+        )
+
+        data = response.json()
+        self.assertEqual((data['created'], data['conflicts']), ([first.id, second.id], []))
+        self.assertEqual(AttendanceRecord.objects.count(), 2)
+        version = data['records'][str(second.id)]['version']
+        self.assertEqual(version, AttendanceRecord.objects.get(student=second).marked_at.isoformat())
+
+        data = self.post_delta({'student': second.id, 'status': 'present', 'remarks': '', 'version': version}).json()
+        self.assertEqual(data['updated'], [second.id])
+        self.assertEqual(AttendanceRollup.objects.get(enrollment__student=second).present, 1)
+
+    def test_stale_versions_do_not_overwrite_someone_elses_mark(self):
+        student = self.students[0]
+        self.post_delta({'student': student.id, 'status': 'present', 'remarks': '', 'version': None})
+        seen = AttendanceRecord.objects.get(student=student).marked_at.isoformat()
+        mark_attendance(self.session, {student.id: ('late', 'Marked at the door')})
+
+        data = self.post_delta({'student': student.id, 'status': 'absent', 'remarks': '', 'version': seen}).json()
+
+        self.assertEqual(data['conflicts'], [student.id])
+        self.assertEqual(data['records'][str(student.id)]['remarks'], 'Marked at the door')
+        self.assertEqual(AttendanceRecord.objects.get(student=student).status, 'late')
+
+        # Two people creating the same student's first record: the second one conflicts.
+        other = self.students[1]
+        mark_attendance(self.session, {other.id: ('present', '')})
+        data = self.post_delta({'student': other.id, 'status': 'absent', 'remarks': '', 'version': None}).json()
+        self.assertEqual(data['conflicts'], [other.id])
+
+    def test_full_form_posts_respect_versions(self):
+        student = self.students[0]
+        mark_attendance(self.session, {student.id: ('late', '')})
+        data = {f'status_{student.id}': 'absent', f'remarks_{student.id}': '', f'version_{student.id}': ''}
+
+        response = self.client.post(reverse('attendance_mark', args=[self.session.pk]), data, follow=True)
+
+        self.assertContains(response, '1 changed by someone else and not saved')
+        self.assertEqual(AttendanceRecord.objects.get(student=student).status, 'late')
+
+    def test_versioned_form_rows_are_written_in_bulk(self):
+        url = reverse('attendance_mark', args=[self.session.pk])
+        mark_attendance(self.session, {student.id: ('late', '') for student in self.students})
+
+        def post_all(status):
+            data = {}
+            for row in marking_roster(self.session):
+                data[f'status_{row["id"]}'] = status
+                data[f'version_{row["id"]}'] = row['version'].isoformat() if row['version'] else ''
+            with CaptureQueriesContext(connection) as queries:
+                self.client.post(url, data)
+            return len(queries)
+
+        small = post_all('absent')
+        for number in range(4, 10):
+            Enrollment.objects.create(student=make_student(number), course=self.course)
+        enrolled = User.objects.filter(enrollments__course=self.course)
+        mark_attendance(self.session, {student.id: ('late', '') for student in enrolled})
+
+        self.assertEqual(post_all('present'), small)
+        self.assertEqual(set(AttendanceRecord.objects.values_list('status', flat=True)), {'present'})
+
+    def test_malformed_form_versions_are_conflicts(self):
+        first, second, third = self.students
+        mark_attendance(self.session, {first.id: ('late', ''), second.id: ('late', ''), third.id: ('late', '')})
+        data = {
+            f'status_{first.id}': 'absent', f'version_{first.id}': 'not-a-date',
+            f'status_{second.id}': 'absent', f'version_{second.id}': '2025-02-30T10:00:00',
+            f'status_{third.id}': 'absent',
+        }
+
+        response = self.client.post(reverse('attendance_mark', args=[self.session.pk]), data, follow=True)
+
+        self.assertContains(response, '2 changed by someone else and not saved')
+        self.assertEqual(
+            dict(AttendanceRecord.objects.values_list('student_id', 'status')),
+            {first.id: 'late', second.id: 'late', third.id: 'absent'},
+        )
+
+    def test_bad_changes_are_rejected(self):
+        outsider = make_student(99)
+        response = self.post_delta(
+            {'student': outsider.id, 'status': 'present', 'version': None},
+            {'student': self.students[0].id, 'status': 'asleep', 'version': None},
+            {'student': self.students[1].id, 'status': 'present', 'version': 'yesterday'},
+        )
+
+        self.assertEqual([row['index'] for row in response.json()['rejected']], [0, 1, 2])
+        self.assertFalse(AttendanceRecord.objects.exists())
+        url = reverse('attendance_mark_delta', args=[self.session.pk])
+        self.assertEqual(self.client.post(url, 'nope', content_type='application/json').status_code, 400)
+        self.assertEqual(self.client.post(url, '[]', content_type='application/json').status_code, 400)
@@ -14,11 +14,26 @@ urlpatterns = [
     
     path('enrollments/', views.enrollment_list, name='enrollment_list'),
     path('enrollments/create/', views.enrollment_create, name='enrollment_create'),
+    path('enrollments/import/', views.enrollment_import, name='enrollment_import'),
+    path('autocomplete/students/', views.autocomplete_students, name='autocomplete_students'),
+    path('autocomplete/courses/', views.autocomplete_courses, name='autocomplete_courses'),
     
     path('sessions/create/', views.attendance_session_create, name='attendance_session_create'),
     path('sessions/', views.attendance_session_list, name='attendance_session_list'),
     path('sessions/<int:session_id>/mark/', views.attendance_mark, name='attendance_mark'),
+    path('sessions/<int:session_id>/mark/delta/', views.attendance_mark_delta, name='attendance_mark_delta'),
+    path('sessions/<int:session_id>/checkin/', views.attendance_checkin_control, name='attendance_checkin_control'),
+    path('checkin/', views.attendance_checkin, name='attendance_checkin'),
+    path('api/devices/attendance/', views.device_attendance, name='device_attendance'),
     
     path('records/', views.attendance_records, name='attendance_records'),
+    path('records/export/', views.attendance_records_export, name='attendance_records_export'),
     path('reports/', views.reports, name='reports'),
+    path('trends/', views.trends, name='trends'),
+    path('search/', views.search, name='search'),
+    
+    path('async/', views.dashboard_async, name='dashboard_async'),
+    path('async/reports/', views.reports_async, name='reports_async'),
+    
+    path('metrics', views.metrics, name='metrics'),
 ]
@@ -1,51 +1,76 @@
-from django.shortcuts import render, redirect, get_object_or_404
-from django.contrib.auth import login, authenticate, logout
+from django.shortcuts import render, redirect, get_object_or_404, aget_object_or_404
+from django.contrib.auth import login, authenticate, logout, alogout
 from django.contrib.auth.decorators import login_required
+from django.contrib.admin.views.decorators import staff_member_required
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
 from django.contrib import messages
-from django.db.models import Count, Q
+from django.db.models import Count
 from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 from django import forms
-from django.http import HttpResponseForbidden
+from django.http import HttpResponse, HttpResponseForbidden, HttpResponseBadRequest, JsonResponse, StreamingHttpResponse
 from functools import wraps
-from datetime import datetime, timedelta
-from .models import UserProfile, Course, Enrollment, AttendanceSession, AttendanceRecord
-from .forms import (UserRegistrationForm, CourseForm, EnrollmentForm, 
-                    AttendanceSessionForm, AttendanceMarkingForm, AttendanceFilterForm)
+import asyncio
+from asgiref.sync import iscoroutinefunction, sync_to_async
+import io
+import json
+from .models import Course, Enrollment, AttendanceSession, AttendanceRecord, SearchEntry
+from .forms import (UserRegistrationForm, CourseForm, EnrollmentForm, RosterImportForm,
+                    AttendanceSessionForm, AttendanceMarkingForm, AttendanceFilterForm, student_label)
+from .reporting import build_course_report, abuild_course_report, build_attendance_matrix
+from .services import (mark_attendance, marking_roster, parse_marking_delta, import_roster, read_roster_csv,
+                       record_device_events, roster_ids_queryset)
+from .devices import DevicePayloadError, authenticate_device, parse_device_events, read_device_payload
+from .rollups import rebuild_rollups
+from .exports import record_export_rows, stream_csv, stream_xlsx
+from .pagination import paginate_keyset
+from .caching import cached_dashboard_context, acached_dashboard_context
+from .freshness import conditional_on_attendance
+from .metrics import registry as metrics_registry
+from .analytics import course_trends, dropping_students, weekly_series
+from .snapshots import build_snapshot_report
+from .archive import archived_records, archived_semesters, build_archived_report
+from .search import matching_entries, matching_ids
+from .checkin import checkin_buffer, open_checkin, close_checkin, current_checkin, lookup_code
 from django.contrib.auth.models import User
+from django.conf import settings
 
-def lecturer_required(view_func):
+def _role_denied(request, role):
+    if not request.user.is_authenticated:
+        return redirect('login')
+    
+    if not request.principal.has_profile:
+        messages.error(request, 'Profile not found. Please contact administrator.')
+        return redirect('dashboard')
+    if request.principal.role != role:
+        messages.error(request, f'Access denied. Only {role}s can access this page.')
+        return HttpResponseForbidden(f'Access denied. Only {role}s can access this page.')
+    return None
+
+def _role_required(view_func, role):
+    if iscoroutinefunction(view_func):
+        @wraps(view_func)
+        async def async_wrapper(request, *args, **kwargs):
+            denied = _role_denied(request, role)
+            if denied is not None:
+                return denied
+            return await view_func(request, *args, **kwargs)
+        return async_wrapper
+    
     @wraps(view_func)
     def wrapper(request, *args, **kwargs):
-        if not request.user.is_authenticated:
-            return redirect('login')
-        
-        try:
-            if request.user.profile.role != 'lecturer':
-                messages.error(request, 'Access denied. Only lecturers can access this page.')
-                return HttpResponseForbidden('Access denied. Only lecturers can access this page.')
-        except UserProfile.DoesNotExist:
-            messages.error(request, 'Profile not found. Please contact administrator.')
-            return redirect('dashboard')
-        
+        denied = _role_denied(request, role)
+        if denied is not None:
+            return denied
         return view_func(request, *args, **kwargs)
     return wrapper
 
+def lecturer_required(view_func):
+    return _role_required(view_func, 'lecturer')
+
 def student_required(view_func):
-    @wraps(view_func)
-    def wrapper(request, *args, **kwargs):
-        if not request.user.is_authenticated:
-            return redirect('login')
-        
-        try:
-            if request.user.profile.role != 'student':
-                messages.error(request, 'Access denied. Only students can access this page.')
-                return HttpResponseForbidden('Access denied. Only students can access this page.')
-        except UserProfile.DoesNotExist:
-            messages.error(request, 'Profile not found. Please contact administrator.')
-            return redirect('dashboard')
-        
-        return view_func(request, *args, **kwargs)
-    return wrapper
+    return _role_required(view_func, 'student')
 """
 def register(request):
     if request.method == 'POST':
@@ -84,76 +109,141 @@ def user_logout(request):
     return redirect('login')
 
 @login_required
+@conditional_on_attendance
 def dashboard(request):
-    try:
-        user_profile = request.user.profile
-    except UserProfile.DoesNotExist:
+    if not request.principal.has_profile:
         messages.error(request, 'Profile not found. Please complete your profile or contact administrator.')
         logout(request)
         return redirect('login')
     
-    context = {'user_profile': user_profile}
+    context = {'user_profile': request.user.profile}
     
-    if user_profile.role == 'lecturer':
-        courses = Course.objects.filter(lecturer=request.user)
-        total_students = Enrollment.objects.filter(course__lecturer=request.user).count()
-        total_sessions = AttendanceSession.objects.filter(created_by=request.user).count()
-        
-        recent_sessions = AttendanceSession.objects.filter(
-            created_by=request.user
-        ).order_by('-session_date', '-session_time')[:5]
-        
-        context.update({
-            'courses': courses,
-            'total_courses': courses.count(),
-            'total_students': total_students,
-            'total_sessions': total_sessions,
-            'recent_sessions': recent_sessions,
-        })
+    if request.principal.is_lecturer:
+        context.update(cached_dashboard_context(
+            request.user,
+            _lecturer_dashboard_context,
+            lambda: Course.objects.filter(lecturer=request.user).values_list('pk', flat=True)
+        ))
         return render(request, 'attendance/lecturer_dashboard.html', context)
     
     else:
-        enrollments = Enrollment.objects.filter(student=request.user)
-        total_courses = enrollments.count()
-        
-        attendance_stats = []
-        for enrollment in enrollments:
-            course = enrollment.course
-            total_sessions = AttendanceSession.objects.filter(course=course).count()
-            attended = AttendanceRecord.objects.filter(
-                student=request.user,
-                session__course=course,
-                status='present'
-            ).count()
-            
-            attendance_rate = (attended / total_sessions * 100) if total_sessions > 0 else 0
-            
-            attendance_stats.append({
-                'course': course,
-                'total_sessions': total_sessions,
-                'attended': attended,
-                'attendance_rate': round(attendance_rate, 1)
-            })
-        
-        context.update({
-            'enrollments': enrollments,
-            'total_courses': total_courses,
-            'attendance_stats': attendance_stats,
-        })
+        context.update(cached_dashboard_context(
+            request.user,
+            _student_dashboard_context,
+            lambda: Enrollment.objects.filter(student=request.user).values_list('course_id', flat=True)
+        ))
         return render(request, 'attendance/student_dashboard.html', context)
 
+async def _alist(queryset):
+    return [obj async for obj in queryset.aiterator()]
+
+@login_required
+async def dashboard_async(request):
+    """Async version of ``dashboard``; the lecturer aggregates are awaited together."""
+    if not request.principal.has_profile:
+        messages.error(request, 'Profile not found. Please complete your profile or contact administrator.')
+        await alogout(request)
+        return redirect('login')
+    
+    user = request.user
+    context = {'user_profile': user.profile}
+    
+    if request.principal.is_lecturer:
+        context.update(await acached_dashboard_context(
+            user,
+            _alecturer_dashboard_context,
+            lambda: _alist(Course.objects.filter(lecturer=user).values_list('pk', flat=True))
+        ))
+        return render(request, 'attendance/lecturer_dashboard.html', context)
+    
+    else:
+        context.update(await acached_dashboard_context(
+            user,
+            _astudent_dashboard_context,
+            lambda: _alist(Enrollment.objects.filter(student=user).values_list('course_id', flat=True))
+        ))
+        return render(request, 'attendance/student_dashboard.html', context)
+
+def _lecturer_courses(user):
+    return Course.objects.filter(lecturer=user).annotate(student_count=Count('enrollments'))
+
+def _recent_sessions(user):
+    return AttendanceSession.objects.filter(
+        created_by=user
+    ).select_related('course').order_by('-session_date', '-session_time')[:5]
+
+def _lecturer_dashboard(courses, total_students, total_sessions, recent_sessions):
+    return {
+        'courses': courses,
+        'total_courses': len(courses),
+        'total_students': total_students,
+        'total_sessions': total_sessions,
+        'recent_sessions': recent_sessions,
+    }
+
+def _lecturer_dashboard_context(user):
+    return _lecturer_dashboard(
+        list(_lecturer_courses(user)),
+        Enrollment.objects.filter(course__lecturer=user).count(),
+        AttendanceSession.objects.filter(created_by=user).count(),
+        list(_recent_sessions(user)),
+    )
+
+async def _alecturer_dashboard_context(user):
+    return _lecturer_dashboard(*await asyncio.gather(
+        _alist(_lecturer_courses(user)),
+        Enrollment.objects.filter(course__lecturer=user).acount(),
+        AttendanceSession.objects.filter(created_by=user).acount(),
+        _alist(_recent_sessions(user)),
+    ))
+
+def _student_enrollments(user):
+    return Enrollment.objects.filter(student=user).select_related('course', 'rollup')
+
+def _student_dashboard(enrollments):
+    attendance_stats = []
+    for enrollment in enrollments:
+        rollup = enrollment.rollup
+        attendance_stats.append({
+            'course': enrollment.course,
+            'total_sessions': rollup.total_sessions,
+            'attended': rollup.present,
+            'attendance_rate': rollup.get_attendance_rate()
+        })
+    
+    return {
+        'enrollments': enrollments,
+        'total_courses': len(enrollments),
+        'attendance_stats': attendance_stats,
+    }
+
+def _student_dashboard_context(user):
+    enrollments = list(_student_enrollments(user))
+    missing = [e.pk for e in enrollments if not hasattr(e, 'rollup')]
+    if missing:
+        rebuild_rollups(Enrollment.objects.filter(pk__in=missing))
+        enrollments = list(_student_enrollments(user))
+    return _student_dashboard(enrollments)
+
+async def _astudent_dashboard_context(user):
+    enrollments = await _alist(_student_enrollments(user))
+    missing = [e.pk for e in enrollments if not hasattr(e, 'rollup')]
+    if missing:
+        await sync_to_async(rebuild_rollups)(Enrollment.objects.filter(pk__in=missing))
+        enrollments = await _alist(_student_enrollments(user))
+    return _student_dashboard(enrollments)
+
 @login_required
 def course_list(request):
-    try:
-        user_role = request.user.profile.role
-    except UserProfile.DoesNotExist:
+    user_role = request.principal.role
+    if user_role is None:
         messages.error(request, 'Profile not found. Please contact administrator.')
         return redirect('dashboard')
     
     if user_role == 'lecturer':
         courses = Course.objects.filter(lecturer=request.user)
     else:
-        enrollments = Enrollment.objects.filter(student=request.user)
+        enrollments = Enrollment.objects.filter(student=request.user).select_related('course')
         courses = [e.course for e in enrollments]
     
     return render(request, 'attendance/course_list.html', {'courses': courses})
@@ -203,18 +293,22 @@ def course_delete(request, pk):
 
 @login_required
 def enrollment_list(request):
-    try:
-        user_role = request.user.profile.role
-    except UserProfile.DoesNotExist:
+    user_role = request.principal.role
+    if user_role is None:
         messages.error(request, 'Profile not found. Please contact administrator.')
         return redirect('dashboard')
     
     if user_role == 'lecturer':
-        enrollments = Enrollment.objects.filter(course__lecturer=request.user)
+        enrollments = Enrollment.objects.filter(
+            course__lecturer=request.user
+        ).select_related('student__profile', 'course')
     else:
-        enrollments = Enrollment.objects.filter(student=request.user)
+        enrollments = Enrollment.objects.filter(
+            student=request.user
+        ).select_related('course__lecturer')
     
-    return render(request, 'attendance/enrollment_list.html', {'enrollments': enrollments})
+    enrollments = paginate_keyset(request, enrollments, ['-enrolled_at'])
+    return render(request, 'attendance/enrollment_list.html', {'enrollments': enrollments, 'page': enrollments})
 
 @lecturer_required
 def enrollment_create(request):
@@ -230,6 +324,54 @@ def enrollment_create(request):
     
     return render(request, 'attendance/enrollment_form.html', {'form': form})
 
+@lecturer_required
+def enrollment_import(request):
+    summary = None
+    
+    if request.method == 'POST':
+        form = RosterImportForm(request.POST, request.FILES)
+        if form.is_valid():
+            lines = io.TextIOWrapper(form.cleaned_data['roster'].file, encoding='utf-8-sig')
+            summary = import_roster(
+                read_roster_csv(lines),
+                courses=Course.objects.filter(lecturer=request.user)
+            )
+            messages.success(request, f'Roster imported: {summary}.')
+            form = RosterImportForm()
+    else:
+        form = RosterImportForm()
+    
+    return render(request, 'attendance/enrollment_import.html', {'form': form, 'summary': summary})
+
+def _autocomplete_page(request, queryset, label):
+    # Select2-style payload; one extra row tells whether there is a next page without a COUNT.
+    try:
+        page = max(int(request.GET.get('page', 1)), 1)
+    except ValueError:
+        page = 1
+    size = settings.AUTOCOMPLETE_PAGE_SIZE
+    objects = list(queryset[(page - 1) * size:page * size + 1])
+    return JsonResponse({
+        'results': [{'id': obj.pk, 'text': label(obj)} for obj in objects[:size]],
+        'pagination': {'more': len(objects) > size},
+    })
+
+@lecturer_required
+def autocomplete_students(request):
+    students = User.objects.filter(profile__role='student').select_related('profile').order_by('pk')
+    term = request.GET.get('q', '').strip()
+    if term:
+        students = students.filter(pk__in=matching_ids(term, 'user'))
+    return _autocomplete_page(request, students, student_label)
+
+@lecturer_required
+def autocomplete_courses(request):
+    courses = Course.objects.filter(lecturer=request.user).order_by('course_code')
+    term = request.GET.get('q', '').strip()
+    if term:
+        courses = courses.filter(pk__in=matching_ids(term, 'course'))
+    return _autocomplete_page(request, courses, str)
+
 @lecturer_required
 def attendance_session_create(request):
     
@@ -246,54 +388,122 @@ def attendance_session_create(request):
     
     return render(request, 'attendance/session_form.html', {'form': form})
 
+def _roster_ids(session):
+    return set(roster_ids_queryset(session))
+
 @lecturer_required
 def attendance_mark(request, session_id):
     session = get_object_or_404(AttendanceSession, pk=session_id, created_by=request.user)
-    enrolled_students = User.objects.filter(
-        enrollments__course=session.course,
-        profile__role='student'
-    ).distinct()
     
     if request.method == 'POST':
-        for student in enrolled_students:
-            status = request.POST.get(f'status_{student.id}')
-            remarks = request.POST.get(f'remarks_{student.id}', '')
-            
-            AttendanceRecord.objects.update_or_create(
-                session=session,
-                student=student,
-                defaults={'status': status, 'remarks': remarks}
-            )
+        # Without JavaScript the whole roster is posted; rows carrying a version are only saved if unchanged since.
+        valid_statuses = dict(AttendanceRecord.STATUS_CHOICES)
+        marks = {}
+        versions = {}
+        unverifiable = []
+        for student_id in _roster_ids(session):
+            status = request.POST.get(f'status_{student_id}')
+            if status not in valid_statuses:
+                continue
+            version = request.POST.get(f'version_{student_id}')
+            if version:
+                try:
+                    version = parse_datetime(version)
+                except ValueError:
+                    version = None
+                if version is None:
+                    # The row cannot be checked against the record, so it is not saved.
+                    unverifiable.append(student_id)
+                    continue
+                versions[student_id] = version if timezone.is_aware(version) else timezone.make_aware(version)
+            elif version == '':
+                versions[student_id] = None
+            marks[student_id] = (status, request.POST.get(f'remarks_{student_id}', ''))
         
-        messages.success(request, 'Attendance marked successfully!')
+        summary = mark_attendance(session, marks, versions)
+        summary.conflicts.extend(unverifiable)
+        if summary.conflicts:
+            messages.warning(request, f'Attendance saved with conflicts ({summary}). Reopen the session to review them.')
+        else:
+            messages.success(request, f'Attendance marked successfully! ({summary})')
         return redirect('attendance_session_list')
     
-    existing_records = {
-        record.student.id: record 
-        for record in AttendanceRecord.objects.filter(session=session)
-    }
-    
-    students_with_attendance = []
-    for student in enrolled_students:
-        record = existing_records.get(student.id)
-        students_with_attendance.append({
-            'student': student,
-            'status': record.status if record else 'absent',
-            'remarks': record.remarks if record else ''
-        })
-    
     context = {
         'session': session,
-        'students': students_with_attendance,
+        'students': marking_roster(session),
+        'checkin': current_checkin(session),
     }
     
     return render(request, 'attendance/mark_attendance.html', context)
 
+@lecturer_required
+@require_POST
+def attendance_mark_delta(request, session_id):
+    """
+    Autosave endpoint for the marking page: takes only the changed rows as
+    JSON (see parse_marking_delta()) and answers with each row's current
+    record, so the page can pick up new versions and other people's marks.
+    """
+    session = get_object_or_404(AttendanceSession, pk=session_id, created_by=request.user)
+    try:
+        payload = json.loads(request.body)
+    except ValueError:
+        return JsonResponse({'error': 'Body is not valid JSON.'}, status=400)
+    try:
+        marks, versions, rejected = parse_marking_delta(payload, _roster_ids(session))
+    except ValueError as exc:
+        return JsonResponse({'error': str(exc)}, status=400)
+    
+    summary = mark_attendance(session, marks, versions)
+    current = {
+        student_id: {'status': status, 'remarks': remarks, 'version': marked_at.isoformat()}
+        for student_id, status, remarks, marked_at in AttendanceRecord.objects.filter(
+            session=session, student_id__in=list(marks),
+        ).values_list('student_id', 'status', 'remarks', 'marked_at')
+    }
+    return JsonResponse({
+        'created': summary.created,
+        'updated': summary.updated,
+        'unchanged': summary.unchanged,
+        'conflicts': summary.conflicts,
+        'records': {str(student_id): current.get(student_id) for student_id in marks},
+        'rejected': [{'index': index, 'error': error} for index, error in rejected],
+    })
+
+@lecturer_required
+def attendance_checkin_control(request, session_id):
+    session = get_object_or_404(AttendanceSession, pk=session_id, created_by=request.user)
+    
+    if request.method == 'POST':
+        if request.POST.get('action') == 'close':
+            close_checkin(session)
+            messages.success(request, 'Self check-in closed.')
+        else:
+            code = open_checkin(session)
+            messages.success(request, f'Self check-in open. Students can check in with code {code}.')
+    
+    return redirect('attendance_mark', session_id=session.pk)
+
+@student_required
+def attendance_checkin(request):
+    if request.method == 'POST':
+        # Validated from the cache alone; the write is buffered and flushed in batches.
+        entry = lookup_code(request.POST.get('code'))
+        if entry is None:
+            messages.error(request, 'That check-in code is invalid or has expired.')
+        elif request.user.id not in entry['roster']:
+            messages.error(request, 'You are not enrolled in the course for this session.')
+        else:
+            checkin_buffer.add(entry['session_id'], request.user.id)
+            messages.success(request, 'You are checked in. Your attendance will appear shortly.')
+            return redirect('dashboard')
+    
+    return render(request, 'attendance/checkin.html')
+
 @login_required
 def attendance_session_list(request):
-    try:
-        user_role = request.user.profile.role
-    except UserProfile.DoesNotExist:
+    user_role = request.principal.role
+    if user_role is None:
         messages.error(request, 'Profile not found. Please contact administrator.')
         return redirect('dashboard')
     
@@ -304,122 +514,226 @@ def attendance_session_list(request):
             course__enrollments__student=request.user
         ).distinct()
     
-    return render(request, 'attendance/session_list.html', {'sessions': sessions})
+    sessions = paginate_keyset(request, sessions.select_related('course'), ['-session_date', '-session_time'])
+    return render(request, 'attendance/session_list.html', {'sessions': sessions, 'page': sessions})
 
 @login_required
+@conditional_on_attendance
 def attendance_records(request):
-    try:
-        user_role = request.user.profile.role
-    except UserProfile.DoesNotExist:
+    user_role = request.principal.role
+    if user_role is None:
         messages.error(request, 'Profile not found. Please contact administrator.')
         return redirect('dashboard')
     
     if user_role == 'student':
-        records = AttendanceRecord.objects.filter(student=request.user).order_by('-session__session_date')
-        courses = Course.objects.filter(enrollments__student=request.user)
-        
-        attendance_data = {}
-        for course in courses:
-            sessions = AttendanceSession.objects.filter(course=course).order_by('session_date')
-            course_records = AttendanceRecord.objects.filter(
-                student=request.user,
-                session__course=course
-            )
-            
-            dates = [s.session_date.strftime('%Y-%m-%d') for s in sessions]
-            statuses = []
-            
-            for session in sessions:
-                record = course_records.filter(session=session).first()
-                if record:
-                    statuses.append(1 if record.status == 'present' else 0)
-                else:
-                    statuses.append(0)
-            
-            if dates:
-                attendance_data[course.course_code] = {
-                    'dates': dates,
-                    'statuses': statuses
-                }
+        semesters = archived_semesters(student=request.user)
+        semester = request.GET.get('semester') if request.GET.get('semester') in semesters else ''
+        records = archived_records(semester) if semester else AttendanceRecord.objects.all()
+        records = records.filter(
+            student=request.user
+        ).select_related('session__course')
+        records = paginate_keyset(request, records, ['-session__session_date'])
+        attendance_data = {} if semester else build_attendance_matrix(request.user)
         
         context = {
             'records': records,
+            'page': records,
             'attendance_data': attendance_data,
+            'semesters': semesters,
+            'semester': semester,
         }
         return render(request, 'attendance/student_records.html', context)
     
     else:
-        form = AttendanceFilterForm()
-        records = AttendanceRecord.objects.filter(
-            session__course__lecturer=request.user
-        ).order_by('-session__session_date')
-        
-        if request.GET:
-            form = AttendanceFilterForm(request.GET)
-            if form.is_valid():
-                if form.cleaned_data.get('course'):
-                    records = records.filter(session__course=form.cleaned_data['course'])
-                if form.cleaned_data.get('start_date'):
-                    records = records.filter(session__session_date__gte=form.cleaned_data['start_date'])
-                if form.cleaned_data.get('end_date'):
-                    records = records.filter(session__session_date__lte=form.cleaned_data['end_date'])
-                if form.cleaned_data.get('status'):
-                    records = records.filter(status=form.cleaned_data['status'])
+        form, records = _filtered_lecturer_records(request)
+        records = paginate_keyset(request, records, ['-session__session_date'])
         
         context = {
             'records': records,
+            'page': records,
             'form': form,
         }
         return render(request, 'attendance/lecturer_records.html', context)
 
+def _filtered_lecturer_records(request):
+    semesters = archived_semesters(lecturer=request.user)
+    form = AttendanceFilterForm(semesters=semesters, lecturer=request.user)
+    records = AttendanceRecord.objects.filter(
+        session__course__lecturer=request.user
+    ).select_related('student__profile', 'session__course').order_by('-session__session_date')
+    
+    if request.GET:
+        form = AttendanceFilterForm(request.GET, semesters=semesters, lecturer=request.user)
+        if form.is_valid():
+            if form.cleaned_data.get('semester'):
+                records = archived_records(form.cleaned_data['semester']).filter(
+                    session__course__lecturer=request.user
+                ).select_related('student__profile', 'session__course').order_by('-session__session_date')
+            if form.cleaned_data.get('course'):
+                records = records.filter(session__course=form.cleaned_data['course'])
+            if form.cleaned_data.get('start_date'):
+                records = records.filter(session__session_date__gte=form.cleaned_data['start_date'])
+            if form.cleaned_data.get('end_date'):
+                records = records.filter(session__session_date__lte=form.cleaned_data['end_date'])
+            if form.cleaned_data.get('status'):
+                records = records.filter(status=form.cleaned_data['status'])
+    
+    return form, records
+
 @lecturer_required
+def attendance_records_export(request):
+    export_format = request.GET.get('format', 'csv')
+    if export_format not in ('csv', 'xlsx'):
+        return HttpResponseBadRequest('Unsupported export format.')
+    
+    _, records = _filtered_lecturer_records(request)
+    rows = record_export_rows(records)
+    filename = f"attendance-{timezone.localdate():%Y%m%d}.{export_format}"
+    
+    if export_format == 'xlsx':
+        response = StreamingHttpResponse(
+            stream_xlsx(rows),
+            content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+        )
+    else:
+        response = StreamingHttpResponse(stream_csv(rows), content_type='text/csv')
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+def _reports_context(request, selected_course):
+    """
+    Context shared by ``reports`` and ``reports_async``, without the course list.
+
+    Archived semesters and ``?source=snapshot`` are read here; when the live
+    report is wanted ``source`` is 'live' and ``report_data`` is left for the
+    caller to build.
+    """
+    # ?source=snapshot reads the precomputed weekly snapshot instead of raw records.
+    source = 'snapshot' if request.GET.get('source') == 'snapshot' else 'live'
+    report_data = []
+    as_of = None
+    semesters = archived_semesters(lecturer=request.user)
+    semester = request.GET.get('semester') if request.GET.get('semester') in semesters else ''
+    
+    if selected_course is not None:
+        if semester:
+            report_data = build_archived_report(selected_course, semester)
+            source = 'archive'
+        elif source == 'snapshot':
+            report_data, as_of = build_snapshot_report(selected_course)
+            if as_of is None:
+                messages.info(request, 'No report snapshot has been built yet; showing live data.')
+                source = 'live'
+    
+    return {
+        'selected_course': selected_course,
+        'report_data': report_data,
+        'source': source,
+        'as_of': as_of,
+        'semesters': semesters,
+        'semester': semester,
+    }
+
+@lecturer_required
+@conditional_on_attendance
 def reports(request):
+    selected_course = None
+    if request.GET.get('course'):
+        selected_course = get_object_or_404(Course, pk=request.GET.get('course'), lecturer=request.user)
     
+    context = _reports_context(request, selected_course)
+    context['courses'] = Course.objects.filter(lecturer=request.user)
+    if selected_course is not None and context['source'] == 'live':
+        context['report_data'] = build_course_report(selected_course)
+    
+    return render(request, 'attendance/reports.html', context)
+
+@lecturer_required
+def trends(request):
     courses = Course.objects.filter(lecturer=request.user)
     selected_course = None
-    report_data = []
+    series = None
+    dropping = []
     
     if request.GET.get('course'):
         selected_course = get_object_or_404(Course, pk=request.GET.get('course'), lecturer=request.user)
-        students = User.objects.filter(
-            enrollments__course=selected_course,
-            profile__role='student'
-        ).distinct()
-        
-        for student in students:
-            total_sessions = AttendanceSession.objects.filter(course=selected_course).count()
-            present_count = AttendanceRecord.objects.filter(
-                student=student,
-                session__course=selected_course,
-                status='present'
-            ).count()
-            absent_count = AttendanceRecord.objects.filter(
-                student=student,
-                session__course=selected_course,
-                status='absent'
-            ).count()
-            late_count = AttendanceRecord.objects.filter(
-                student=student,
-                session__course=selected_course,
-                status='late'
-            ).count()
-            
-            attendance_rate = (present_count / total_sessions * 100) if total_sessions > 0 else 0
-            
-            report_data.append({
-                'student': student,
-                'student_id': student.profile.student_id,
-                'total_sessions': total_sessions,
-                'present': present_count,
-                'absent': absent_count,
-                'late': late_count,
-                'attendance_rate': round(attendance_rate, 1)
-            })
+        course_trends_data = course_trends(selected_course)
+        series = weekly_series(course_trends_data)
+        dropping = dropping_students(course_trends_data)
     
     context = {
         'courses': courses,
         'selected_course': selected_course,
-        'report_data': report_data,
+        'series': series,
+        'weekly_rows': zip(series['weeks'], series['sessions'], series['rate'], series['moving_average']) if series else [],
+        'dropping': dropping,
+        'window': getattr(settings, 'TRENDS_WINDOW_WEEKS', 3),
     }
     
+    return render(request, 'attendance/trends.html', context)
+
+@lecturer_required
+def search(request):
+    query = request.GET.get('q', '').strip()
+    results = []
+    
+    if query:
+        # Lecturers only see their own courses and sessions and the students enrolled in them.
+        scopes = {
+            'user': Enrollment.objects.filter(course__lecturer=request.user).values('student_id'),
+            'course': Course.objects.filter(lecturer=request.user).values('pk'),
+            'session': AttendanceSession.objects.filter(course__lecturer=request.user).values('pk'),
+        }
+        for kind, label in SearchEntry.KIND_CHOICES:
+            entries = matching_entries(
+                query, [kind], limit=settings.SEARCH_RESULTS_PER_KIND,
+                within=SearchEntry.objects.filter(kind=kind, object_id__in=scopes[kind]),
+            )
+            results.append((label, list(entries.order_by('title'))))
+    
+    context = {
+        'query': query,
+        'results': results,
+        'has_results': any(entries for _, entries in results),
+    }
+    
+    return render(request, 'attendance/search.html', context)
+
+@lecturer_required
+@conditional_on_attendance
+async def reports_async(request):
+    """Async version of ``reports``; the course list and a live report are awaited together."""
+    courses = Course.objects.filter(lecturer=request.user)
+    selected_course = None
+    if request.GET.get('course'):
+        selected_course = await aget_object_or_404(Course, pk=request.GET.get('course'), lecturer=request.user)
+    
+    context = await sync_to_async(_reports_context)(request, selected_course)
+    if selected_course is not None and context['source'] == 'live':
+        context['courses'], context['report_data'] = await asyncio.gather(
+            _alist(courses), abuild_course_report(selected_course),
+        )
+    else:
+        context['courses'] = await _alist(courses)
+    
     return render(request, 'attendance/reports.html', context)
+
+@csrf_exempt
+@require_POST
+def device_attendance(request):
+    """Batch attendance from card readers; see attendance.devices for the payload."""
+    device = authenticate_device(request)
+    if device is None:
+        return JsonResponse({'error': 'Missing or invalid device token.'}, status=401)
+    try:
+        events, rejected = parse_device_events(read_device_payload(request))
+    except DevicePayloadError as exc:
+        return JsonResponse({'error': str(exc)}, status=exc.status)
+    
+    summary = record_device_events(events, AttendanceSession.objects.filter(course__lecturer=device.owner))
+    summary.rejected += rejected
+    return JsonResponse(summary.as_dict())
+
+@staff_member_required
+def metrics(request):
+    return HttpResponse(metrics_registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -44,11 +45,13 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'attendance.middleware.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'attendance.middleware.PrincipalMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -66,6 +69,7 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'attendance.context_processors.principal',
             ],
         },
     },
@@ -76,13 +80,71 @@ WSGI_APPLICATION = 'attendance_system.wsgi.application'
 
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
-
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+#
+# DB_ENGINE selects the profile: 'sqlite' (default) or 'postgresql'.
+# Persistent connections (DB_CONN_MAX_AGE) only pay off under WSGI; ASGI
+# opens a connection per request thread, so set DB_CONN_MAX_AGE=0 there.
+
+DB_ENGINE = os.environ.get('DB_ENGINE', 'sqlite')
+
+if DB_ENGINE == 'postgresql':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get('DB_NAME', 'attendance'),
+            'USER': os.environ.get('DB_USER', 'attendance'),
+            'PASSWORD': os.environ.get('DB_PASSWORD', ''),
+            'HOST': os.environ.get('DB_HOST', 'localhost'),
+            'PORT': os.environ.get('DB_PORT', '5432'),
+            'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 60)),
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {},
+        }
     }
-}
+    if os.environ.get('DB_POOL', '1') == '1':
+        # psycopg 3 connection pool (pip install "psycopg[binary,pool]"). It
+        # replaces persistent connections, which Django requires to be off.
+        DATABASES['default']['CONN_MAX_AGE'] = 0
+        DATABASES['default']['OPTIONS']['pool'] = {
+            'min_size': int(os.environ.get('DB_POOL_MIN_SIZE', 2)),
+            'max_size': int(os.environ.get('DB_POOL_MAX_SIZE', 10)),
+            'timeout': int(os.environ.get('DB_POOL_TIMEOUT', 10)),
+        }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.environ.get('DB_NAME', BASE_DIR / 'db.sqlite3'),
+            'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 60)),
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {
+                # Take the write lock at BEGIN, where busy_timeout applies, rather
+                # than failing with "database is locked" when a reader upgrades.
+                'transaction_mode': 'IMMEDIATE',
+            },
+        }
+    }
+
+# Applied to every new SQLite connection by attendance.database.configure_sqlite.
+# SQLITE_TUNING=0 falls back to SQLite's defaults.
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 5000)),
+    'mmap_size': int(os.environ.get('SQLITE_MMAP_SIZE', 128 * 1024 * 1024)),
+    'cache_size': -int(os.environ.get('SQLITE_CACHE_SIZE_KB', 20000)),
+} if os.environ.get('SQLITE_TUNING', '1') == '1' else {}
+
+
+# Authentication
+# https://docs.djangoproject.com/en/5.2/topics/auth/customizing/
+
+AUTHENTICATION_BACKENDS = ['attendance.backends.ProfileModelBackend']
+
+# Rebuild request.user from a session snapshot instead of querying it on every
+# request. The TTL bounds how long a password change elsewhere takes to apply.
+PRINCIPAL_SESSION_CACHE = False
+PRINCIPAL_SESSION_CACHE_TTL = 300
 
 
 # Password validation
@@ -139,3 +201,69 @@ CRISPY_TEMPLATE_PACK = "bootstrap5"
 LOGIN_URL = 'login'
 LOGIN_REDIRECT_URL = 'dashboard'
 LOGOUT_REDIRECT_URL = 'login'
+
+# Caching
+# Dashboard invalidation bumps version keys in this cache, so multi-process
+# deployments need a shared backend (e.g. Redis or Memcached) here.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+DASHBOARD_CACHE_TIMEOUT = 600
+
+# Trends page: weeks in the moving average and how long computed arrays are cached.
+TRENDS_WINDOW_WEEKS = 3
+TRENDS_CACHE_TIMEOUT = 3600
+
+# Report snapshots (refresh_snapshots command): each incremental refresh
+# re-reads rows from this many seconds before the stored watermark so writes
+# that committed late are not skipped.
+SNAPSHOT_WATERMARK_OVERLAP = 60
+
+# Semesters start on the first of these months; archive_semesters moves
+# sessions of semesters that have ended out of the hot tables.
+SEMESTER_START_MONTHS = [1, 7]
+
+# Global search box: matches shown per kind (students, courses, sessions).
+SEARCH_RESULTS_PER_KIND = 10
+
+# Student and course pickers: results per autocomplete page, and how long a
+# lecturer's cached course dropdown lives (it is also dropped on course changes).
+AUTOCOMPLETE_PAGE_SIZE = 20
+CHOICES_CACHE_TIMEOUT = 3600
+
+# Card reader API (api/devices/attendance/): events per batch, and the largest
+# body accepted, both as sent and after gunzipping. The view reads the body
+# itself, so DATA_UPLOAD_MAX_MEMORY_SIZE does not cap it.
+DEVICE_API_MAX_EVENTS = 20000
+DEVICE_API_MAX_BODY_BYTES = 16 * 1024 * 1024
+
+# Student self check-in
+# Codes live in the cache above for CHECKIN_CODE_TTL seconds. Check-ins are
+# buffered per process and written every CHECKIN_FLUSH_INTERVAL seconds (or
+# once CHECKIN_FLUSH_SIZE are waiting); None leaves flushing to the caller.
+CHECKIN_CODE_TTL = 300
+CHECKIN_FLUSH_INTERVAL = 0.25
+CHECKIN_FLUSH_SIZE = 1000
+
+# Performance metrics
+# Requests slower than this many milliseconds are logged to
+# 'attendance.slow_requests' together with their SQL. None disables the log.
+SLOW_REQUEST_THRESHOLD_MS = None
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'attendance.slow_requests': {'handlers': ['console'], 'level': 'WARNING'},
+        'attendance.checkin': {'handlers': ['console'], 'level': 'WARNING'},
+    },
+}
+
+# Admin changelists of the big tables show the database's row estimate
+# instead of an exact COUNT(*) once it passes this many rows (unfiltered only).
+ADMIN_ESTIMATED_COUNT_ABOVE = 100000